@@ -22,34 +22,51 @@ Created on 15.02.2022
 #
 #
 
+import asyncio
+import hashlib
+import io
 import json
 import logging
 import os
+import re
+import sqlite3
+import threading
+import time
 import xml.etree.ElementTree as et
 from abc import ABC, ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from email import message_from_string
 from email.mime.text import MIMEText
-from smtplib import SMTP_SSL as SMTP
-from typing import Callable
+from smtplib import SMTP, SMTP_SSL, SMTPServerDisconnected
+from string import Template
+from typing import Any, Callable
 
 import pandas as pd
 import pytz
 import requests
 import toml
 from atlassian import Confluence
+from atlassian.errors import ApiNotFoundError
 from dateutil import parser
+from requests.adapters import HTTPAdapter
 
 
 class SingletonMeta(type):
     """
-    Meta class to make python classes a Singleton
+    Meta class to make python classes a Singleton. Instance creation is guarded by a
+    lock, so concurrent workers always share the same instance
     """
     _instances = {}
+    _lock = threading.RLock()
 
     def __call__(cls, *args, **kwargs):
         if cls not in cls._instances:
-            cls._instances[cls] = super().__call__(*args, **kwargs)
+            with cls._lock:
+                if cls not in cls._instances:
+                    cls._instances[cls] = super().__call__(*args, **kwargs)
         return cls._instances[cls]
 
 
@@ -59,19 +76,423 @@ class SingletonABCMeta(ABCMeta):
     are automatically Singletons
     """
     _instances = {}
+    _lock = threading.RLock()
 
     def __call__(cls, *args, **kwargs):
         if cls not in cls._instances:
-            cls._instances[cls] = super(SingletonABCMeta, cls).__call__(*args, **kwargs)
+            with cls._lock:
+                if cls not in cls._instances:
+                    cls._instances[cls] = super(SingletonABCMeta, cls).__call__(*args, **kwargs)
         return cls._instances[cls]
 
 
+class StorageBackend(ABC, metaclass=SingletonABCMeta):
+    """
+    Abstract storage for the tables and documents of the broker monitor. Entries are
+    addressed by their file path, so the writers work the same way on every backend
+    """
+    _encoding: str = 'utf-8'
+    _separator: str = ';'
+
+    @staticmethod
+    def get_configured_backend() -> 'StorageBackend':
+        """
+        Backend is set by 'STORAGE.BACKEND' and is resolved on each call, as the writers
+        are created before the config is loaded
+        """
+        if os.getenv('STORAGE.BACKEND', 'csv') == 'sqlite':
+            return SQLiteStorageBackend()
+        return FileStorageBackend()
+
+    def transaction(self):
+        """
+        Groups several writes into one atomic batch. Does nothing if the backend is not transactional
+        """
+        return nullcontext()
+
+    def export_to_files(self):
+        """
+        Writes all stored entries to their file paths. Does nothing if the entries already are files
+        """
+
+    @abstractmethod
+    def exists(self, filepath: str) -> bool:
+        pass
+
+    @abstractmethod
+    def get_signature(self, filepath: str):
+        """
+        Returns a value that changes whenever the entry is modified
+        """
+
+    @abstractmethod
+    def list_entries(self, directory: str) -> list:
+        """
+        Returns the sorted file paths of all entries in the directory
+        """
+
+    @abstractmethod
+    def get_content_hash(self, filepath: str) -> str:
+        """
+        Unlike the signature, the hash only depends on the content and is stable between runs
+        """
+
+    @abstractmethod
+    def read_table(self, filepath: str, table: str, columns: list) -> pd.DataFrame:
+        pass
+
+    @abstractmethod
+    def read_last_rows_of_table(self, filepath: str, table: str, columns: list, num_rows: int) -> pd.DataFrame:
+        pass
+
+    @abstractmethod
+    def write_table(self, data: pd.DataFrame, filepath: str, table: str, columns: list):
+        pass
+
+    @abstractmethod
+    def append_row_to_table(self, row: dict, filepath: str, table: str, columns: list, replace_last_row: bool):
+        pass
+
+    @abstractmethod
+    def read_document(self, filepath: str) -> str:
+        pass
+
+    @abstractmethod
+    def write_document(self, data: str, filepath: str):
+        pass
+
+    @abstractmethod
+    def append_to_log(self, data: str, filepath: str):
+        pass
+
+
+class FileStorageBackend(StorageBackend):
+    """
+    Default backend. Tables are stored as CSV files and documents as text files
+    """
+
+    def exists(self, filepath: str) -> bool:
+        return os.path.isfile(filepath)
+
+    def get_signature(self, filepath: str) -> tuple:
+        stat = os.stat(filepath)
+        return stat.st_mtime_ns, stat.st_size
+
+    def list_entries(self, directory: str) -> list:
+        if not os.path.isdir(directory):
+            return []
+        paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+        return sorted(path for path in paths if os.path.isfile(path))
+
+    def get_content_hash(self, filepath: str) -> str:
+        with open(filepath, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+    def read_table(self, filepath: str, table: str, columns: list) -> pd.DataFrame:
+        return pd.read_csv(filepath, sep=self._separator, encoding=self._encoding, dtype=str)
+
+    def read_last_rows_of_table(self, filepath: str, table: str, columns: list, num_rows: int) -> pd.DataFrame:
+        """
+        Reads only the header and the last rows of a CSV file by seeking from its end, so the
+        cost does not grow with the size of the file. Rows must not contain line breaks.
+        """
+        with open(filepath, 'rb') as file:
+            header = file.readline()
+            offset = self.__get_offset_of_last_rows(file, num_rows, len(header))
+            file.seek(offset)
+            tail = file.read()
+        content = (header + tail).decode(self._encoding)
+        return pd.read_csv(io.StringIO(content), sep=self._separator, dtype=str)
+
+    def write_table(self, data: pd.DataFrame, filepath: str, table: str, columns: list):
+        data.to_csv(filepath, sep=self._separator, encoding=self._encoding, index=False)
+
+    def append_row_to_table(self, row: dict, filepath: str, table: str, columns: list, replace_last_row: bool):
+        """
+        Appends a single row to an existing CSV file without rewriting it. If replace_last_row is set,
+        the file is truncated before its last row first.
+        """
+        df = pd.DataFrame(row, index=[0], columns=columns)
+        if replace_last_row:
+            with open(filepath, 'rb+') as file:
+                header = file.readline()
+                offset = self.__get_offset_of_last_rows(file, 1, len(header))
+                file.truncate(offset)
+        df.to_csv(filepath, mode='a', header=False, sep=self._separator, encoding=self._encoding, index=False)
+
+    @staticmethod
+    def __get_offset_of_last_rows(file, num_rows: int, offset_data: int, block_size: int = 4096) -> int:
+        """
+        Returns the byte offset at which the last rows of the file begin. The file is read backwards
+        in blocks until enough complete rows were found or the end of the header is reached.
+        """
+        end = file.seek(0, os.SEEK_END)
+        position = end
+        buffer = b''
+        while position > offset_data:
+            read_size = min(block_size, position - offset_data)
+            position -= read_size
+            file.seek(position)
+            buffer = file.read(read_size) + buffer
+            if buffer.rstrip(b'\r\n').count(b'\n') >= num_rows:
+                break
+        content = buffer.rstrip(b'\r\n')
+        last_rows = content.split(b'\n')[-num_rows:]
+        return position + len(content) - len(b'\n'.join(last_rows))
+
+    def read_document(self, filepath: str) -> str:
+        with open(filepath, 'r', encoding=self._encoding) as file:
+            return file.read()
+
+    def write_document(self, data: str, filepath: str):
+        with open(filepath, 'w', encoding=self._encoding) as file:
+            file.write(data)
+
+    def append_to_log(self, data: str, filepath: str):
+        with open(filepath, 'a', encoding=self._encoding) as file:
+            file.write(data)
+
+
+class SQLiteStorageBackend(StorageBackend):
+    """
+    Stores all entries in a single SQLite database. Tables are kept in indexed tables named
+    after their category ('stats', 'errors'), documents like node resources in 'resources' and
+    appended logs like resource changes in 'resource_changes'. Entries are keyed by their path
+    relative to the working directory. A single connection is shared by all workers and guarded
+    by a lock, each write is committed as one transaction
+    """
+    __documents_table: str = 'resources'
+    __logs_table: str = 'resource_changes'
+
+    def __init__(self):
+        self.__working_dir = os.getenv('DIR.WORKING')
+        path = os.getenv('STORAGE.SQLITE_PATH') or os.path.join(self.__working_dir, 'broker-monitor.db')
+        self.__connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__lock = threading.RLock()
+        self.__transaction_depth = 0
+        self.__known_tables = set()
+        self.__versions = {}
+        self.__create_base_tables()
+
+    def __create_base_tables(self):
+        with self.transaction() as cursor:
+            cursor.execute('CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, kind TEXT NOT NULL)')
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS {self.__documents_table} '
+                           f'(source TEXT PRIMARY KEY, node_id TEXT, content TEXT)')
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS {self.__logs_table} '
+                           f'(source TEXT NOT NULL, node_id TEXT, content TEXT)')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.__logs_table}_source ON {self.__logs_table} (source)')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.__documents_table}_node ON {self.__documents_table} (node_id)')
+
+    @contextmanager
+    def transaction(self):
+        """
+        Nested transactions of the same thread are merged into the outermost one
+        """
+        with self.__lock:
+            if self.__transaction_depth == 0:
+                self.__connection.execute('BEGIN')
+            self.__transaction_depth += 1
+            try:
+                yield self.__connection
+            except BaseException:
+                self.__transaction_depth -= 1
+                if self.__transaction_depth == 0:
+                    self.__connection.execute('ROLLBACK')
+                raise
+            self.__transaction_depth -= 1
+            if self.__transaction_depth == 0:
+                self.__connection.execute('COMMIT')
+
+    def __to_source(self, filepath: str) -> str:
+        source = os.path.relpath(os.path.abspath(filepath), os.path.abspath(self.__working_dir))
+        return source.replace(os.sep, '/')
+
+    @staticmethod
+    def __get_node_id_of_source(source: str):
+        """
+        Node files are stored in a folder named after the node ID
+        """
+        parts = source.split('/')
+        return parts[0] if len(parts) > 1 else None
+
+    def __register_source(self, cursor, source: str, kind: str):
+        cursor.execute('INSERT OR IGNORE INTO sources (source, kind) VALUES (?, ?)', (source, kind))
+
+    def __init_table_if_nonexisting(self, cursor, table: str, columns: list):
+        if table not in self.__known_tables:
+            definition = ', '.join(f'"{column}" TEXT' for column in columns)
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS {table} (source TEXT NOT NULL, node_id TEXT, {definition})')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_source ON {table} (source)')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_node ON {table} (node_id)')
+            self.__known_tables.add(table)
+
+    def __raise_if_nonexisting(self, source: str):
+        if not self.__is_source_registered(source):
+            raise FileNotFoundError(f'no stored entry for {source}')
+
+    def __is_source_registered(self, source: str) -> bool:
+        with self.__lock:
+            row = self.__connection.execute('SELECT 1 FROM sources WHERE source = ?', (source,)).fetchone()
+        return row is not None
+
+    def exists(self, filepath: str) -> bool:
+        return self.__is_source_registered(self.__to_source(filepath))
+
+    def get_signature(self, filepath: str) -> int:
+        """
+        Entries are versioned by a counter of writes of this process
+        """
+        return self.__versions.get(self.__to_source(filepath), 0)
+
+    def list_entries(self, directory: str) -> list:
+        prefix = self.__to_source(directory)
+        with self.__lock:
+            rows = self.__connection.execute('SELECT source FROM sources WHERE substr(source, 1, ?) = ? ORDER BY source',
+                                             (len(prefix) + 1, f'{prefix}/')).fetchall()
+        return [os.path.join(self.__working_dir, *source.split('/')) for source, in rows]
+
+    def get_content_hash(self, filepath: str) -> str:
+        source = self.__to_source(filepath)
+        with self.__lock:
+            row = self.__connection.execute('SELECT kind FROM sources WHERE source = ?', (source,)).fetchone()
+            if row is None:
+                raise FileNotFoundError(f'no stored entry for {source}')
+            if row[0] in (self.__documents_table, self.__logs_table):
+                content = self.read_document(filepath)
+            else:
+                rows = self.__connection.execute(f'SELECT * FROM {row[0]} WHERE source = ? ORDER BY rowid', (source,)).fetchall()
+                content = repr(rows)
+        return hashlib.sha256(content.encode(self._encoding)).hexdigest()
+
+    def __increment_version(self, source: str):
+        with self.__lock:
+            self.__versions[source] = self.__versions.get(source, 0) + 1
+
+    @staticmethod
+    def __to_db_value(value):
+        """
+        Empty values are stored as NULL to match the behaviour of a CSV roundtrip
+        """
+        if value is None or (not isinstance(value, str) and pd.isna(value)) or value == '':
+            return None
+        return str(value)
+
+    def read_table(self, filepath: str, table: str, columns: list) -> pd.DataFrame:
+        source = self.__to_source(filepath)
+        self.__raise_if_nonexisting(source)
+        with self.transaction() as cursor:
+            self.__init_table_if_nonexisting(cursor, table, columns)
+            selection = ', '.join(f'"{column}"' for column in columns)
+            rows = cursor.execute(f'SELECT {selection} FROM {table} WHERE source = ? ORDER BY rowid', (source,)).fetchall()
+        return self.__convert_rows_to_df(rows, columns)
+
+    def read_last_rows_of_table(self, filepath: str, table: str, columns: list, num_rows: int) -> pd.DataFrame:
+        source = self.__to_source(filepath)
+        self.__raise_if_nonexisting(source)
+        with self.transaction() as cursor:
+            self.__init_table_if_nonexisting(cursor, table, columns)
+            selection = ', '.join(f'"{column}"' for column in columns)
+            rows = cursor.execute(f'SELECT {selection} FROM {table} WHERE source = ? ORDER BY rowid DESC LIMIT ?',
+                                  (source, num_rows)).fetchall()
+        return self.__convert_rows_to_df(rows[::-1], columns)
+
+    @staticmethod
+    def __convert_rows_to_df(rows: list, columns: list) -> pd.DataFrame:
+        """
+        NULL is converted to NaN, like empty cells of a CSV file read with dtype=str
+        """
+        rows = [[float('nan') if value is None else value for value in row] for row in rows]
+        return pd.DataFrame(rows, columns=columns, dtype=str)
+
+    def write_table(self, data: pd.DataFrame, filepath: str, table: str, columns: list):
+        source = self.__to_source(filepath)
+        node_id = self.__get_node_id_of_source(source)
+        rows = [[source, node_id] + [self.__to_db_value(row.get(column)) for column in columns]
+                for row in data.to_dict(orient='records')]
+        with self.transaction() as cursor:
+            self.__init_table_if_nonexisting(cursor, table, columns)
+            self.__register_source(cursor, source, table)
+            cursor.execute(f'DELETE FROM {table} WHERE source = ?', (source,))
+            placeholders = ', '.join('?' * (len(columns) + 2))
+            cursor.executemany(f'INSERT INTO {table} VALUES ({placeholders})', rows)
+            self.__increment_version(source)
+
+    def append_row_to_table(self, row: dict, filepath: str, table: str, columns: list, replace_last_row: bool):
+        source = self.__to_source(filepath)
+        values = [source, self.__get_node_id_of_source(source)] + [self.__to_db_value(row.get(column)) for column in columns]
+        with self.transaction() as cursor:
+            self.__init_table_if_nonexisting(cursor, table, columns)
+            self.__register_source(cursor, source, table)
+            if replace_last_row:
+                cursor.execute(f'DELETE FROM {table} WHERE rowid = (SELECT MAX(rowid) FROM {table} WHERE source = ?)', (source,))
+            placeholders = ', '.join('?' * len(values))
+            cursor.execute(f'INSERT INTO {table} VALUES ({placeholders})', values)
+            self.__increment_version(source)
+
+    def read_document(self, filepath: str) -> str:
+        source = self.__to_source(filepath)
+        self.__raise_if_nonexisting(source)
+        with self.__lock:
+            row = self.__connection.execute(f'SELECT content FROM {self.__documents_table} WHERE source = ?', (source,)).fetchone()
+            if row is None:
+                rows = self.__connection.execute(f'SELECT content FROM {self.__logs_table} WHERE source = ? ORDER BY rowid', (source,)).fetchall()
+                return ''.join(content for content, in rows)
+        return row[0]
+
+    def write_document(self, data: str, filepath: str):
+        source = self.__to_source(filepath)
+        with self.transaction() as cursor:
+            self.__register_source(cursor, source, self.__documents_table)
+            cursor.execute(f'INSERT OR REPLACE INTO {self.__documents_table} (source, node_id, content) VALUES (?, ?, ?)',
+                           (source, self.__get_node_id_of_source(source), data))
+
+    def append_to_log(self, data: str, filepath: str):
+        source = self.__to_source(filepath)
+        with self.transaction() as cursor:
+            self.__register_source(cursor, source, self.__logs_table)
+            cursor.execute(f'INSERT INTO {self.__logs_table} (source, node_id, content) VALUES (?, ?, ?)',
+                           (source, self.__get_node_id_of_source(source), data))
+
+    def export_to_files(self):
+        """
+        Tables are exported as CSV with the columns they were created with
+        """
+        with self.__lock:
+            sources = self.__connection.execute('SELECT source, kind FROM sources ORDER BY source').fetchall()
+        for source, kind in sources:
+            filepath = os.path.join(self.__working_dir, *source.split('/'))
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            if kind in (self.__documents_table, self.__logs_table):
+                FileStorageBackend().write_document(self.read_document(filepath), filepath)
+            else:
+                columns = self.__get_columns_of_table(kind)
+                df = self.read_table(filepath, kind, columns)
+                FileStorageBackend().write_table(df, filepath, kind, columns)
+
+    def __get_columns_of_table(self, table: str) -> list:
+        with self.__lock:
+            infos = self.__connection.execute(f'PRAGMA table_info({table})').fetchall()
+        return [info[1] for info in infos if info[1] not in ('source', 'node_id')]
+
+
 class DataWriter(ABC, metaclass=SingletonABCMeta):
     """
-    Abstract class to store data in a local file
+    Abstract class to store data in a local file. The data is passed on to the configured
+    storage backend
     """
     _encoding: str = 'utf-8'
 
+    @property
+    def _storage(self) -> StorageBackend:
+        return StorageBackend.get_configured_backend()
+
+    def does_file_exist(self, filepath: str) -> bool:
+        return self._storage.exists(filepath)
+
+    def transaction(self):
+        return self._storage.transaction()
+
     @abstractmethod
     def write_data_to_file(self, data, filepath: str):
         pass
@@ -82,16 +503,84 @@ class CSVHandler(DataWriter, ABC):
     Operations for reading a CSV file as a dataframe or writing a dataframe to CSV
     """
     _category: str
-    _separator: str = ';'
 
     def __init__(self):
         self.__timestamp = TimestampHandler()
+        self.__history_cache = {}
 
     def write_data_to_file(self, data: pd.DataFrame, filepath: str):
-        data.to_csv(filepath, sep=self._separator, encoding=self._encoding, index=False)
+        self._storage.write_table(data, filepath, self._category, self.get_csv_columns())
 
     def read_csv_as_df(self, csv_path: str) -> pd.DataFrame:
-        return pd.read_csv(csv_path, sep=self._separator, encoding=self._encoding, dtype=str)
+        return self._storage.read_table(csv_path, self._category, self.get_csv_columns())
+
+    def read_last_rows_as_df(self, csv_path: str, num_rows: int = 1) -> pd.DataFrame:
+        """
+        Reads only the last rows of a CSV file, so the cost does not grow with the size of the file
+        """
+        return self._storage.read_last_rows_of_table(csv_path, self._category, self.get_csv_columns(), num_rows)
+
+    def append_row_to_file(self, row: dict, csv_path: str, replace_last_row: bool = False):
+        """
+        Appends a single row to an existing CSV file without rewriting it. If replace_last_row is set,
+        the last row of the file is replaced instead.
+        """
+        self._storage.append_row_to_table(row, csv_path, self._category, self.get_csv_columns(), replace_last_row)
+
+    def read_node_history_as_df(self, working_dir: str, node_id: str, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """
+        Presents the yearly CSV files of a node as one dataframe, ordered by time. Only the files of the
+        years between start_date and end_date are loaded (both default to the current year). Only the file
+        of the last year must exist, earlier missing years are skipped. If a date is given, rows outside of
+        it are dropped. Parsed files are kept in memory until they are modified.
+        """
+        end_year = int(self.__timestamp.get_utc_year_from_date_string(end_date) if end_date else self.__timestamp.get_current_year())
+        start_year = int(self.__timestamp.get_utc_year_from_date_string(start_date)) if start_date else end_year
+        dfs = [self.__read_csv_of_year_cached(working_dir, node_id, str(year), year != end_year) for year in range(start_year, end_year + 1)]
+        df = self.__concat_history([df for df in dfs if df is not None])
+        dates = df[self.get_csv_columns()[0]].str[:10]
+        if start_date:
+            df = df[dates >= self.__timestamp.get_utc_ymd_from_date_string(start_date)]
+        if end_date:
+            df = df[dates <= self.__timestamp.get_utc_ymd_from_date_string(end_date)]
+        return df.reset_index(drop=True)
+
+    def read_last_rows_of_node_history_as_df(self, working_dir: str, node_id: str, num_rows: int) -> pd.DataFrame:
+        """
+        Reads the last rows of a node, beginning with the CSV file of the current year. Earlier years
+        are only read if the later ones have less rows, and until the first year without a CSV file.
+        """
+        dfs = []
+        year = int(self.__timestamp.get_current_year())
+        while num_rows > 0:
+            csv_path = os.path.join(working_dir, self.generate_node_csv_name(node_id, str(year)))
+            if not self.does_file_exist(csv_path):
+                break
+            df = self.read_last_rows_as_df(csv_path, num_rows)
+            dfs.insert(0, df)
+            num_rows -= len(df)
+            year -= 1
+        return self.__concat_history(dfs)
+
+    def __read_csv_of_year_cached(self, working_dir: str, node_id: str, year: str, is_optional: bool):
+        csv_path = os.path.join(working_dir, self.generate_node_csv_name(node_id, year))
+        if is_optional and not self.does_file_exist(csv_path):
+            return None
+        signature = self._storage.get_signature(csv_path)
+        cached = self.__history_cache.get(csv_path)
+        if cached is None or cached[0] != signature:
+            cached = (signature, self.read_csv_as_df(csv_path))
+            self.__history_cache[csv_path] = cached
+        return cached[1]
+
+    def __concat_history(self, dfs: list) -> pd.DataFrame:
+        """
+        Empty dataframes are left out, as they would change the dtypes of the result
+        """
+        dfs = [df for df in dfs if not df.empty]
+        if not dfs:
+            return pd.DataFrame(columns=self.get_csv_columns(), dtype=str)
+        return pd.concat(dfs, ignore_index=True)
 
     def generate_node_csv_name(self, node_id: str, year: str = None) -> str:
         """
@@ -105,7 +594,7 @@ class CSVHandler(DataWriter, ABC):
     def init_csv_file(self, filepath: str, csv_name: str = None) -> str:
         if csv_name:
             filepath = os.path.join(filepath, csv_name)
-        if not os.path.isfile(filepath):
+        if not self.does_file_exist(filepath):
             df = pd.DataFrame(columns=self.get_csv_columns())
             self.write_data_to_file(df, filepath)
         return filepath
@@ -142,19 +631,16 @@ class ErrorCSVHandler(CSVHandler):
 class TextWriter(DataWriter):
 
     def write_data_to_file(self, data, filepath: str):
-        with open(filepath, 'a', encoding=self._encoding) as file:
-            file.write(data)
+        self._storage.append_to_log(data, filepath)
 
     def save_dict_as_txt_file(self, dictionary: dict, filepath: str):
-        with open(filepath, 'w', encoding=self._encoding) as file:
-            file.write(json.dumps(dictionary))
+        self._storage.write_document(json.dumps(dictionary), filepath)
 
     def load_txt_file_as_dict(self, filepath: str) -> dict:
-        with open(filepath, 'r', encoding=self._encoding) as file:
-            return json.load(file)
+        return json.loads(self._storage.read_document(filepath))
 
     def init_new_file_if_nonexisting(self, filepath: str):
-        if not os.path.isfile(filepath):
+        if not self.does_file_exist(filepath):
             self.save_dict_as_txt_file({}, filepath)
 
 
@@ -207,7 +693,8 @@ class TimestampHandler(metaclass=SingletonMeta):
 class BrokerNodeConnection(metaclass=SingletonMeta):
     """
     Uses REST endpoint of broker-server to get information about
-    connected nodes
+    connected nodes. Can be shared by concurrent workers. If enabled, parsed responses are
+    kept in a cache for the run, which counts its hits and misses and is guarded by a lock
     """
     __timeout = 10
     __namespace = './/{http://aktin.org/ns/exchange}'
@@ -215,13 +702,51 @@ class BrokerNodeConnection(metaclass=SingletonMeta):
     def __init__(self):
         self.__broker_url = os.getenv('BROKER.URL')
         self.__admin_api_key = os.getenv('BROKER.API_KEY')
+        self.__session = self.__create_pooled_session()
+        self.__response_cache = None
+        self.__cache_lock = threading.Lock()
+        self.__cache_hits = 0
+        self.__cache_misses = 0
         self.__check_broker_server_availability()
 
+    def __create_pooled_session(self) -> requests.Session:
+        """
+        All requests share one session, so TCP/TLS connections to the broker are kept alive
+        and reused. The pool should be at least as large as the number of concurrent workers.
+        """
+        pool_size = max(1, int(os.getenv('BROKER.POOL_SIZE', '10')))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update(self.__create_basic_headers())
+        return session
+
     def __check_broker_server_availability(self):
         url = self.__append_to_broker_url('broker', 'status')
-        response = requests.head(url, timeout=self.__timeout)
+        response = self.__session.head(url, timeout=self.__timeout)
         response.raise_for_status()
 
+    def enable_response_cache(self):
+        """
+        Starts a new run-scoped cache. While enabled, each URL is requested and parsed only once,
+        e.g. '/broker/node/{id}/stats' is shared by get_broker_node_stats() and get_broker_node_errors().
+        """
+        with self.__cache_lock:
+            self.__response_cache = {}
+            self.__cache_hits = 0
+            self.__cache_misses = 0
+
+    def disable_response_cache(self):
+        with self.__cache_lock:
+            self.__response_cache = None
+
+    def get_response_cache_hits(self) -> int:
+        return self.__cache_hits
+
+    def get_response_cache_misses(self) -> int:
+        return self.__cache_misses
+
     def __append_to_broker_url(self, *items: str) -> str:
         url = self.__broker_url
         for item in items:
@@ -283,23 +808,98 @@ class BrokerNodeConnection(metaclass=SingletonMeta):
             resources = {}
         return resources
 
+    def get_broker_node_resource_if_modified(self, node_id: str, resource: str, validators: dict) -> tuple:
+        """
+        Conditional variant of get_broker_node_resource(). The given validators of a previous
+        response ('etag', 'last_modified', 'content_hash') are sent as 'If-None-Match' and
+        'If-Modified-Since'. If the broker does not support them, the SHA-256 hash of the
+        response content is compared instead.
+        Returns a tuple of the resource dict (None if unchanged) and the validators of the response.
+        """
+        url = self.__append_to_broker_url('broker', 'node', node_id, resource)
+        try:
+            tree, new_validators = self.__get_processed_response_with_validators(url, validators)
+        except requests.exceptions.HTTPError:
+            return {}, {}
+        if tree is None:
+            return None, new_validators or validators
+        resources = {elem.get('key'): elem.text for elem in tree.iterfind('entry')}
+        return resources, new_validators
+
     def __get_processed_response(self, url: str) -> et.Element:
         """
         Returns XML tree object from GET request
         """
-        response = requests.get(url, headers=self.__create_basic_headers(), timeout=self.__timeout)
+        tree, _ = self.__get_processed_response_with_validators(url)
+        return tree
+
+    def __get_processed_response_with_validators(self, url: str, validators: dict = None) -> tuple:
+        """
+        Returns XML tree object and HTTP validators from GET request. The given validators of a
+        previous response make the request conditional. If the response cache is enabled, responses
+        are cached by their URL and the sent validators, so a conditional request is never answered
+        by an unconditional one. Rejected or unparsable responses are cached as well and their error
+        is raised again on each hit.
+        """
+        cache = self.__response_cache
+        if cache is None:
+            return self.__request_and_parse(url, validators)
+        key = (url,) + self.__get_validator_values(validators)
+        with self.__cache_lock:
+            cached = cache.get(key)
+            if cached is None:
+                self.__cache_misses += 1
+            else:
+                self.__cache_hits += 1
+        if cached is None:
+            try:
+                cached = self.__request_and_parse(url, validators)
+            except (requests.exceptions.HTTPError, et.ParseError) as error:
+                cached = error
+            with self.__cache_lock:
+                cache[key] = cached
+        if isinstance(cached, Exception):
+            raise cached
+        return cached
+
+    @staticmethod
+    def __get_validator_values(validators: dict) -> tuple:
+        validators = validators or {}
+        return validators.get('etag'), validators.get('last_modified'), validators.get('content_hash')
+
+    def __request_and_parse(self, url: str, validators: dict = None) -> tuple:
+        """
+        A response with '304 Not Modified' or with the same content hash as the given validators
+        is not parsed and has no tree. The validators of a '304 Not Modified' response are None.
+        """
+        etag, last_modified, content_hash = self.__get_validator_values(validators)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        response = self.__session.get(url, headers=headers, timeout=self.__timeout)
         response.raise_for_status()
+        if response.status_code == 304:
+            return None, None
+        new_validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': hashlib.sha256(response.content).hexdigest()}
+        if new_validators['content_hash'] == content_hash:
+            return None, new_validators
         tree = et.fromstring(response.content)
-        return tree
+        return tree, new_validators
 
     def __create_basic_headers(self) -> dict:
         """
-        HTTP header for requests to AKTIN Broker
+        HTTP header for requests to AKTIN Broker. Is created once and reused by the session
         """
         headers = requests.utils.default_headers()
         headers['Authorization'] = f'Bearer {self.__admin_api_key}'
         headers['User-Agent'] = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/56.0.2924.87 Safari/537.36'
         headers['Accept'] = 'application/xml'
+        headers['Connection'] = 'keep-alive' if os.getenv('BROKER.KEEP_ALIVE', 'True').lower() == 'true' else 'close'
         return headers
 
     @dataclass()
@@ -380,10 +980,49 @@ class BrokerNodeConnection(metaclass=SingletonMeta):
             return self.__content
 
 
+class AsyncBrokerNodeConnection(metaclass=SingletonMeta):
+    """
+    Asyncio variant of BrokerNodeConnection. The requests library has no asyncio interface, so the
+    requests are deliberately offloaded to a thread pool instead of adding an async HTTP client. They
+    run on the pooled session of BrokerNodeConnection and share its keep-alive connections and its
+    response cache. The size of the thread pool limits the number of requests in flight
+    """
+
+    def __init__(self):
+        self.__connection = BrokerNodeConnection()
+        max_requests = max(1, int(os.getenv('BROKER.MAX_CONCURRENT_REQUESTS', '10')))
+        self.__executor = ThreadPoolExecutor(max_workers=max_requests)
+
+    async def __run_in_executor(self, method: Callable, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, method, *args)
+
+    async def get_broker_nodes(self) -> list:
+        return await self.__run_in_executor(self.__connection.get_broker_nodes)
+
+    async def get_broker_node(self, node_id: str) -> 'BrokerNodeConnection.BrokerNode':
+        return await self.__run_in_executor(self.__connection.get_broker_node, node_id)
+
+    async def get_broker_node_stats(self, node_id: str) -> 'BrokerNodeConnection.BrokerNodeStats':
+        return await self.__run_in_executor(self.__connection.get_broker_node_stats, node_id)
+
+    async def get_broker_node_errors(self, node_id: str) -> list:
+        return await self.__run_in_executor(self.__connection.get_broker_node_errors, node_id)
+
+    async def get_broker_node_resource(self, node_id: str, resource: str) -> dict:
+        return await self.__run_in_executor(self.__connection.get_broker_node_resource, node_id, resource)
+
+    async def get_broker_node_resource_if_modified(self, node_id: str, resource: str, validators: dict) -> tuple:
+        return await self.__run_in_executor(self.__connection.get_broker_node_resource_if_modified, node_id, resource, validators)
+
+
 class ResourceLoader(ABC, metaclass=SingletonABCMeta):
     """
-    To load resources from the resources folder
+    To load resources from the resources folder. Resources loaded as templates are
+    cached for the process and only read again if the modification time of the file changes.
     """
+    __templates: dict = {}
+    __templates_lock = threading.Lock()
 
     def __init__(self):
         self.__resources_dir = os.getenv('DIR.RESOURCES')
@@ -394,11 +1033,32 @@ class ResourceLoader(ABC, metaclass=SingletonABCMeta):
             content = file.read()
         return content
 
+    def _get_resource_as_template(self, resource_name: str, encoding: str) -> Template:
+        """
+        Placeholders in the resource are written as ${key}
+        """
+        resource_path = os.path.join(self.__resources_dir, resource_name)
+        mtime = os.stat(resource_path).st_mtime_ns
+        with self.__templates_lock:
+            cached = self.__templates.get((resource_path, encoding))
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, Template(self._get_resource_as_string(resource_name, encoding)))
+                self.__templates[(resource_path, encoding)] = cached
+        return cached[1]
+
 
 class ConfluenceConnection(metaclass=SingletonMeta):
     """
-    Uses Atlassian Python API to execute CRUD operations on Confluence
+    Uses Atlassian Python API to execute CRUD operations on Confluence. Page IDs are
+    cached by their title in the working directory, so each title is only resolved once.
+    The fingerprints of uploaded page contents are kept there as well to skip unchanged updates,
+    together with the fingerprint of the page as it was first fetched from Confluence after the upload.
+    Page contents can be loaded in bulk into a cache, which is kept for the run.
+    The connection may be shared by several threads. Requests are evenly spaced, if
+    'CONFLUENCE.REQUESTS_PER_SECOND' is set.
     """
+    __page_ids_filename: str = 'confluence_page_ids.json'
+    __fingerprints_filename: str = 'confluence_page_fingerprints.json'
 
     def __init__(self):
         """
@@ -408,32 +1068,325 @@ class ConfluenceConnection(metaclass=SingletonMeta):
         confluence_token = os.getenv('CONFLUENCE.TOKEN')
         self.__space = os.getenv('CONFLUENCE.SPACE')
         self.__confluence = Confluence(url=confluence_url, token=confluence_token)
+        self.__writer = TextWriter()
+        self.__page_ids_path = os.path.join(os.getenv('DIR.WORKING'), self.__page_ids_filename)
+        self.__page_ids = None
+        self.__fingerprints_path = os.path.join(os.getenv('DIR.WORKING'), self.__fingerprints_filename)
+        self.__fingerprints = None
+        self.__fetched_fingerprints = {}
+        self.__skipped_updates = 0
+        self.__page_contents = {}
+        self.__lock = threading.RLock()
+        requests_per_second = float(os.getenv('CONFLUENCE.REQUESTS_PER_SECOND', '0'))
+        self.__request_interval = 1 / requests_per_second if requests_per_second > 0 else 0
+        self.__next_request_time = 0.0
+        self.__request_lock = threading.Lock()
+
+    def __request(self, operation: Callable, *args, **kwargs) -> Any:
+        """
+        Executes a request on the Atlassian API after waiting for the next free request slot
+        """
+        if self.__request_interval:
+            with self.__request_lock:
+                now = time.monotonic()
+                wait = self.__next_request_time - now
+                self.__next_request_time = max(now, self.__next_request_time) + self.__request_interval
+            if wait > 0:
+                time.sleep(wait)
+        return operation(*args, **kwargs)
+
+    def __load_dict_if_exists(self, filepath: str) -> dict:
+        if self.__writer.does_file_exist(filepath):
+            return self.__writer.load_txt_file_as_dict(filepath)
+        return {}
+
+    def __get_cached_page_ids(self) -> dict:
+        """
+        The cache file is loaded on first use
+        """
+        with self.__lock:
+            if self.__page_ids is None:
+                self.__page_ids = self.__load_dict_if_exists(self.__page_ids_path)
+            return self.__page_ids
+
+    def __get_fingerprints(self) -> dict:
+        with self.__lock:
+            if self.__fingerprints is None:
+                self.__fingerprints = self.__load_dict_if_exists(self.__fingerprints_path)
+            return self.__fingerprints
+
+    def __get_cached_page_id(self, pagename: str) -> str:
+        with self.__lock:
+            return self.__get_cached_page_ids().get(pagename)
+
+    def __cache_page_id(self, pagename: str, page_id: str):
+        with self.__lock:
+            page_ids = self.__get_cached_page_ids()
+            if page_ids.get(pagename) != page_id:
+                page_ids[pagename] = page_id
+                self.__writer.save_dict_as_txt_file(page_ids, self.__page_ids_path)
+
+    def __forget_page_id(self, pagename: str):
+        with self.__lock:
+            page_ids = self.__get_cached_page_ids()
+            if pagename in page_ids:
+                del page_ids[pagename]
+                self.__writer.save_dict_as_txt_file(page_ids, self.__page_ids_path)
+
+    def get_page_id(self, pagename: str) -> str:
+        """
+        Returns None if the page does not exist. Missing pages are not cached
+        """
+        page_id = self.__get_cached_page_id(pagename)
+        if page_id is not None:
+            return page_id
+        page_id = self.__request(self.__confluence.get_page_id, self.__space, pagename)
+        if page_id is not None:
+            self.__cache_page_id(pagename, str(page_id))
+            return str(page_id)
+        return None
+
+    def __execute_on_page(self, pagename: str, operation: Callable[[str], Any]) -> Any:
+        """
+        If the cached ID of the page is no longer found on Confluence (e.g. the page was deleted and
+        created again), the ID is looked up again and the operation is retried once. If the page is
+        not found anymore, its cached ID is dropped and the error is raised
+        """
+        was_cached = self.__get_cached_page_id(pagename) is not None
+        page_id = self.get_page_id(pagename)
+        try:
+            return operation(page_id)
+        except Exception as error:
+            if not was_cached or not self.is_page_not_found_error(error):
+                raise
+            self.__forget_page_id(pagename)
+            page_id = self.get_page_id(pagename)
+            if page_id is None:
+                raise
+            return operation(page_id)
+
+    @staticmethod
+    def is_page_not_found_error(error: Exception) -> bool:
+        """
+        Depending on the request, the Atlassian API raises a HTTPError or wraps it into an ApiError
+        """
+        if isinstance(error, ApiNotFoundError):
+            return True
+        reason = getattr(error, 'reason', error)
+        response = getattr(reason, 'response', None)
+        return response is not None and response.status_code == 404
 
     def does_page_exists(self, pagename: str) -> bool:
-        return self.__confluence.page_exists(self.__space, pagename)
+        return pagename in self.__page_contents or self.get_page_id(pagename) is not None
+
+    def load_child_pages_into_cache(self, parentname: str, page_size: int = 50) -> int:
+        """
+        Loads the IDs and contents of all child pages of the given page with a paged request, instead of
+        one request per page. Returns the number of loaded pages. Confluence may return fewer pages than
+        requested per request, so paging only stops at an empty page.
+        """
+        parent_id = self.get_page_id(parentname)
+        if parent_id is None:
+            return 0
+        page_ids = self.__get_cached_page_ids()
+        start = 0
+        while True:
+            pages = self.__request(self.__confluence.get_page_child_by_type, parent_id, type='page', start=start, limit=page_size, expand='body.storage')
+            with self.__lock:
+                for page in pages:
+                    page_ids[page['title']] = str(page['id'])
+                    self.__page_contents[page['title']] = page['body']['storage']['value']
+            if not pages:
+                break
+            start += len(pages)
+        with self.__lock:
+            self.__writer.save_dict_as_txt_file(page_ids, self.__page_ids_path)
+        return start
 
     def get_page_content(self, pagename: str) -> str:
-        page_id = self.__confluence.get_page_id(self.__space, pagename)
-        page = self.__confluence.get_page_by_id(page_id, expand='body.storage')
-        content = page['body']['storage']['value']
+        """
+        The fingerprint of the fetched content is kept to notice changes of the page on Confluence
+        """
+        if pagename in self.__page_contents:
+            content = self.__page_contents[pagename]
+        else:
+            page = self.__execute_on_page(pagename, lambda page_id: self.__request(self.__confluence.get_page_by_id, page_id, expand='body.storage'))
+            content = page['body']['storage']['value']
+        with self.__lock:
+            self.__fetched_fingerprints.setdefault(pagename, self.__compute_content_fingerprint(content))
         return content
 
+    def get_page_version(self, pagename: str) -> int:
+        """
+        Requests only the version of the page, which is much smaller than its content
+        """
+        page = self.__execute_on_page(pagename, lambda page_id: self.__request(self.__confluence.get_page_by_id, page_id, expand='version'))
+        return int(page['version']['number'])
+
+    def get_page_content_and_version(self, pagename: str) -> tuple:
+        page = self.__execute_on_page(pagename, lambda page_id: self.__request(self.__confluence.get_page_by_id, page_id, expand='body.storage,version'))
+        return page['body']['storage']['value'], int(page['version']['number'])
+
     def upload_file_as_attachement_to_page(self, pagename: str, filepath: str, filetype: str) -> int:
         """
         Identical named files are automatically replaced on confluence
         filetype can be: ''text/csv', 'image/png'
         """
-        page_id = self.__confluence.get_page_id(self.__space, pagename)
-        self.__confluence.attach_file(filepath, content_type=filetype, page_id=page_id)
+        def attach_file(page_id: str) -> str:
+            self.__request(self.__confluence.attach_file, filepath, content_type=filetype, page_id=page_id)
+            return page_id
+
+        return self.__execute_on_page(pagename, attach_file)
+
+    def create_confluence_page(self, pagename: str, parentname: str, content: str) -> str:
+        """
+        Returns the ID of the created page, which is cached right away
+        """
+        parent_id = self.get_page_id(parentname)
+        page = self.__request(self.__confluence.create_page, self.__space, pagename, content, parent_id=parent_id)
+        page_id = str(page['id'])
+        self.__cache_page_id(pagename, page_id)
+        self.__forget_fingerprint(pagename)
+        self.__update_cached_content_if_loaded(pagename, content)
         return page_id
 
-    def create_confluence_page(self, pagename: str, parentname: str, content: str):
-        parent_id = self.__confluence.get_page_id(self.__space, parentname)
-        self.__confluence.create_page(self.__space, pagename, content, parent_id=parent_id)
+    def __forget_fingerprint(self, pagename: str):
+        """
+        A new page must not be skipped because of the fingerprint of a former page with the same title
+        """
+        with self.__lock:
+            self.__fetched_fingerprints.pop(pagename, None)
+            fingerprints = self.__get_fingerprints()
+            if pagename in fingerprints:
+                del fingerprints[pagename]
+                self.__writer.save_dict_as_txt_file(fingerprints, self.__fingerprints_path)
 
     def update_confluence_page(self, pagename: str, content: str):
-        page_id = self.__confluence.get_page_id(self.__space, pagename)
-        self.__confluence.update_page(page_id, pagename, content)
+        self.__execute_on_page(pagename, lambda page_id: self.__request(self.__confluence.update_page, page_id, pagename, content))
+        self.__update_cached_content_if_loaded(pagename, content)
+
+    def __update_cached_content_if_loaded(self, pagename: str, content: str):
+        """
+        Keeps the cached page contents consistent with the uploaded contents of the run
+        """
+        with self.__lock:
+            if self.__page_contents:
+                self.__page_contents[pagename] = content
+
+    def update_confluence_page_if_changed(self, pagename: str, content: str) -> bool:
+        """
+        Skips the update if the content has the same fingerprint as the last uploaded content of the page,
+        as each update creates a new page version on Confluence. Returns whether the page was updated.
+        Confluence converts uploaded contents, so the fetched content of the page is not compared with the
+        uploaded content, but with the content fetched first after the upload. If it differs, the page was
+        changed on Confluence and is updated anyway.
+        If the update fails, the state of the page is unknown and its fingerprint is dropped.
+        """
+        fingerprint = self.__compute_content_fingerprint(content)
+        with self.__lock:
+            fingerprints = self.__get_fingerprints()
+            uploaded = fingerprints.get(pagename, {})
+            fetched = self.__fetched_fingerprints.get(pagename)
+            if uploaded.get('uploaded') == fingerprint and (fetched is None or uploaded.get('fetched', fetched) == fetched):
+                if fetched is not None and 'fetched' not in uploaded:
+                    uploaded['fetched'] = fetched
+                    self.__writer.save_dict_as_txt_file(fingerprints, self.__fingerprints_path)
+                self.__skipped_updates += 1
+                return False
+        try:
+            self.update_confluence_page(pagename, content)
+        except Exception:
+            self.__forget_fingerprint(pagename)
+            raise
+        with self.__lock:
+            self.__fetched_fingerprints.pop(pagename, None)
+            fingerprints[pagename] = {'uploaded': fingerprint}
+            self.__writer.save_dict_as_txt_file(fingerprints, self.__fingerprints_path)
+        return True
+
+    @staticmethod
+    def __compute_content_fingerprint(content: str) -> str:
+        """
+        Whitespace between tags and around the content is not relevant for the storage format
+        """
+        normalized = re.sub(r'>\s+<', '><', content.strip())
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def get_skipped_updates(self) -> int:
+        return self.__skipped_updates
+
+
+class ConfluenceContactsDirectory(metaclass=SingletonMeta):
+    """
+    Contacts of the broker nodes from the Confluence page 'E-Mail-Verteiler'. The parsed contacts
+    are cached in the working directory together with the version of the page. After
+    'CONFLUENCE.CONTACTS_CACHE_MINUTES', only the version of the page is requested again and the
+    page is downloaded only if it was changed. Contacts are indexed by node ID and contact type.
+    """
+    __confluence_email_list: str = 'E-Mail-Verteiler'
+    __cache_filename: str = 'confluence_contacts.json'
+
+    def __init__(self):
+        self.__confluence = ConfluenceConnection()
+        self.__writer = TextWriter()
+        self.__timestamp = TimestampHandler()
+        self.__cache_path = os.path.join(os.getenv('DIR.WORKING'), self.__cache_filename)
+        self.__cache_minutes = float(os.getenv('CONFLUENCE.CONTACTS_CACHE_MINUTES', '60'))
+        self.__index = None
+        self.__lock = threading.Lock()
+
+    def get_contacts_of_node(self, node_id: str, contact_type: str) -> list:
+        """
+        Returns the table rows of the node as dicts. contact_type must be either 'IT' or 'Notaufnahme'.
+        The contacts are loaded once, even if pages are rendered by several threads.
+        """
+        with self.__lock:
+            if self.__index is None:
+                self.__index = self.__index_contacts(self.__load_contacts())
+        return self.__index.get(str(node_id), {}).get(contact_type, [])
+
+    def __load_contacts(self) -> list:
+        cache = {}
+        if self.__writer.does_file_exist(self.__cache_path):
+            cache = self.__writer.load_txt_file_as_dict(self.__cache_path)
+        if cache and not self.__is_cache_expired(cache['fetched']):
+            return cache['contacts']
+        if cache and self.__confluence.get_page_version(self.__confluence_email_list) == cache['version']:
+            contacts, version = cache['contacts'], cache['version']
+        else:
+            page, version = self.__confluence.get_page_content_and_version(self.__confluence_email_list)
+            contacts = self.parse_contacts_table(page)
+        cache = {'version': version, 'fetched': self.__timestamp.get_current_date(), 'contacts': contacts}
+        self.__writer.save_dict_as_txt_file(cache, self.__cache_path)
+        return contacts
+
+    def __is_cache_expired(self, fetched: str) -> bool:
+        age = parser.parse(self.__timestamp.get_current_date()) - parser.parse(fetched)
+        return age.total_seconds() / 60 >= self.__cache_minutes
+
+    @staticmethod
+    def parse_contacts_table(page: str) -> list:
+        """
+        Returns the rows of the first table of the page as dicts of strings. Depending on how the table
+        was edited, its header is either recognized by pandas or is the first row of the table.
+        """
+        df = pd.read_html(io.StringIO(page))[0]
+        if 'Node ID' not in df.columns:
+            df.columns = df.iloc[0]
+            df = df.iloc[1:].reset_index(drop=True)
+        df['Node ID'] = pd.to_numeric(df['Node ID'], errors='coerce')
+        df = df.dropna(subset=['Node ID'])
+        df['Node ID'] = df['Node ID'].astype(int)
+        df = df.fillna('').astype(str)
+        return df.to_dict(orient='records')
+
+    @staticmethod
+    def __index_contacts(contacts: list) -> dict:
+        index = {}
+        for contact in contacts:
+            contacts_of_node = index.setdefault(contact['Node ID'], {})
+            contacts_of_node.setdefault(contact['Ansprechpartner für'], []).append(contact)
+        return index
 
 
 class ConfluenceNodeMapper(metaclass=SingletonMeta):
@@ -464,34 +1417,179 @@ class ConfluenceNodeMapper(metaclass=SingletonMeta):
         return None
 
 
+class NodeStatusEvaluator(metaclass=SingletonMeta):
+    """
+    Evaluates the status of a broker node from its monitoring history. The status is shown on the
+    Confluence page of the node and is the trigger for the email notifications.
+    """
+    __default_threshold_hours_failure = 72
+    __default_days_of_consecutive_imports = 3
+
+    def __init__(self):
+        self.__working_dir = os.getenv('DIR.WORKING')
+        self.__handler = InfoCSVHandler()
+        self.__mapper = ConfluenceNodeMapper()
+        self.__timestamp_handler = TimestampHandler()
+
+    def evaluate_status_of_node(self, node_id: str) -> tuple:
+        df = self.__handler.read_node_history_as_df(os.path.join(self.__working_dir, node_id), node_id)
+        return self.evaluate_status_of_history(node_id, df)
+
+    def evaluate_status_of_history(self, node_id: str, df: pd.DataFrame) -> tuple:
+        """
+        Returns title and color of the status. The history must contain at least the rows of the current year.
+        """
+        df = self.__append_last_year_rows_to_df_if_necessary(node_id, df)
+        if self.__has_csv_a_gap_in_broker_connection(df):
+            return 'GAP IN MONITORING', 'Red'
+        elif self.__is_node_still_testing(node_id, df):
+            return 'TESTING', 'Blue'
+        elif self.__is_node_offline(node_id, df):
+            return 'OFFLINE', 'Red'
+        elif self.__is_node_not_importing(node_id, df):
+            return 'NO IMPORTS', 'Red'
+        elif self.__is_daily_error_rate_above_threshold(df, 10.0):
+            return 'EXTREME ERROR RATE', 'Red'
+        elif self.__is_daily_error_rate_above_threshold(df, 5.0):
+            return 'HIGH ERROR RATE', 'Yellow'
+        elif self.__is_daily_error_rate_above_threshold(df, 1.0):
+            return 'LOW ERROR RATE', 'Yellow'
+        return 'ONLINE', 'Green'
+
+    # TODO test missing
+    def __append_last_year_rows_to_df_if_necessary(self, node_id: str, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        If the CSV has less than set rows, the history of the node is extended to the previous year.
+        """
+        if len(df) < self.__default_days_of_consecutive_imports:
+            current_year = self.__timestamp_handler.get_current_year()
+            last_year = str(int(current_year) - 1)
+            dir_working = os.path.join(self.__working_dir, node_id)
+            df = self.__handler.read_node_history_as_df(dir_working, node_id, start_date=f'{last_year}-01-01 00:00:00+00:00')
+        return df
+
+    def __has_csv_a_gap_in_broker_connection(self, df: pd.DataFrame) -> bool:
+        """
+        Checks if the CSV has a gap in the broker connection by comparing the timestamps.
+        """
+        series = df['date']
+        if series.empty:
+            return False
+        todays_csv = series.iloc[-1]
+        current_date = self.__timestamp_handler.get_current_date()
+        delta = self.__timestamp_handler.get_timedelta_in_absolute_hours(current_date, todays_csv)
+        if delta > 24:
+            return True
+        if len(series) >= 2:
+            yesterdays_csv = series.iloc[-2]
+            delta2 = self.__timestamp_handler.get_timedelta_in_absolute_hours(yesterdays_csv, todays_csv)
+            if delta2 > 24:
+                return True
+        return False
+
+    def __is_node_still_testing(self, node_id: str, df: pd.DataFrame) -> bool:
+        """
+        Checks if the node is still testing by verifying the consecutive days of imports.
+        If the set value for consecutive days is higher than the number of rows in the csv file,
+        the check is dropped and False is returned.
+        """
+        consecutive_imports = self.__mapper.get_node_value_from_mapping_dict(node_id, 'CONSECUTIVE_IMPORT_DAYS')
+        if not consecutive_imports or consecutive_imports is None:
+            consecutive_imports = self.__default_days_of_consecutive_imports
+        series = df['daily_imported']
+        if len(series) < consecutive_imports:
+            return False
+        series = series.str.replace('-', '0')
+        series = pd.to_numeric(series)
+        count = 0
+        for value in series:
+            if value > 0:
+                count += 1
+                if count == consecutive_imports:
+                    return False
+            else:
+                count = 0
+        return True
+
+    def __is_node_offline(self, node_id: str, df: pd.DataFrame) -> bool:
+        last_contact = df['last_contact'].iloc[-1]
+        return self.__is_date_longer_ago_than_set_hours(node_id, last_contact)
+
+    def __is_node_not_importing(self, node_id: str, df: pd.DataFrame) -> bool:
+        last_write = df['last_write'].iloc[-1]
+        if last_write == '-':
+            series = df['last_write']
+            filtered_series = series[series != '-']
+            if filtered_series.empty:
+                return False
+            last_write = filtered_series.iloc[-1]
+        return self.__is_date_longer_ago_than_set_hours(node_id, last_write)
+
+    def __is_date_longer_ago_than_set_hours(self, node_id: str, input_date: str) -> bool:
+        """
+        Checks if the date is longer ago than the set threshold hours.
+        """
+        threshold_hours = self.__mapper.get_node_value_from_mapping_dict(node_id, 'THRESHOLD_HOURS_FAILURE')
+        if not threshold_hours or threshold_hours is None:
+            threshold_hours = self.__default_threshold_hours_failure
+        current_date = self.__timestamp_handler.get_current_date()
+        delta = self.__timestamp_handler.get_timedelta_in_absolute_hours(input_date, current_date)
+        return delta > threshold_hours
+
+    @staticmethod
+    def __is_daily_error_rate_above_threshold(df: pd.DataFrame, threshold: float) -> bool:
+        error_rate = df['daily_error_rate'].iloc[-1]
+        if error_rate == '-':
+            return False
+        return float(error_rate) >= threshold
+
+
 class MailServerConnection(metaclass=SingletonABCMeta):
     """
-    Creates a connection with an external mail server.
+    Creates a connection with an external mail server. The server is connected via SSL unless
+    'SMTP.USE_SSL' is disabled, e.g. for a local mail server. The user logs in only if the server
+    supports authentication.
     """
 
     def __init__(self):
         self._user = os.getenv('SMTP.USERNAME')
-        self.__host = os.getenv('SMTP.SERVER')
         self.__password = os.getenv('SMTP.PASSWORD')
         self._connection = None
 
     def _connect(self):
-        self._connection = SMTP(self.__host)
-        self._connection.login(self._user, self.__password)
+        """
+        Server and SSL are resolved on each connect, as the sender may be created before the config is loaded
+        """
+        host = os.getenv('SMTP.SERVER')
+        if os.getenv('SMTP.USE_SSL', 'True').lower() == 'true':
+            self._connection = SMTP_SSL(host)
+        else:
+            self._connection = SMTP(host)
+        try:
+            self._connection.ehlo_or_helo_if_needed()
+            if self._connection.has_extn('auth'):
+                self._connection.login(self._user, self.__password)
+        except Exception:
+            self._close()
+            raise
 
     def _close(self):
         if self._connection:
             self._connection.close()
+            self._connection = None
 
 
 class MailSender(MailServerConnection):
     """
-    Class responsible for sending emails using the mail server connection.
+    Class responsible for sending emails using the mail server connection. By default, each mail
+    is sent via its own connection. Inside a session, all mails are sent via a single connection,
+    which is opened on the first mail and reopened once if it was lost.
     """
 
     def __init__(self):
         super().__init__()
         self.__static_recipients = os.getenv('SMTP.STATIC_RECIPIENTS').split(',')
+        self.__session_depth = 0
 
     def __enter__(self):
         self._connect()
@@ -500,15 +1598,226 @@ class MailSender(MailServerConnection):
     def __exit__(self, exc_type, exc_val, exc_tb):
         self._close()
 
+    @contextmanager
+    def session(self):
+        """
+        Nested sessions are merged into the outermost one
+        """
+        self.__session_depth += 1
+        try:
+            yield self
+        finally:
+            self.__session_depth -= 1
+            if self.__session_depth == 0:
+                self._close()
+
     def send_mail(self, recipients: list, mail: MIMEText):
-        with self:
-            mail['From'] = self._user
-            recipients.extend(self.__static_recipients)
-            recipients = list(set(recipients))  # Remove duplicates
-            mail['To'] = ', '.join(recipients)
+        recipients = self.__add_recipients_to_mail(recipients, mail)
+        if self.__session_depth == 0:
+            with self:
+                self._connection.sendmail(self._user, recipients, mail.as_string())
+        else:
+            self.__send_mail_in_session(recipients, mail)
+
+    def send_mails(self, mails: list) -> list:
+        """
+        Sends a batch of (recipients, mail) tuples in a single session. A failed mail does not abort
+        the batch. Returns the tuples of the mails that could not be sent.
+        """
+        failed = []
+        with self.session():
+            for recipients, mail in mails:
+                try:
+                    self.send_mail(recipients, mail)
+                except Exception as e:
+                    logging.error('Mail to %s could not be sent: %s', recipients, e)
+                    failed.append((recipients, mail))
+        return failed
+
+    def __add_recipients_to_mail(self, recipients: list, mail: MIMEText) -> list:
+        """
+        Returns the recipients with the static recipients and without duplicates
+        """
+        recipients = list(dict.fromkeys(recipients + self.__static_recipients))
+        del mail['From']
+        mail['From'] = self._user
+        del mail['To']
+        mail['To'] = ', '.join(recipients)
+        return recipients
+
+    def __send_mail_in_session(self, recipients: list, mail: MIMEText):
+        if self._connection is None:
+            self._connect()
+        try:
+            self._connection.sendmail(self._user, recipients, mail.as_string())
+        except (SMTPServerDisconnected, ConnectionError, TimeoutError):
+            self._close()
+            self._connect()
             self._connection.sendmail(self._user, recipients, mail.as_string())
 
 
+class MailOutbox(metaclass=SingletonMeta):
+    """
+    Durable outbox for mails in a spool directory of the working directory. Each mail is enqueued
+    atomically as a JSON file, which is named after the hash of its recipients and content, so an
+    identical mail is only queued once. While delivering, a background worker sends the queued mails
+    via a single mail server session. Failed mails are retried with exponential backoff starting at
+    'SMTP.RETRY_SECONDS' and are moved to the folder 'failed' after 'SMTP.MAX_ATTEMPTS' attempts.
+    Unreadable entries are moved there right away. Mails which are not due at the end of a delivery
+    stay queued for the next run.
+    """
+    __dirname: str = 'outbox'
+    __failed_dirname: str = 'failed'
+    __encoding: str = 'utf-8'
+
+    def __init__(self):
+        self.__sender = MailSender()
+        self.__wakeup = threading.Event()
+        self.__stopping = threading.Event()
+
+    def __get_spool_dir(self) -> str:
+        return os.path.join(os.getenv('DIR.WORKING'), self.__dirname)
+
+    def enqueue_mail(self, recipients: list, mail: MIMEText, metadata: dict = None) -> bool:
+        """
+        The metadata is kept with the mail and passed to the callback of delivering() once the mail
+        was sent. Returns False if an identical mail is already queued
+        """
+        spool_dir = self.__get_spool_dir()
+        os.makedirs(spool_dir, exist_ok=True)
+        path = os.path.join(spool_dir, f'{self.__compute_mail_hash(recipients, mail)}.json')
+        if os.path.exists(path):
+            return False
+        entry = {'recipients': recipients, 'mail': mail.as_string(), 'metadata': metadata or {}, 'attempts': 0, 'next_attempt': time.time()}
+        self.__write_entry_atomically(entry, path)
+        self.__wakeup.set()
+        return True
+
+    def __compute_mail_hash(self, recipients: list, mail: MIMEText) -> str:
+        """
+        Sender and recipient headers are set on delivery and are not part of the hash
+        """
+        content = json.dumps([sorted(set(recipients)), mail['Subject'], mail.get_payload()])
+        return hashlib.sha256(content.encode(self.__encoding)).hexdigest()
+
+    def __write_entry_atomically(self, entry: dict, path: str):
+        """
+        The entry is written to a temporary file first, so the worker never reads a partial entry
+        """
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding=self.__encoding) as file:
+            json.dump(entry, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def delivering(self, on_delivered: Callable[[dict], None] = None):
+        """
+        Delivers the queued mails in a background thread while the block is executed. On exit, the
+        mails that are due are delivered before returning. on_delivered is called with the metadata
+        of each sent mail
+        """
+        self.__stopping.clear()
+        worker = threading.Thread(target=self.__deliver_until_stopped, args=(on_delivered,), name='mail-outbox', daemon=True)
+        worker.start()
+        try:
+            yield self
+        finally:
+            self.__stopping.set()
+            self.__wakeup.set()
+            worker.join()
+
+    def __deliver_until_stopped(self, on_delivered: Callable[[dict], None]):
+        """
+        An unexpected error is logged and the delivery is retried after 'SMTP.RETRY_SECONDS',
+        so the worker keeps running until the end of the block
+        """
+        with self.__sender.session():
+            while True:
+                is_stopping = self.__stopping.is_set()
+                self.__wakeup.clear()
+                try:
+                    next_attempt = self.deliver_due_mails(on_delivered)
+                except Exception:
+                    logging.exception('Delivery of the outbox failed')
+                    next_attempt = time.time() + float(os.getenv('SMTP.RETRY_SECONDS', '30'))
+                if is_stopping:
+                    break
+                timeout = None if next_attempt is None else max(next_attempt - time.time(), 0)
+                self.__wakeup.wait(timeout)
+
+    def deliver_due_mails(self, on_delivered: Callable[[dict], None] = None) -> float:
+        """
+        Returns the time of the next attempt of the mails remaining in the outbox, or None if it is empty.
+        Entries which were removed in the meantime (e.g. by a concurrent run) are skipped
+        """
+        spool_dir = self.__get_spool_dir()
+        if not os.path.isdir(spool_dir):
+            return None
+        next_attempts = []
+        for filename in sorted(os.listdir(spool_dir)):
+            path = os.path.join(spool_dir, filename)
+            if not filename.endswith('.json'):
+                continue
+            try:
+                entry = self.__load_entry(path)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logging.error('Entry %s of the outbox is unreadable and was moved to the failed mails: %s', filename, e)
+                self.__move_entry_to_failed(path)
+                continue
+            if entry['next_attempt'] <= time.time():
+                entry = self.__deliver_entry(entry, path, on_delivered)
+            if entry is not None:
+                next_attempts.append(entry['next_attempt'])
+        return min(next_attempts) if next_attempts else None
+
+    def __load_entry(self, path: str) -> dict:
+        with open(path, encoding=self.__encoding) as file:
+            entry = json.load(file)
+        if not isinstance(entry['recipients'], list) or not isinstance(entry['mail'], str):
+            raise ValueError('invalid recipients or mail')
+        entry['attempts'] = int(entry['attempts'])
+        entry['next_attempt'] = float(entry['next_attempt'])
+        entry.setdefault('metadata', {})
+        return entry
+
+    def __move_entry_to_failed(self, path: str):
+        failed_dir = os.path.join(os.path.dirname(path), self.__failed_dirname)
+        os.makedirs(failed_dir, exist_ok=True)
+        try:
+            os.replace(path, os.path.join(failed_dir, os.path.basename(path)))
+        except FileNotFoundError:
+            pass
+
+    def __deliver_entry(self, entry: dict, path: str, on_delivered: Callable[[dict], None]):
+        """
+        Returns the updated entry if the mail remains in the outbox
+        """
+        try:
+            self.__sender.send_mail(entry['recipients'], message_from_string(entry['mail']))
+        except Exception as e:
+            entry['attempts'] += 1
+            if entry['attempts'] >= int(os.getenv('SMTP.MAX_ATTEMPTS', '5')):
+                logging.error('Mail to %s failed %d times and was moved to the failed mails: %s', entry['recipients'], entry['attempts'], e)
+                self.__move_entry_to_failed(path)
+                return None
+            entry['next_attempt'] = time.time() + float(os.getenv('SMTP.RETRY_SECONDS', '30')) * 2 ** (entry['attempts'] - 1)
+            logging.warning('Mail to %s could not be sent and will be retried: %s', entry['recipients'], e)
+            self.__write_entry_atomically(entry, path)
+            return entry
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        logging.info('Mail to %s was sent', entry['recipients'])
+        if on_delivered is not None:
+            on_delivered(entry['metadata'])
+        return None
+
+
 class ConfigReader(metaclass=SingletonMeta):
     """
     This class should be called by every other script on startup!
@@ -532,6 +1841,22 @@ class ConfigReader(metaclass=SingletonMeta):
         'AKTIN.DWH_VERSION',
         'AKTIN.I2B2_VERSION'
     }
+    __optional_keys = {
+        'BROKER.MAX_WORKERS': 1,
+        'BROKER.POOL_SIZE': 10,
+        'BROKER.KEEP_ALIVE': True,
+        'BROKER.MAX_CONCURRENT_REQUESTS': 10,
+        'STORAGE.BACKEND': 'csv',
+        'STORAGE.SQLITE_PATH': '',
+        'CONFLUENCE.MAX_WORKERS': 1,
+        'CONFLUENCE.RENDER_PROCESSES': os.cpu_count() or 1,
+        'CONFLUENCE.REQUESTS_PER_SECOND': 0,
+        'CONFLUENCE.CONTACTS_CACHE_MINUTES': 60,
+        'SMTP.STATUS_SOURCE': 'local',
+        'SMTP.USE_SSL': True,
+        'SMTP.MAX_ATTEMPTS': 5,
+        'SMTP.RETRY_SECONDS': 30
+    }
 
     def load_config_as_env_vars(self, path: str):
         properties = self.__load_config_file(path)
@@ -542,6 +1867,8 @@ class ConfigReader(metaclass=SingletonMeta):
                 os.environ[key] = ','.join(flattened_props.get(key))
             else:
                 os.environ[key] = flattened_props.get(key)
+        for key, default in self.__optional_keys.items():
+            os.environ[key] = str(flattened_props.get(key, default))
 
     @staticmethod
     def __load_config_file(path: str) -> dict:
@@ -21,20 +21,27 @@ Created on 22.03.2022
 #
 #
 
+import copy
+import hashlib
 import json
 import logging
+import multiprocessing
 import os
 import sys
+import threading
 
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
 
 import bs4
 import pandas as pd
 from bs4.element import Tag
 from packaging import version
 
-from common import Main, CSVHandler, ConfluenceConnection, ConfluenceNodeMapper, ErrorCSVHandler, InfoCSVHandler, \
-    ResourceLoader, SingletonABCMeta, SingletonMeta, TimestampHandler
+from common import Main, CSVHandler, ConfluenceConnection, ConfluenceContactsDirectory, ConfluenceNodeMapper, ErrorCSVHandler, \
+    InfoCSVHandler, NodeStatusEvaluator, ResourceLoader, SingletonABCMeta, SingletonMeta, StorageBackend, TextWriter, \
+    TimestampHandler
 
 
 class TemplatePageLoader(ResourceLoader):
@@ -55,46 +62,64 @@ class TemplatePageLoader(ResourceLoader):
 class TemplatePageElementCreator(metaclass=SingletonMeta):
     """
     Creates commonly used html and confluence elements. Is also used to convert string
-    template of confluence page to a searchable html soup
+    template of confluence page to a searchable html soup. All elements are created by
+    a single soup, and parsed static fragments are kept to be copied on further requests
     """
     __parser: str = 'html.parser'
 
+    def __init__(self):
+        self.__soup = bs4.BeautifulSoup(features=self.__parser)
+        self.__static_fragments = {}
+
     def create_ac_parameter_element(self, name: str, content: str) -> Tag:
-        parameter = bs4.BeautifulSoup(features=self.__parser).new_tag('ac:parameter', attrs={'ac:name': name})
+        parameter = self.__soup.new_tag('ac:parameter', attrs={'ac:name': name})
         parameter.append(content)
         return parameter
 
     def create_ac_macro_element(self, name: str) -> Tag:
         attributes = {'ac:name': name, 'ac:schema-version': '1'}
-        macro = bs4.BeautifulSoup(features=self.__parser).new_tag('ac:structured-macro', attrs=attributes)
+        macro = self.__soup.new_tag('ac:structured-macro', attrs=attributes)
         return macro
 
-    def create_ac_link_element(self, pagename: str) -> bs4.BeautifulSoup:
-        """
-        bs4 seems not to be supporting self-closing HTML-Tags
-        """
-        link = f'<ac:link><ri:page ri:content-title="{pagename}" /></ac:link>'
-        link = self.convert_element_to_soup(link)
+    def create_ac_link_element(self, pagename: str) -> Tag:
+        link = self.__soup.new_tag('ac:link')
+        link.append(self.__soup.new_tag('ri:page', attrs={'ri:content-title': pagename}))
         return link
 
     def create_th_html_element(self, name: str) -> Tag:
-        header = bs4.BeautifulSoup(features=self.__parser).new_tag('th', attrs={'style': 'text-align: center;'})
+        header = self.__soup.new_tag('th', attrs={'style': 'text-align: center;'})
         header.append(name)
         return header
 
     def create_td_html_element(self, content: str, centered=False) -> Tag:
         attributes = {'style': 'text-align: center;'} if centered else {}
-        data = bs4.BeautifulSoup(features=self.__parser).new_tag('td', attrs=attributes)
+        data = self.__soup.new_tag('td', attrs=attributes)
         data.append(content)
         return data
 
     def create_html_element(self, elem_type: str, attributes=None) -> Tag:
         attributes = attributes or {}
-        return bs4.BeautifulSoup(features=self.__parser).new_tag(elem_type, attrs=attributes)
+        return self.__soup.new_tag(elem_type, attrs=attributes)
 
     def convert_element_to_soup(self, elem) -> bs4.BeautifulSoup:
+        """
+        Elements are copied into a new soup instead of being serialized and parsed again
+        """
+        if isinstance(elem, Tag):
+            soup = bs4.BeautifulSoup(features=self.__parser)
+            soup.append(copy.copy(elem))
+            return soup
         return bs4.BeautifulSoup(str(elem), self.__parser)
 
+    def convert_static_fragment_to_soup(self, fragment: str) -> bs4.BeautifulSoup:
+        """
+        For fragments that do not change during a run (like the page template). Each fragment is
+        parsed only once, and a copy is returned, so the cached soup is never modified.
+        """
+        if fragment not in self.__static_fragments:
+            self.__static_fragments[fragment] = bs4.BeautifulSoup(fragment, self.__parser)
+        return copy.copy(self.__static_fragments[fragment])
+
     def get_parser(self) -> str:
         return self.__parser
 
@@ -102,22 +127,42 @@ class TemplatePageElementCreator(metaclass=SingletonMeta):
 class TemplatePageContentWriter(ABC, metaclass=SingletonABCMeta):
     """
     Base class for writing content to a Confluence page.
+    The node and the page of the current call are kept per thread, so the pages of
+    several nodes can be written concurrently.
     """
     _encoding: str = 'utf-8'
 
     def __init__(self):
         self._creator = TemplatePageElementCreator()
         self._working_dir = os.getenv('DIR.WORKING')
-        self._node_id = None
-        self._node_working_dir = None
-        self._page_template = None
+        self._current = threading.local()
+
+    @property
+    def _node_id(self) -> str:
+        return self._current.node_id
+
+    @property
+    def _node_working_dir(self) -> str:
+        return self._current.node_working_dir
+
+    @property
+    def _page_template(self) -> bs4.BeautifulSoup:
+        return self._current.page_template
 
     def add_content_to_template_page(self, template_page: str, node_id: str) -> str:
-        self._node_id = node_id
-        self._node_working_dir = os.path.join(self._working_dir, node_id)
-        self._page_template = bs4.BeautifulSoup(template_page, self._creator.get_parser())
+        page_template = bs4.BeautifulSoup(template_page, self._creator.get_parser())
+        return str(self.add_content_to_template_soup(page_template, node_id))
+
+    def add_content_to_template_soup(self, page_template: bs4.BeautifulSoup, node_id: str) -> bs4.BeautifulSoup:
+        """
+        Writes the content directly into the given soup, so several writers can share a page that is
+        parsed and serialized only once.
+        """
+        self._current.node_id = node_id
+        self._current.node_working_dir = os.path.join(self._working_dir, node_id)
+        self._current.page_template = page_template
         self._add_content_to_template_soup()
-        return str(self._page_template)
+        return self._page_template
 
     @abstractmethod
     def _add_content_to_template_soup(self):
@@ -133,6 +178,7 @@ class TemplatePageNodeResourceWriter(TemplatePageContentWriter):
     The content of the 'versions' resource is more static compared to other resources. Each value is written into a
     predefined element. The other resources are concatenated and added to the page.
     """
+    __writer = TextWriter()
 
     def _add_content_to_template_soup(self):
         self.__add_versions_to_template_soup()
@@ -170,11 +216,9 @@ class TemplatePageNodeResourceWriter(TemplatePageContentWriter):
     def __load_node_resource_as_dict(self, resource_name: str) -> dict:
         filename = ''.join([self._node_id, '_', resource_name, '.txt'])
         filepath = os.path.join(self._node_working_dir, filename)
-        if not os.path.exists(filepath):
+        if not self.__writer.does_file_exist(filepath):
             return {}
-        with open(filepath, encoding=self._encoding) as file:
-            resource = json.load(file)
-        return resource
+        return self.__writer.load_txt_file_as_dict(filepath)
 
     @staticmethod
     def __get_value_of_dict(dictionary: dict, key: str) -> str:
@@ -252,22 +296,10 @@ class ConfluenceClinicContactGrabber(TemplatePageContentWriter):
     Searches another Confluence page for correspondents of a broker node ID.
     Correspondents are written as a table into the template.
     """
-    __confluence_email_list: str = 'E-Mail-Verteiler'
 
     def __init__(self):
         super().__init__()
-        self.__email_df = self.__grab_email_contacts_dataframe()
-
-    def __grab_email_contacts_dataframe(self) -> pd.DataFrame:
-        confluence = ConfluenceConnection()
-        confluence_email_page = confluence.get_page_content(self.__confluence_email_list)
-        email_table = pd.read_html(confluence_email_page)
-        df = email_table[0]
-        df.columns=df.iloc[0]
-        df = df.iloc[1:].reset_index(drop=True)
-        df['Node ID'] = pd.to_numeric(df['Node ID'])
-        df = df.fillna('')
-        return df
+        self.__contacts = ConfluenceContactsDirectory()
 
     def _add_content_to_template_soup(self):
         """
@@ -293,12 +325,8 @@ class ConfluenceClinicContactGrabber(TemplatePageContentWriter):
         """
         contact_type must be either 'IT' or 'Notaufnahme'
         """
-        list_idx = self.__email_df.index[self.__email_df['Node ID'] == int(self._node_id)].tolist()
-        df_node = self.__email_df.iloc[list_idx]
-        df_contacts = df_node[df_node['Ansprechpartner für'] == contact_type]
         contacts = {}
-        for row in df_contacts.iterrows():
-            row = row[1]
+        for row in self.__contacts.get_contacts_of_node(self._node_id, contact_type):
             name = ' '.join([row['Titel'], row['Vorname'], row['Nachname']])
             name = name.strip()
             contacts[name] = row['Kontakt']
@@ -373,20 +401,15 @@ class TemplatePageCSVContentWriter(TemplatePageContentWriter, ABC):
     def __init__(self):
         super().__init__()
         self._timestamp_handler = TimestampHandler()
-        self._df = None
 
-    def add_content_to_template_page(self, template_page: str, node_id: str) -> str:
-        self._node_id = node_id
-        self._page_template = bs4.BeautifulSoup(template_page, self._creator.get_parser())
-        dir_working = os.path.join(self._working_dir, node_id)
-        self._df = self.__load_csv_as_df(node_id, dir_working)
-        self._add_content_to_template_soup()
-        return str(self._page_template)
+    @property
+    def _df(self) -> pd.DataFrame:
+        return self._current.df
 
-    def __load_csv_as_df(self, node_id: str, working_dir: str) -> pd.DataFrame:
-        name_csv = self._handler.generate_node_csv_name(node_id)
-        path_csv = os.path.join(working_dir, name_csv)
-        return self._handler.read_csv_as_df(path_csv)
+    def add_content_to_template_soup(self, page_template: bs4.BeautifulSoup, node_id: str) -> bs4.BeautifulSoup:
+        dir_working = os.path.join(self._working_dir, node_id)
+        self._current.df = self._handler.read_node_history_as_df(dir_working, node_id)
+        return super().add_content_to_template_soup(page_template, node_id)
 
 
 # TODO bei last-import soll der tatsächliche last import stehen
@@ -506,126 +529,20 @@ class TemplatePageCSVErrorWriter(TemplatePageCSVContentWriter):
 class TemplatePageStatusChecker(TemplatePageCSVContentWriter):
     """
     Checks import and connection status inside (template of) confluence page and sets
-    status as a custom HTML element.
+    status as a custom HTML element. The status itself is evaluated by NodeStatusEvaluator.
     Should always be the last class called in the processing pipeline!
     """
-    __default_threshold_hours_failure = 72
-    __default_days_of_consecutive_imports = 3
 
     def __init__(self):
         super().__init__()
         self._handler = InfoCSVHandler()
-        self._mapper = ConfluenceNodeMapper()
+        self.__evaluator = NodeStatusEvaluator()
 
     def _add_content_to_template_soup(self):
-        self.__append_last_year_rows_to_df_if_necessary()
-        if self.__has_csv_a_gap_in_broker_connection():
-            status = self.__create_status_element('GAP IN MONITORING', 'Red')
-        elif self.__is_template_soup_still_testing():
-            status = self.__create_status_element('TESTING', 'Blue')
-        elif self.__is_template_soup_offline():
-            status = self.__create_status_element('OFFLINE', 'Red')
-        elif self.__is_template_soup_not_importing():
-            status = self.__create_status_element('NO IMPORTS', 'Red')
-        elif self.__is_template_soup_daily_error_rate_above_threshold(10.0):
-            status = self.__create_status_element('EXTREME ERROR RATE', 'Red')
-        elif self.__is_template_soup_daily_error_rate_above_threshold(5.0):
-            status = self.__create_status_element('HIGH ERROR RATE', 'Yellow')
-        elif self.__is_template_soup_daily_error_rate_above_threshold(1.0):
-            status = self.__create_status_element('LOW ERROR RATE', 'Yellow')
-        else:
-            status = self.__create_status_element('ONLINE', 'Green')
+        title, color = self.__evaluator.evaluate_status_of_history(self._node_id, self._df)
+        status = self.__create_status_element(title, color)
         self._page_template.find(class_='status').replace_with(status)
 
-    # TODO test missing
-    def __append_last_year_rows_to_df_if_necessary(self):
-        """
-        If the CSV has less than set rows, try to append the previous year's CSV
-        to this CSV.
-        """
-        if len(self._df) < self.__default_days_of_consecutive_imports:
-            current_year = self._timestamp_handler.get_current_year()
-            last_year = str(int(current_year) - 1)
-            last_years_csv_name = self._handler.generate_node_csv_name(self._node_id, last_year)
-            last_years_csv_path = os.path.join(self._working_dir, self._node_id, last_years_csv_name)
-            if os.path.isfile(last_years_csv_path):
-                last_years_df = self._handler.read_csv_as_df(last_years_csv_path)
-                self._df = pd.concat([last_years_df, self._df], ignore_index=True)
-
-    def __has_csv_a_gap_in_broker_connection(self) -> bool:
-        """
-        Checks if the CSV has a gap in the broker connection by comparing the timestamps.
-        """
-        series = self._df['date']
-        if series.empty:
-            return False
-        todays_csv = series.iloc[-1]
-        current_date = self._timestamp_handler.get_current_date()
-        delta = self._timestamp_handler.get_timedelta_in_absolute_hours(current_date, todays_csv)
-        if delta > 24:
-            return True
-        if len(series) >= 2:
-            yesterdays_csv = series.iloc[-2]
-            delta2 = self._timestamp_handler.get_timedelta_in_absolute_hours(yesterdays_csv, todays_csv)
-            if delta2 > 24:
-                return True
-        return False
-
-    def __is_template_soup_still_testing(self) -> bool:
-        """
-        Checks if the node is still testing by verifying the consecutive days of imports.
-        If the set value for consecutive days is higher than the number of rows in the csv file,
-        the check is dropped and False is returned.
-        """
-        consecutive_imports = self._mapper.get_node_value_from_mapping_dict(self._node_id, 'CONSECUTIVE_IMPORT_DAYS')
-        if not consecutive_imports or consecutive_imports is None:
-            consecutive_imports = self.__default_days_of_consecutive_imports
-        series = self._df['daily_imported']
-        if len(series) < consecutive_imports:
-            return False
-        series = series.str.replace('-', '0')
-        series = pd.to_numeric(series)
-        count = 0
-        for value in series:
-            if value > 0:
-                count += 1
-                if count == consecutive_imports:
-                    return False
-            else:
-                count = 0
-        return True
-
-    def __is_template_soup_offline(self) -> bool:
-        last_contact = self._df['last_contact'].iloc[-1]
-        return self.__is_date_longer_ago_than_set_hours(last_contact)
-
-    def __is_template_soup_not_importing(self) -> bool:
-        last_write = self._df['last_write'].iloc[-1]
-        if last_write == '-':
-            series = self._df['last_write']
-            filtered_series = series[series != '-']
-            if filtered_series.empty:
-                return False
-            last_write = filtered_series.iloc[-1]
-        return self.__is_date_longer_ago_than_set_hours(last_write)
-
-    def __is_date_longer_ago_than_set_hours(self, input_date: str) -> bool:
-        """
-        Checks if the date is longer ago than the set threshold hours.
-        """
-        threshold_hours = self._mapper.get_node_value_from_mapping_dict(self._node_id, 'THRESHOLD_HOURS_FAILURE')
-        if not threshold_hours or threshold_hours is None:
-            threshold_hours = self.__default_threshold_hours_failure
-        current_date = self._timestamp_handler.get_current_date()
-        delta = self._timestamp_handler.get_timedelta_in_absolute_hours(input_date, current_date)
-        return delta > threshold_hours
-
-    def __is_template_soup_daily_error_rate_above_threshold(self, threshold: float) -> bool:
-        error_rate = self._df['daily_error_rate'].iloc[-1]
-        if error_rate == '-':
-            return False
-        return float(error_rate) >= threshold
-
     def __create_status_element(self, title: str, color: str) -> Tag:
         title_param = self._creator.create_ac_parameter_element('title', title)
         color_param = self._creator.create_ac_parameter_element('color', color)
@@ -670,7 +587,7 @@ class TemplatePageMigrator:
         Checks if the provided page_template is outdated compared to the current template.
         """
         current_template = self.__loader.get_template_page()
-        new_template = self.__creator.convert_element_to_soup(current_template)
+        new_template = self.__creator.convert_static_fragment_to_soup(current_template)
         new_version = new_template.find(class_='version_template').string
         old_template = bs4.BeautifulSoup(template_page, 'html.parser')
         old_version = old_template.find(class_='version_template').string
@@ -678,7 +595,7 @@ class TemplatePageMigrator:
 
     def migrate_page_template_to_newer_version(self, template_page: str) -> str:
         current_template = self.__loader.get_template_page()
-        new_template = self.__creator.convert_element_to_soup(current_template)
+        new_template = self.__creator.convert_static_fragment_to_soup(current_template)
         old_template = bs4.BeautifulSoup(template_page, 'html.parser')
         new_template = self.__migrate_key_from_old_to_new_template('online_since', old_template, new_template)
         return str(new_template)
@@ -690,6 +607,121 @@ class TemplatePageMigrator:
         return new_soup
 
 
+@dataclass()
+class NodeSummaryRecord:
+    """
+    Values of a rendered node page that are shown in the summary table
+    """
+    node_id: str
+    common_name: str
+    status_title: str
+    status_color: str
+    interface_import: str
+    last_check: str
+    daily_imported: str
+    daily_updated: str
+    daily_invalid: str
+    daily_failed: str
+    daily_error_rate: str
+    error_rate: str
+
+    @classmethod
+    def from_page_template(cls, page_template: bs4.BeautifulSoup, node_id: str, common_name: str) -> 'NodeSummaryRecord':
+        """
+        Reads the values from the rendered soup, while it is still in memory
+        """
+        status = page_template.find(class_='status')
+        values = {key: page_template.find(class_=key).string for key in (
+            'interface_import', 'last_check', 'daily_imported', 'daily_updated',
+            'daily_invalid', 'daily_failed', 'daily_error_rate', 'error_rate')}
+        return cls(
+            node_id=node_id,
+            common_name=common_name,
+            status_title=str(status.find('ac:parameter', attrs={'ac:name': 'title'}).string),
+            status_color=str(status.find('ac:parameter', attrs={'ac:name': 'color'}).string),
+            **{key: str(value) if value is not None else None for key, value in values.items()})
+
+
+class NodeSummaryRecordStorage(metaclass=SingletonMeta):
+    """
+    Stores the summary record of each node as JSON in the working directory of the node
+    """
+
+    def __init__(self):
+        self.__working_dir = os.getenv('DIR.WORKING')
+        self.__writer = TextWriter()
+
+    def save_record(self, record: NodeSummaryRecord):
+        self.__writer.save_dict_as_txt_file(asdict(record), self.get_record_path(record.node_id))
+
+    def load_record_if_exists(self, node_id: str):
+        path = self.get_record_path(node_id)
+        if not self.__writer.does_file_exist(path):
+            return None
+        return NodeSummaryRecord(**self.__writer.load_txt_file_as_dict(path))
+
+    def get_record_path(self, node_id: str) -> str:
+        return os.path.join(self.__working_dir, node_id, f'{node_id}_summary.json')
+
+
+class NodeInputTracker(metaclass=SingletonMeta):
+    """
+    Tracks the inputs of each node page, so only pages of nodes with changed inputs are rendered again.
+    Inputs are the entries in the working directory of the node (except its summary record), the entry
+    of the node in the mapping JSON, the contacts of the node and the page template. The fingerprints
+    of the inputs of the last uploaded pages are stored in the working directory.
+    """
+    __filename: str = 'confluence_node_fingerprints.json'
+    __encoding: str = 'utf-8'
+
+    def __init__(self):
+        self.__working_dir = os.getenv('DIR.WORKING')
+        self.__path = os.path.join(self.__working_dir, self.__filename)
+        self.__writer = TextWriter()
+        self.__mapper = ConfluenceNodeMapper()
+        self.__contacts = ConfluenceContactsDirectory()
+        self.__records = NodeSummaryRecordStorage()
+        self.__template = TemplatePageLoader().get_template_page()
+        self.__lock = threading.RLock()
+        self.__fingerprints = None
+
+    def compute_fingerprint_of_node(self, node_id: str) -> str:
+        storage = StorageBackend.get_configured_backend()
+        record_path = self.__records.get_record_path(node_id)
+        entries = {}
+        for path in storage.list_entries(os.path.join(self.__working_dir, node_id)):
+            if path != record_path:
+                entries[os.path.basename(path)] = storage.get_content_hash(path)
+        inputs = {
+            'entries': entries,
+            'mapping': self.__mapper.get_node_from_mapping_dict(node_id),
+            'contacts': [self.__contacts.get_contacts_of_node(node_id, contact_type) for contact_type in ('IT', 'Notaufnahme')],
+            'template': self.__template
+        }
+        serialized = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode(self.__encoding)).hexdigest()
+
+    def has_node_changed(self, node_id: str, fingerprint: str) -> bool:
+        return self.__get_fingerprints().get(node_id) != fingerprint
+
+    def save_fingerprint_of_node(self, node_id: str, fingerprint: str):
+        """
+        Should only be called after the page of the node was uploaded
+        """
+        with self.__lock:
+            fingerprints = self.__get_fingerprints()
+            fingerprints[node_id] = fingerprint
+            self.__writer.save_dict_as_txt_file(fingerprints, self.__path)
+
+    def __get_fingerprints(self) -> dict:
+        with self.__lock:
+            if self.__fingerprints is None:
+                self.__fingerprints = {}
+                if self.__writer.does_file_exist(self.__path):
+                    self.__fingerprints = self.__writer.load_txt_file_as_dict(self.__path)
+            return self.__fingerprints
+
+
 class ConfluenceHandler(ABC, metaclass=SingletonABCMeta):
     _confluence_root_page: str = 'Support'
     _confluence_parent_page: str = 'Support Log Broker-Monitor'
@@ -708,8 +740,10 @@ class ConfluencePageHandler(ConfluenceHandler):
     def __init__(self):
         super().__init__()
         self.__loader = TemplatePageLoader()
+        self.__creator = TemplatePageElementCreator()
         self.__start_date_writer = TemplatePageMonitoringStartDateWriter()
         self.__migrator = TemplatePageMigrator()
+        self.__records = NodeSummaryRecordStorage()
         self.__content_writers = [
             TemplatePageClinicInfoWriter(),
             ConfluenceClinicContactGrabber(),
@@ -720,22 +754,60 @@ class ConfluencePageHandler(ConfluenceHandler):
             TemplatePageStatusChecker()
         ]
 
-    def upload_node_information_as_confluence_page(self, node_id: str):
+    def get_current_page_of_node(self, node_id: str) -> str:
+        """
+        Creates the page if it does not exist yet and migrates it to the current template if necessary.
+        The existence of a page is decided by its cached ID, so a page deleted on Confluence is only
+        noticed when its content is requested. It is created again then.
+        """
         common_name = self._mapper.get_node_value_from_mapping_dict(node_id, 'COMMON_NAME')
         if not self._confluence.does_page_exists(common_name):
-            page = self.__loader.get_template_page()
-            page = self.__start_date_writer.add_content_to_template_page(page, node_id)
-            self._confluence.create_confluence_page(common_name, self._confluence_parent_page, page)
-        page = self._confluence.get_page_content(common_name)
+            self.__create_page_of_node(node_id, common_name)
+        try:
+            page = self._confluence.get_page_content(common_name)
+        except Exception as error:
+            if not self._confluence.is_page_not_found_error(error):
+                raise
+            logging.warning('Page %s was not found on Confluence. Creating it again...', common_name)
+            self.__create_page_of_node(node_id, common_name)
+            page = self._confluence.get_page_content(common_name)
         if self.__migrator.is_template_page_outdated(page):
             page = self.__migrator.migrate_page_template_to_newer_version(page)
-        page = self.__write_content_to_page_template(page, node_id)
-        self._confluence.update_confluence_page(common_name, page)
+        return page
+
+    def __create_page_of_node(self, node_id: str, common_name: str):
+        page = self.__loader.get_template_page()
+        page = self.__start_date_writer.add_content_to_template_page(page, node_id)
+        self._confluence.create_confluence_page(common_name, self._confluence_parent_page, page)
+
+    def render_page_of_node(self, page: str, node_id: str) -> tuple:
+        """
+        Returns the rendered page and its summary record
+        """
+        common_name = self._mapper.get_node_value_from_mapping_dict(node_id, 'COMMON_NAME')
+        soup = self.__write_content_to_page_template(page, node_id)
+        return str(soup), NodeSummaryRecord.from_page_template(soup, node_id, common_name)
+
+    def upload_rendered_page_of_node(self, page: str, record: NodeSummaryRecord):
+        self._confluence.update_confluence_page_if_changed(record.common_name, page)
+        self.__records.save_record(record)
 
-    def __write_content_to_page_template(self, template: str, node_id: str) -> str:
+    def __write_content_to_page_template(self, template: str, node_id: str) -> bs4.BeautifulSoup:
+        """
+        The page is parsed once and passed through all content writers before it is serialized again
+        """
+        soup = bs4.BeautifulSoup(template, self.__creator.get_parser())
         for content_writer in self.__content_writers:
-            template = content_writer.add_content_to_template_page(template, node_id)
-        return template
+            soup = content_writer.add_content_to_template_soup(soup, node_id)
+        return soup
+
+
+def render_page_of_node_in_worker_process(page: str, node_id: str) -> tuple:
+    """
+    Entry point for the worker processes of ConfluencePageHandlerManager. The config is
+    inherited via environment variables, the singletons are created on first call
+    """
+    return ConfluencePageHandler().render_page_of_node(page, node_id)
 
 
 class SummaryTableCreator:
@@ -774,31 +846,29 @@ class SummaryTableCreator:
         header.extend([node, interface, last_check, status, todays_imports, todays_errors, todays_error_rate, last_weeks_error_rate])
         return header
 
-    def create_summary_table_row_from_confluence_page(self, commonname: str, confluence_page: str) -> Tag:
-        template = self.__creator.convert_element_to_soup(confluence_page)
-        node_link = self.__creator.create_ac_link_element(commonname)
+    def create_summary_table_row_from_record(self, record: NodeSummaryRecord) -> Tag:
+        node_link = self.__creator.create_ac_link_element(record.common_name)
         node = self.__creator.create_html_element('td', {'style': 'text-align: left;'})
         node.append(node_link)
-        status_element = template.find(class_='status')
-        interface = self.__create_table_data_from_page_template_key(template, 'interface_import')
-        status = self.__creator.create_td_html_element(status_element.contents[0], centered=True)
-        last_check = self.__create_table_data_from_page_template_key(template, 'last_check')
-        todays_error_rate = self.__create_table_data_from_page_template_key(template, 'daily_error_rate')
-        last_weeks_error_rate = self.__create_table_data_from_page_template_key(template, 'error_rate')
-        todays_imports = self.__get_sum_of_two_table_data_elements(template, 'daily_imported', 'daily_updated')
-        todays_errors = self.__get_sum_of_two_table_data_elements(template, 'daily_invalid', 'daily_failed')
+        interface = self.__creator.create_td_html_element(record.interface_import, centered=True)
+        status = self.__creator.create_td_html_element(self.__create_status_macro(record), centered=True)
+        last_check = self.__creator.create_td_html_element(record.last_check, centered=True)
+        todays_error_rate = self.__creator.create_td_html_element(record.daily_error_rate, centered=True)
+        last_weeks_error_rate = self.__creator.create_td_html_element(record.error_rate, centered=True)
+        todays_imports = self.__get_sum_of_two_values_as_table_data(record.daily_imported, record.daily_updated)
+        todays_errors = self.__get_sum_of_two_values_as_table_data(record.daily_invalid, record.daily_failed)
         row = self.__creator.create_html_element('tr')
         row.extend([node, interface, last_check, status, todays_imports, todays_errors, todays_error_rate, last_weeks_error_rate])
         return row
 
-    def __create_table_data_from_page_template_key(self, template_page: bs4.BeautifulSoup, key: str) -> Tag:
-        value = template_page.find(class_=key).string
-        td = self.__creator.create_td_html_element(value, centered=True)
-        return td
+    def __create_status_macro(self, record: NodeSummaryRecord) -> Tag:
+        title_param = self.__creator.create_ac_parameter_element('title', record.status_title)
+        color_param = self.__creator.create_ac_parameter_element('color', record.status_color)
+        macro = self.__creator.create_ac_macro_element('status')
+        macro.extend([title_param, color_param])
+        return macro
 
-    def __get_sum_of_two_table_data_elements(self, template_page: bs4.BeautifulSoup, key1: str, key2: str) -> Tag:
-        value1 = template_page.find(class_=key1).string
-        value2 = template_page.find(class_=key2).string
+    def __get_sum_of_two_values_as_table_data(self, value1: str, value2: str) -> Tag:
         if value1 == '-' and value2 == '-':
             sum_values = '-'
         else:
@@ -808,6 +878,7 @@ class SummaryTableCreator:
         td = self.__creator.create_td_html_element(str(sum_values), centered=True)
         return td
 
+
 class ConfluencePageHandlerManager(ConfluenceHandler):
     """
     Manages ConfluencePageHandlers for each broker node and performs various operations.
@@ -816,43 +887,155 @@ class ConfluencePageHandlerManager(ConfluenceHandler):
     def __init__(self):
         super().__init__()
         self.__working_dir = os.getenv('DIR.WORKING')
-        self.__resources_dir = os.getenv('DIR.RESOURCES')
-        self.__space = os.getenv('CONFLUENCE.SPACE')
         self.__handler = ConfluencePageHandler()
         self.__summary = SummaryTableCreator()
-        self.__csv_handler = InfoCSVHandler()
-        self.__creator = TemplatePageElementCreator()
+        self.__records = NodeSummaryRecordStorage()
+        self.__tracker = NodeInputTracker()
+        self.__evaluator = NodeStatusEvaluator()
+        self.__max_workers = int(os.getenv('CONFLUENCE.MAX_WORKERS', '1'))
+        self.__render_processes = int(os.getenv('CONFLUENCE.RENDER_PROCESSES', str(os.cpu_count() or 1)))
         self.__init_parent_page()
 
     def __init_parent_page(self):
         if not self._confluence.does_page_exists(self._confluence_parent_page):
             self._confluence.create_confluence_page(self._confluence_parent_page, self._confluence_root_page, "")
 
-    def upload_node_information_as_confluence_pages(self):
-        node_ids = self._mapper.get_all_keys()
-        for node_id in node_ids:
+    def upload_confluence_pages(self, full: bool = False):
+        """
+        Uploads the node pages and the summary in a single run, sharing the loaded caches and the
+        connection. The summary is built from the records of the last uploaded node pages, so it is
+        uploaded even if a node page failed.
+        """
+        try:
+            self.upload_node_information_as_confluence_pages(full)
+        finally:
+            self.upload_summary_for_confluence_pages()
+
+    def upload_node_information_as_confluence_pages(self, full: bool = False):
+        """
+        Only pages of nodes with changed inputs or a changed status are rendered, unless full is set.
+        By default, the pages are rendered by a worker process per CPU and pipelined with the Confluence
+        requests. Without 'CONFLUENCE.RENDER_PROCESSES' and 'CONFLUENCE.MAX_WORKERS', nodes are processed
+        one after another. A failing node is logged and does not abort the upload of the other node pages.
+        """
+        node_ids = []
+        for node_id in self._mapper.get_all_keys():
             node_dir = os.path.join(self.__working_dir, node_id)
             if os.path.isdir(node_dir):
-                self.__handler.upload_node_information_as_confluence_page(node_id)
+                node_ids.append(node_id)
             else:
                 logging.info('Directory for id %s not found. Skipping...', node_id)
+        self._confluence.load_child_pages_into_cache(self._confluence_parent_page)
+        fingerprints = {node_id: self.__tracker.compute_fingerprint_of_node(node_id) for node_id in node_ids}
+        if not full:
+            node_ids = [node_id for node_id in node_ids if self.__is_node_page_outdated(node_id, fingerprints[node_id])]
+            logging.info('Rendering %d of %d node pages, the others are unchanged', len(node_ids), len(fingerprints))
+        if self.__max_workers <= 1 and self.__render_processes <= 0:
+            results = [self.__upload_single_node_page(node_id, fingerprints[node_id]) for node_id in node_ids]
+        else:
+            results = self.__upload_node_pages_pipelined(node_ids, fingerprints)
+        failed_nodes = [node_id for node_id, success in zip(node_ids, results) if not success]
+        if failed_nodes:
+            logging.warning('Uploading failed for %d of %d node pages: %s', len(failed_nodes), len(node_ids), failed_nodes)
+        logging.info('%d unchanged Confluence pages were not updated', self._confluence.get_skipped_updates())
+
+    def __is_node_page_outdated(self, node_id: str, fingerprint: str) -> bool:
+        """
+        If the inputs of the node did not change, only the status is evaluated again, as it
+        depends on the current time and may change even if the data of the node did not
+        """
+        if self.__tracker.has_node_changed(node_id, fingerprint):
+            return True
+        common_name = self._mapper.get_node_value_from_mapping_dict(node_id, 'COMMON_NAME')
+        record = self.__records.load_record_if_exists(node_id)
+        if record is None or not self._confluence.does_page_exists(common_name):
+            return True
+        return self.__evaluator.evaluate_status_of_node(node_id) != (record.status_title, record.status_color)
+
+    def __upload_node_pages_pipelined(self, node_ids: list, fingerprints: dict) -> list:
+        """
+        Confluence requests of the nodes run in a bounded thread pool. The CPU-bound rendering runs in
+        a pool of worker processes, or in the threads, if no processes are configured. Worker processes
+        are spawned to not inherit the locks of running threads.
+        Returns whether the page of each node was uploaded.
+        """
+        with ThreadPoolExecutor(max(self.__max_workers, 1)) as io_pool:
+            if self.__render_processes <= 0:
+                futures = [io_pool.submit(self.__upload_single_node_page, node_id, fingerprints[node_id]) for node_id in node_ids]
+                return [future.result() for future in futures]
+            with ProcessPoolExecutor(self.__render_processes, mp_context=multiprocessing.get_context('spawn')) as render_pool:
+                uploaded = self.__upload_node_pages_in_stages(node_ids, fingerprints, io_pool, render_pool)
+        return [node_id in uploaded for node_id in node_ids]
+
+    def __upload_node_pages_in_stages(self, node_ids: list, fingerprints: dict, io_pool: ThreadPoolExecutor, render_pool: ProcessPoolExecutor) -> set:
+        """
+        The page of each node is downloaded by the threads, rendered by the worker processes and uploaded
+        by the threads again. A node is passed to the next stage as soon as its previous stage is done,
+        so pages are rendered in parallel even with a single thread.
+        Returns the IDs of the uploaded nodes.
+        """
+        downloads = {io_pool.submit(self.__handler.get_current_page_of_node, node_id): node_id for node_id in node_ids}
+        renders = {}
+        for future in as_completed(downloads):
+            node_id = downloads[future]
+            page = self.__get_result_of_node_stage(future, node_id)
+            if page is not None:
+                renders[render_pool.submit(render_page_of_node_in_worker_process, page, node_id)] = node_id
+        uploads = {}
+        for future in as_completed(renders):
+            node_id = renders[future]
+            rendered = self.__get_result_of_node_stage(future, node_id)
+            if rendered is not None:
+                uploads[io_pool.submit(self.__upload_rendered_page_of_node, node_id, fingerprints[node_id], *rendered)] = node_id
+        return {uploads[future] for future in as_completed(uploads) if self.__get_result_of_node_stage(future, uploads[future])}
+
+    @staticmethod
+    def __get_result_of_node_stage(future: Future, node_id: str):
+        """
+        Returns None if the stage of the node failed
+        """
+        try:
+            return future.result()
+        except Exception:
+            logging.exception('Uploading page of node %s failed', node_id)
+            return None
+
+    def __upload_single_node_page(self, node_id: str, fingerprint: str) -> bool:
+        try:
+            page = self.__handler.get_current_page_of_node(node_id)
+            page, record = self.__handler.render_page_of_node(page, node_id)
+            return self.__upload_rendered_page_of_node(node_id, fingerprint, page, record)
+        except Exception:
+            logging.exception('Uploading page of node %s failed', node_id)
+            return False
+
+    def __upload_rendered_page_of_node(self, node_id: str, fingerprint: str, page: str, record: NodeSummaryRecord) -> bool:
+        """
+        The fingerprint of a failed node is not saved, so its page is rendered again in the next run
+        """
+        self.__handler.upload_rendered_page_of_node(page, record)
+        self.__tracker.save_fingerprint_of_node(node_id, fingerprint)
+        return True
 
     def upload_summary_for_confluence_pages(self):
+        """
+        The summary is built from the records of the last rendered node pages, so no pages
+        are downloaded from Confluence
+        """
         node_ids = self._mapper.get_all_keys()
         tbody = self.__summary.create_empty_summary_table()
         for node_id in node_ids:
-            common_name = self._mapper.get_node_value_from_mapping_dict(node_id, 'COMMON_NAME')
-            if self._confluence.does_page_exists(common_name):
-                page = self._confluence.get_page_content(common_name)
-                row = self.__summary.create_summary_table_row_from_confluence_page(common_name, page)
+            record = self.__records.load_record_if_exists(node_id)
+            if record is not None:
+                row = self.__summary.create_summary_table_row_from_record(record)
                 tbody.find('tbody').append(row)
         table = self.__summary.create_summary_table_frame()
         table.append(tbody)
-        self._confluence.update_confluence_page(self._confluence_parent_page, str(table))
+        self._confluence.update_confluence_page_if_changed(self._confluence_parent_page, str(table))
 
 
 if __name__ == '__main__':
     if len(sys.argv) == 1:
-        raise SystemExit(f'Usage: python {__file__} <path_to_config.toml>')
-    Main.main(sys.argv[1], lambda: ConfluencePageHandlerManager().upload_node_information_as_confluence_pages())
-    Main.main(sys.argv[1], lambda: ConfluencePageHandlerManager().upload_summary_for_confluence_pages())
+        raise SystemExit(f'Usage: python {__file__} <path_to_config.toml> [--full]')
+    full = '--full' in sys.argv[2:]
+    Main.main(sys.argv[1], lambda: ConfluencePageHandlerManager().upload_confluence_pages(full))
@@ -25,16 +25,127 @@ Created on 26.06.2022
 import os
 import sys
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from email.mime.text import MIMEText
 
 import bs4
-import pandas as pd
 from dateutil import parser
 from packaging import version
 
-from common import MailSender, TextWriter
-from common import Main, ConfluenceConnection, ConfluenceNodeMapper, InfoCSVHandler, ResourceLoader, SingletonABCMeta, \
-    SingletonMeta, TimestampHandler
+from common import Main, ConfluenceConnection, ConfluenceContactsDirectory, ConfluenceNodeMapper, InfoCSVHandler, MailOutbox, \
+    NodeStatusEvaluator, ResourceLoader, SingletonABCMeta, SingletonMeta, TextWriter, TimestampHandler
+
+
+@dataclass()
+class NodeStatusRecord:
+    """
+    Values of a Confluence node page that are needed for the notifications. The page is
+    parsed only once and shared by all notification and mail template handlers.
+    """
+    status: str
+    clinic_name: str
+    last_contact: str
+    last_write: str
+    dwh_version: str
+
+    @classmethod
+    def from_confluence_page(cls, page: str) -> 'NodeStatusRecord':
+        soup = bs4.BeautifulSoup(page, 'html.parser')
+        title = soup.find(class_='status').find('ac:parameter', attrs={'ac:name': 'title'})
+        return cls(
+            status=title.text if title is not None else '',
+            clinic_name=soup.find(class_='clinic_name').text,
+            last_contact=soup.find(class_='last_contact').text,
+            last_write=soup.find(class_='last_write').text,
+            dwh_version=soup.find(class_='dwh-j2ee').text)
+
+
+class NodeStatusSource(ABC, metaclass=SingletonABCMeta):
+    """
+    Provides the status records of the broker nodes for the notifications
+    """
+
+    @staticmethod
+    def get_configured_source() -> 'NodeStatusSource':
+        """
+        Source is set by 'SMTP.STATUS_SOURCE'
+        """
+        if os.getenv('SMTP.STATUS_SOURCE', 'local') == 'confluence':
+            return ConfluenceNodeStatusSource()
+        return LocalNodeStatusSource()
+
+    @abstractmethod
+    def get_status_record_of_node(self, node_id: str) -> NodeStatusRecord:
+        """
+        Returns None if there is no status for the node yet
+        """
+
+
+class ConfluenceNodeStatusSource(NodeStatusSource):
+    """
+    Reads the status records from the Confluence pages of the nodes, as rendered by csv_to_confluence.py
+    """
+    __confluence_parent_page: str = 'Support Log Broker-Monitor'
+
+    def __init__(self):
+        self.__confluence = ConfluenceConnection()
+        self.__mapper = ConfluenceNodeMapper()
+        self.__are_pages_loaded = False
+
+    def get_status_record_of_node(self, node_id: str) -> NodeStatusRecord:
+        if not self.__are_pages_loaded:
+            self.__confluence.load_child_pages_into_cache(self.__confluence_parent_page)
+            self.__are_pages_loaded = True
+        pagename = self.__mapper.get_node_value_from_mapping_dict(node_id, 'COMMON_NAME')
+        if not self.__confluence.does_page_exists(pagename):
+            return None
+        return NodeStatusRecord.from_confluence_page(self.__confluence.get_page_content(pagename))
+
+
+class LocalNodeStatusSource(NodeStatusSource):
+    """
+    Evaluates the status records from the monitoring data in the working directory, with the same
+    rules and values as the Confluence pages. Thus, notifications neither wait for Confluence nor
+    depend on the last run of csv_to_confluence.py
+    """
+
+    def __init__(self):
+        self.__working_dir = os.getenv('DIR.WORKING')
+        self.__handler = InfoCSVHandler()
+        self.__writer = TextWriter()
+        self.__mapper = ConfluenceNodeMapper()
+        self.__evaluator = NodeStatusEvaluator()
+        self.__timestamp = TimestampHandler()
+
+    def get_status_record_of_node(self, node_id: str) -> NodeStatusRecord:
+        node_dir = os.path.join(self.__working_dir, node_id)
+        if not self.__handler.does_file_exist(os.path.join(node_dir, self.__handler.generate_node_csv_name(node_id))):
+            return None
+        df = self.__handler.read_node_history_as_df(node_dir, node_id)
+        if df.empty:
+            return None
+        status, _ = self.__evaluator.evaluate_status_of_history(node_id, df)
+        last_row = df.iloc[-1].to_dict()
+        return NodeStatusRecord(
+            status=status,
+            clinic_name=self.__mapper.get_node_value_from_mapping_dict(node_id, 'LONG_NAME') or 'changeme',
+            last_contact=self.__convert_to_page_date(last_row.get('last_contact')),
+            last_write=self.__convert_to_page_date(last_row.get('last_write')),
+            dwh_version=self.__get_dwh_version_of_node(node_id))
+
+    def __convert_to_page_date(self, date: str) -> str:
+        """
+        Dates are shown in Berlin time on the Confluence page
+        """
+        if not isinstance(date, str) or date == '-':
+            return '-'
+        return self.__timestamp.convert_ts_to_berlin_time(date)[:19]
+
+    def __get_dwh_version_of_node(self, node_id: str) -> str:
+        filepath = os.path.join(self.__working_dir, node_id, f'{node_id}_versions.txt')
+        if not self.__writer.does_file_exist(filepath):
+            return '-'
+        return self.__writer.load_txt_file_as_dict(filepath).get('dwh-j2ee') or '-'
 
 
 # TODO: send mail on high error rate
@@ -44,13 +155,20 @@ class MailTemplateHandler(ResourceLoader, ABC):
     """
     _template_name: str = None
     _text_subtype: str = 'html'
-    _parser: str = 'html.parser'
     _encoding: str = 'iso-8859-1'
 
     @abstractmethod
-    def get_mail_template_filled_with_information_from_template_page(self, template_page: str) -> MIMEText:
+    def get_mail_template_filled_with_information_from_status_record(self, record: NodeStatusRecord) -> MIMEText:
         pass
 
+    def _fill_template(self, **values: str) -> str:
+        """
+        Placeholders are substituted in a single pass over the cached template.
+        Unknown placeholders are kept as they are.
+        """
+        template = self._get_resource_as_template(self._template_name, self._encoding)
+        return template.safe_substitute(values)
+
     @staticmethod
     def _format_date_string_to_german_format(date: str) -> str:
         d = parser.parse(date)
@@ -63,14 +181,9 @@ class OfflineMailTemplateHandler(MailTemplateHandler):
     """
     _template_name: str = 'template_mail_offline.html'
 
-    def get_mail_template_filled_with_information_from_template_page(self, template_page: str) -> MIMEText:
-        soup = bs4.BeautifulSoup(template_page, self._parser)
-        clinic_name = soup.find(class_='clinic_name').text
-        last_contact = soup.find(class_='last_contact').text
-        formatted_last_contact = self._format_date_string_to_german_format(last_contact)
-        content = self._get_resource_as_string(self._template_name, self._encoding)
-        content = content.replace('${clinic_name}', clinic_name)
-        content = content.replace('${last_contact}', formatted_last_contact)
+    def get_mail_template_filled_with_information_from_status_record(self, record: NodeStatusRecord) -> MIMEText:
+        formatted_last_contact = self._format_date_string_to_german_format(record.last_contact)
+        content = self._fill_template(clinic_name=record.clinic_name, last_contact=formatted_last_contact)
         mail = MIMEText(content, self._text_subtype, self._encoding)
         mail['Subject'] = "Automatische Information: AKTIN DWH Offline"
         return mail
@@ -93,15 +206,10 @@ class NoImportsMailTemplateHandler(MailTemplateHandler):
         path_csv = os.path.join(node_dir, name_csv)
         return path_csv
 
-    def get_mail_template_filled_with_information_from_template_page(self, template_page: str) -> MIMEText:
-        soup = bs4.BeautifulSoup(template_page, self._parser)
-        clinic_name = soup.find(class_='clinic_name').text
-        last_write = soup.find(class_='last_write').text
-        last_write = self.__get_last_import_date_from_csv() if last_write == '-' else last_write
+    def get_mail_template_filled_with_information_from_status_record(self, record: NodeStatusRecord) -> MIMEText:
+        last_write = self.__get_last_import_date_from_csv() if record.last_write == '-' else record.last_write
         formatted_last_write = self._format_date_string_to_german_format(last_write)
-        content = self._get_resource_as_string(self._template_name, self._encoding)
-        content = content.replace('${clinic_name}', clinic_name)
-        content = content.replace('${last_write}', formatted_last_write)
+        content = self._fill_template(clinic_name=record.clinic_name, last_write=formatted_last_write)
         mail = MIMEText(content, self._text_subtype, self._encoding)
         mail['Subject'] = "Automatische Information: AKTIN DWH Keine Imports"
         return mail
@@ -126,22 +234,16 @@ class OutdatedVersionMailTemplateHandler(MailTemplateHandler):
         self.__current_version_dwh = os.getenv('AKTIN.DWH_VERSION')
         self.__current_version_i2b2 = os.getenv('AKTIN.I2B2_VERSION')
 
-    def get_mail_template_filled_with_information_from_template_page(self, template_page: str) -> MIMEText:
-        soup = bs4.BeautifulSoup(template_page, self._parser)
-        clinic_name = soup.find(class_='clinic_name').text
-        version_dwh = soup.find(class_='dwh-j2ee').text
-        content = self._get_resource_as_string(self._template_name, self._encoding)
-        content = content.replace('${clinic_name}', clinic_name)
-        content = content.replace('${version_dwh}', version_dwh)
-        content = content.replace('${current_version_dwh}', self.__current_version_dwh)
-        content = content.replace('${current_version_i2b2}', self.__current_version_i2b2)
+    def get_mail_template_filled_with_information_from_status_record(self, record: NodeStatusRecord) -> MIMEText:
+        content = self._fill_template(
+            clinic_name=record.clinic_name, version_dwh=record.dwh_version,
+            current_version_dwh=self.__current_version_dwh, current_version_i2b2=self.__current_version_i2b2)
         mail = MIMEText(content, self._text_subtype, self._encoding)
         mail['Subject'] = 'Automatische Information: AKTIN DWH Version veraltet'
         return mail
 
 
 class NotificationHandler(metaclass=SingletonABCMeta):
-    _parser: str = 'html.parser'
     _my_status: str
     _handler: MailTemplateHandler
 
@@ -150,18 +252,27 @@ class NotificationHandler(metaclass=SingletonABCMeta):
         self.__sent_mails_logger = SentMailsLogger()
         filename_tracking = '_'.join(['tracking', self._my_status.replace(' ', '_')])
         self._sent_mails_counter = ConsecutiveSentEmailsCounter(filename_tracking)
-        self._mail_sender = MailSender()
+        self._mail_outbox = MailOutbox()
 
     @abstractmethod
-    def did_my_status_occur(self, template_page: str) -> bool:
+    def did_my_status_occur(self, record: NodeStatusRecord) -> bool:
         pass
 
     @abstractmethod
-    def sent_my_mail_to_node(self, node_id: str, template_page: str):
-        pass
+    def sent_my_mail_to_node(self, node_id: str, record: NodeStatusRecord) -> bool:
+        """
+        Returns whether a mail was queued. No mail is queued for a node without recipients
+        or if the same mail is still waiting in the outbox
+        """
 
-    def log_my_sent_mail_to_node(self, node_id: str):
-        self.__sent_mails_logger.log_sent_mail_for_node(node_id, self._my_status)
+    def log_my_queued_mail_to_node(self, node_id: str):
+        self.__sent_mails_logger.log_queued_mail_for_node(node_id, self._my_status)
+
+    def _enqueue_my_mail_to_node(self, node_id: str, recipients: list, mail: MIMEText) -> bool:
+        """
+        The node and status are kept with the mail, so the mail is logged as sent once it was delivered
+        """
+        return self._mail_outbox.enqueue_mail(recipients, mail, {'node_id': node_id, 'status': self._my_status})
 
     def clean_my_status_for_node(self, node_id: str):
         self._sent_mails_counter.delete_entry_tracking_for_node(node_id)
@@ -180,34 +291,30 @@ class OfflineNotificationHandler(NotificationHandler):
         super().__init__()
         self._handler = OfflineMailTemplateHandler()
 
-    def did_my_status_occur(self, template_page: str) -> bool:
-        soup = bs4.BeautifulSoup(template_page, self._parser)
-        element_status = soup.find(class_='status')
-        status = element_status.find('ac:parameter', attrs={'ac:name': 'title'})
-        return status.text == self._my_status
+    def did_my_status_occur(self, record: NodeStatusRecord) -> bool:
+        return record.status == self._my_status
 
-    def sent_my_mail_to_node(self, node_id: str, template_page: str):
-        mail = self._handler.get_mail_template_filled_with_information_from_template_page(template_page)
+    def sent_my_mail_to_node(self, node_id: str, record: NodeStatusRecord) -> bool:
+        mail = self._handler.get_mail_template_filled_with_information_from_status_record(record)
         recipients = self._confluence_recipients_extractor.extract_all_recipients_for_node_id(node_id)
-        if recipients:
-            self._mail_sender.send_mail(recipients, mail)
+        if not recipients:
+            return False
+        return self._enqueue_my_mail_to_node(node_id, recipients, mail)
 
 
 class NoImportsNotificationHandler(NotificationHandler):
     _my_status: str = 'NO IMPORTS'
 
-    def did_my_status_occur(self, template_page: str) -> bool:
-        soup = bs4.BeautifulSoup(template_page, self._parser)
-        element_status = soup.find(class_='status')
-        status = element_status.find('ac:parameter', attrs={'ac:name': 'title'})
-        return status.text == self._my_status
+    def did_my_status_occur(self, record: NodeStatusRecord) -> bool:
+        return record.status == self._my_status
 
-    def sent_my_mail_to_node(self, node_id: str, template_page: str):
+    def sent_my_mail_to_node(self, node_id: str, record: NodeStatusRecord) -> bool:
         self._handler = NoImportsMailTemplateHandler(node_id)
-        mail = self._handler.get_mail_template_filled_with_information_from_template_page(template_page)
+        mail = self._handler.get_mail_template_filled_with_information_from_status_record(record)
         recipients = self._confluence_recipients_extractor.extract_all_recipients_for_node_id(node_id)
-        if recipients:
-            self._mail_sender.send_mail(recipients, mail)
+        if not recipients:
+            return False
+        return self._enqueue_my_mail_to_node(node_id, recipients, mail)
 
 
 class OutdatedVersionNotificationHandler(NotificationHandler):
@@ -219,38 +326,27 @@ class OutdatedVersionNotificationHandler(NotificationHandler):
         self._handler = OutdatedVersionMailTemplateHandler()
         self.__current_version_dwh = os.getenv('AKTIN.DWH_VERSION')
 
-    def did_my_status_occur(self, template_page: str) -> bool:
-        soup = bs4.BeautifulSoup(template_page, self._parser)
-        dwh_version = soup.find(class_='dwh-j2ee').text
-        formatted_version = dwh_version.replace('dwh-j2ee-', '')
+    def did_my_status_occur(self, record: NodeStatusRecord) -> bool:
+        formatted_version = record.dwh_version.replace('dwh-j2ee-', '')
         if formatted_version and formatted_version != '-':
             return version.parse(self.__current_version_dwh) > version.parse(formatted_version)
         return False
 
-    def sent_my_mail_to_node(self, node_id: str, template_page: str):
-        mail = self._handler.get_mail_template_filled_with_information_from_template_page(template_page)
+    def sent_my_mail_to_node(self, node_id: str, record: NodeStatusRecord) -> bool:
+        mail = self._handler.get_mail_template_filled_with_information_from_status_record(record)
         recipients = self._confluence_recipients_extractor.extract_all_recipients_for_node_id(node_id)
-        if recipients:
-            self._mail_sender.send_mail(recipients, mail)
+        if not recipients:
+            return False
+        return self._enqueue_my_mail_to_node(node_id, recipients, mail)
 
 
 class ConfluencePageRecipientsExtractor(metaclass=SingletonMeta):
     """
     Extracts correspondants for broker node from another confluence page
     """
-    __confluence_email_list: str = 'E-Mail-Verteiler'
 
     def __init__(self):
-        """
-        Retrieves the recipients data from the Confluence email list page and prepares it for extraction.
-        """
-        confluence = ConfluenceConnection()
-        confluence_email_page = confluence.get_page_content(self.__confluence_email_list)
-        email_tables = pd.read_html(confluence_email_page)
-        df = email_tables[0]
-        df['Node ID'] = pd.to_numeric(df['Node ID'])
-        df = df.fillna('')
-        self.__email_df = df
+        self.__contacts = ConfluenceContactsDirectory()
 
     def extract_all_recipients_for_node_id(self, node_id: str) -> list:
         ed_recipients = self.__extract_ed_recipients_for_node_id(node_id)
@@ -265,14 +361,9 @@ class ConfluencePageRecipientsExtractor(metaclass=SingletonMeta):
         Only the main contacts (Hauptansprechpartner) are used (usually only one).
         Contacts can be blacklisted by setting a value in the appropriate column in Confluence.
         """
-        contacts_list = []
-        recipients_df = self.__get_recipients_df_for_node_id(node_id, 'Notaufnahme')
-        main_contacts = recipients_df[(recipients_df['Hauptansprechpartner?'] != '') & (
-                recipients_df['Abgemeldet von Monitor-Benachrichtigungen?'] == '')]
-        contacts_series = main_contacts['Kontakt']
-        for contact in contacts_series:
-            contacts_list.append(contact)
-        return contacts_list
+        contacts = self.__contacts.get_contacts_of_node(node_id, 'Notaufnahme')
+        return [contact['Kontakt'] for contact in contacts
+                if contact['Hauptansprechpartner?'] != '' and contact['Abgemeldet von Monitor-Benachrichtigungen?'] == '']
 
     def __extract_it_recipients_for_node_id(self, node_id: str) -> list:
         """
@@ -280,22 +371,8 @@ class ConfluencePageRecipientsExtractor(metaclass=SingletonMeta):
         All contacts are used.
         Contacts can be blacklisted by setting a value in the appropriate column in Confluence.
         """
-        contacts_list = []
-        recipients_df = self.__get_recipients_df_for_node_id(node_id, 'IT')
-        main_contacts = recipients_df[recipients_df['Abgemeldet von Monitor-Benachrichtigungen?'] == '']
-        contacts_series = main_contacts['Kontakt']
-        for contact in contacts_series:
-            contacts_list.append(contact)
-        return contacts_list
-
-    def __get_recipients_df_for_node_id(self, node_id: str, recipients_type: str) -> pd.DataFrame:
-        """
-        Retrieves the recipients dataframe for the specified node ID and recipient type.
-        """
-        idx_list = self.__email_df.index[self.__email_df['Node ID'] == int(node_id)].tolist()
-        node_df = self.__email_df.iloc[idx_list]
-        recipients_df = node_df[node_df['Ansprechpartner für'] == recipients_type]
-        return recipients_df
+        contacts = self.__contacts.get_contacts_of_node(node_id, 'IT')
+        return [contact['Kontakt'] for contact in contacts if contact['Abgemeldet von Monitor-Benachrichtigungen?'] == '']
 
 
 class ConsecutiveSentEmailsCounter:
@@ -343,7 +420,7 @@ class ConsecutiveSentEmailsCounter:
 
 class SentMailsLogger(metaclass=SingletonMeta):
     """
-    Logs all sent mail to corresponding nodes (for traceability)
+    Logs all queued and sent mail to corresponding nodes (for traceability)
     """
 
     def __init__(self):
@@ -355,10 +432,18 @@ class SentMailsLogger(metaclass=SingletonMeta):
         """
         Logs the sent mail for a specific node with the given status.
         """
+        self.__write_log_entry(node_id, f'Sent mail for status {status} to node id {node_id}')
+
+    def log_queued_mail_for_node(self, node_id: str, status: str):
+        """
+        Logs the mail for a specific node with the given status, which was queued in the outbox.
+        """
+        self.__write_log_entry(node_id, f'Queued mail for status {status} to node id {node_id}')
+
+    def __write_log_entry(self, node_id: str, message: str):
         log_path = self.__generate_mails_log_path(node_id)
         current = self.__timestamp.get_current_date()
-        data = f'{current} : Sent mail for status {status} to node id {node_id}\n'
-        self.__writer.write_data_to_file(data, log_path)
+        self.__writer.write_data_to_file(f'{current} : {message}\n', log_path)
 
     def __generate_mails_log_path(self, node_id: str) -> str:
         node_working_dir = os.path.join(self.__working_dir, node_id)
@@ -372,25 +457,37 @@ class NodeEventNotifierManager:
     """
 
     def __init__(self):
-        self.__confluence = ConfluenceConnection()
+        self.__source = NodeStatusSource.get_configured_source()
         self.__mapper = ConfluenceNodeMapper()
         self.__offline = OfflineNotificationHandler()
         self.__no_imports = NoImportsNotificationHandler()
         self.__outdated_version = OutdatedVersionNotificationHandler()
+        self.__mail_outbox = MailOutbox()
+        self.__sent_mails_logger = SentMailsLogger()
 
     def notify_node_recipients_on_emergency_status(self):
-        for node_id in self.__mapper.get_all_keys():
-            pagename = self.__mapper.get_node_value_from_mapping_dict(node_id, 'COMMON_NAME')
-            if self.__confluence.does_page_exists(pagename):
-                page = self.__confluence.get_page_content(pagename)
-                for notifier in (self.__offline, self.__no_imports, self.__outdated_version):
-                    if notifier.did_my_status_occur(page):
-                        if notifier.is_waiting_threshold_reached_for_node(node_id):
-                            notifier.sent_my_mail_to_node(node_id, page)
-                            notifier.log_my_sent_mail_to_node(node_id)
-                            notifier.create_or_update_my_status_for_node(node_id)
-                    else:
-                        notifier.clean_my_status_for_node(node_id)
+        """
+        Mails are only enqueued to the outbox, so the evaluation never waits for the mail server.
+        The outbox is delivered in the background during the run.
+        """
+        with self.__mail_outbox.delivering(self.__log_sent_mail):
+            for node_id in self.__mapper.get_all_keys():
+                record = self.__source.get_status_record_of_node(node_id)
+                if record is not None:
+                    self.__notify_node_recipients(node_id, record)
+
+    def __notify_node_recipients(self, node_id: str, record: NodeStatusRecord):
+        for notifier in (self.__offline, self.__no_imports, self.__outdated_version):
+            if notifier.did_my_status_occur(record):
+                if notifier.is_waiting_threshold_reached_for_node(node_id) and notifier.sent_my_mail_to_node(node_id, record):
+                    notifier.log_my_queued_mail_to_node(node_id)
+                    notifier.create_or_update_my_status_for_node(node_id)
+            else:
+                notifier.clean_my_status_for_node(node_id)
+
+    def __log_sent_mail(self, metadata: dict):
+        if metadata.get('node_id') and metadata.get('status'):
+            self.__sent_mails_logger.log_sent_mail_for_node(metadata['node_id'], metadata['status'])
 
 
 if __name__ == '__main__':
@@ -25,7 +25,7 @@ Created on 14.02.2024
 import os
 import sys
 from abc import ABC
-from common import SingletonABCMeta, ConfluenceNodeMapper, ConfluenceConnection, Main
+from common import SingletonABCMeta, ConfluenceNodeMapper, ConfluenceConnection, Main, StorageBackend
 
 
 # Implementation of classes needed from the original "csv_to_confluence.py"
@@ -51,7 +51,9 @@ class FileBackupManager(ConfluenceHandler):
     def backup_files(self):
         """
         Backs up files of all configured broker nodes by uploading them as attachments to the corresponding Confluence page.
+        If the data is not stored in files (e.g. in SQLite), it is exported to the working directory first.
         """
+        StorageBackend.get_configured_backend().export_to_files()
         node_ids = self._mapper.get_all_keys()
         for node_id in node_ids:
             self.__backup_files_with_line_ending(node_id, 'csv')
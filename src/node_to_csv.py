@@ -22,18 +22,24 @@ Created on 19.01.2022
 #
 #
 
+import asyncio
+import json
+import logging
 import os
 import sys
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 
 import pandas as pd
 
-from common import Main, BrokerNodeConnection, ErrorCSVHandler, InfoCSVHandler, SingletonABCMeta, TimestampHandler, TextWriter, DataWriter
+from common import Main, AsyncBrokerNodeConnection, BrokerNodeConnection, ErrorCSVHandler, InfoCSVHandler, SingletonABCMeta, TimestampHandler, TextWriter, DataWriter
 
 
 class BrokerNodeRetriever(ABC, metaclass=SingletonABCMeta):
     """
     Abstract base class for retrieving broker node data and downloading it to a file.
+    Fetching and writing are separate steps, so the data can also be fetched asynchronously.
     """
     _handler: DataWriter
 
@@ -44,12 +50,22 @@ class BrokerNodeRetriever(ABC, metaclass=SingletonABCMeta):
 
     def _init_node_directory_if_nonexisting(self, foldername: str) -> str:
         my_dir = os.path.join(self._working_dir, foldername)
-        if not os.path.isdir(my_dir):
-            os.makedirs(my_dir)
+        os.makedirs(my_dir, exist_ok=True)
         return my_dir
 
-    @abstractmethod
     def download_broker_data_to_file(self, node_id: str):
+        self.write_broker_data_to_file(node_id, self.fetch_broker_data(node_id))
+
+    @abstractmethod
+    def fetch_broker_data(self, node_id: str) -> Any:
+        pass
+
+    @abstractmethod
+    async def fetch_broker_data_async(self, node_id: str, connection: AsyncBrokerNodeConnection) -> Any:
+        pass
+
+    @abstractmethod
+    def write_broker_data_to_file(self, node_id: str, data: Any):
         pass
 
 
@@ -58,31 +74,43 @@ class NodeInfoRetriever(BrokerNodeRetriever):
     Fetches import and connection information from broker node to a CSV file.
     """
     _handler = InfoCSVHandler()
+    __state_writer = TextWriter()
 
-    def download_broker_data_to_file(self, node_id: str):
+    def fetch_broker_data(self, node_id: str) -> tuple:
+        """
+        Returns the node and its import statistics
+        """
+        return self._broker_node_connection.get_broker_node(node_id), self._broker_node_connection.get_broker_node_stats(node_id)
+
+    async def fetch_broker_data_async(self, node_id: str, connection: AsyncBrokerNodeConnection) -> tuple:
+        return tuple(await asyncio.gather(connection.get_broker_node(node_id), connection.get_broker_node_stats(node_id)))
+
+    def write_broker_data_to_file(self, node_id: str, data: tuple):
         """
-        Calls AKTIN Broker Endpoints to get import statistics of the connected node and writes the response to a CSV file.
+        Writes the fetched import statistics of the connected node and writes the response to a CSV file.
         - One row in the CSV file represents the status of one day.
         - Computes differences to the last row in the CSV file (assuming it contains the import statistics of yesterday).
         - Import stats are resetted on DWH restart, so no daily differences are calculated then.
         - Running the method multiple times will overwrite the row of the current day each time.
+        - Only the last rows of the CSV file are read and the new row is appended (or replaces the row of the current day).
         - All date information from the broker server is converted into a local, human-readable format.
         - The variables 'last-reject' and 'last-write' from the broker server can be None if no data was imported or no error occurred.
         - Missing or not computable values are added as '-'.
         - The CSV file is rotated each year to limit its file size.
-        - If the CSV file is empty or newly created, the existence of the last year's CSV file is checked.
+        - The last written row and the row before it are kept in a state file of the node. If the state is missing
+          or does not match the CSV file, the rows are taken from the history of CSV files (e.g. from last year's
+          CSV file, if the CSV file is empty or newly created).
         """
+        node, stats = data
         csv_name = self._handler.generate_node_csv_name(node_id)
         working_dir = self._init_node_directory_if_nonexisting(node_id)
         csv_path = self._handler.init_csv_file(working_dir, csv_name)
-        node = self._broker_node_connection.get_broker_node(node_id)
-        stats = self._broker_node_connection.get_broker_node_stats(node_id)
-        df = self._handler.read_csv_as_df(csv_path)
-        df = self.__delete_todays_row_if_exists(df)
-        if df.empty:
-            csv_row = self.__get_last_row_of_last_years_csv_if_exists(node_id, working_dir)
+        state_path = self.__generate_state_file_path(node_id, working_dir)
+        state = self.__load_state_if_consistent_with_csv(state_path, node_id, working_dir)
+        if state is not None:
+            has_todays_row, csv_row = self.__get_last_row_before_today_from_state(state)
         else:
-            csv_row = df.iloc[-1]
+            has_todays_row, csv_row = self.__get_last_row_before_today_from_csv(node_id, working_dir)
         if csv_row is not None:
             if self.__was_last_check_yesterday(csv_row) and self.__are_dwh_start_date_equal(csv_row, stats):
                 daily_map = self.__compute_daily_stats(csv_row, stats)
@@ -92,37 +120,79 @@ class NodeInfoRetriever(BrokerNodeRetriever):
             daily_map = self.__generate_empty_daily_stats()
         stats_map = self.__generate_row_stats(node, stats)
         stats_map.update(daily_map)
-        stats_dict = pd.DataFrame(stats_map, index=[0])
-        df = pd.concat([df, stats_dict])
-        self._handler.write_data_to_file(df, csv_path)
+        with self._handler.transaction():
+            self._handler.append_row_to_file(stats_map, csv_path, replace_last_row=has_todays_row)
+            self.__save_state(state_path, stats_map, csv_row)
+
+    def __load_state_if_consistent_with_csv(self, state_path: str, node_id: str, working_dir: str) -> dict:
+        """
+        The state is only used if its last row equals the last row of the CSV history. If the CSV file is
+        still empty (e.g. rotated at the turn of the year), the last row of last year's CSV file is
+        compared instead, if it exists. Otherwise (e.g. after manual changes of the CSV file), None is returned.
+        """
+        if not self.__state_writer.does_file_exist(state_path):
+            return None
+        try:
+            state = self.__state_writer.load_txt_file_as_dict(state_path)
+        except json.JSONDecodeError:
+            return None
+        last_row = state.get('last_row')
+        if not last_row:
+            return None
+        df = self._handler.read_last_rows_of_node_history_as_df(working_dir, node_id, 1)
+        if df.empty:
+            return state
+        return state if df.iloc[-1].to_dict() == last_row else None
 
-    def __delete_todays_row_if_exists(self, csv: pd.DataFrame) -> pd.DataFrame:
+    def __get_last_row_before_today_from_state(self, state: dict) -> tuple:
+        """
+        Returns whether the state contains a row of today and the last row before today (or None).
+        """
+        has_todays_row = self.__is_row_of_today(pd.Series(state['last_row']))
+        row = state.get('previous_row') if has_todays_row else state['last_row']
+        return has_todays_row, pd.Series(row) if row else None
+
+    def __get_last_row_before_today_from_csv(self, node_id: str, working_dir: str) -> tuple:
+        """
+        Returns whether the CSV file contains a row of today and the last row before today (or None).
+        The row before today is taken from last year's CSV file at the turn of the year. This is important
+        to compute daily differences if yesterday's date was New Year's Eve.
+        """
+        df = self._handler.read_last_rows_of_node_history_as_df(working_dir, node_id, 2)
+        has_todays_row = not df.empty and self.__is_row_of_today(df.iloc[-1])
+        if has_todays_row:
+            df = df.head(-1)
+            if not df.empty and self.__is_row_of_today(df.iloc[-1]):
+                raise ValueError(f'date of today was found in multiple rows of node {node_id}')
+        if df.empty:
+            return has_todays_row, None
+        return has_todays_row, df.iloc[-1]
+
+    def __save_state(self, state_path: str, last_row: dict, previous_row: pd.Series):
+        """
+        Both rows are stored as written into the CSV file (as strings) and include the DWH start time
+        """
+        state = {
+            'last_row': {key: str(value) for key, value in last_row.items()},
+            'previous_row': previous_row.to_dict() if previous_row is not None else None}
+        self.__state_writer.save_dict_as_txt_file(state, state_path)
+
+    def __is_row_of_today(self, csv_row: pd.Series) -> bool:
         """
         Each row should represent one day, and no duplicates are allowed.
         """
-        if not csv.empty:
-            current_date = self._timestamp_handler.get_current_date()
-            current_ymd = self._timestamp_handler.get_utc_ymd_from_date_string(current_date)
-            last_ymd_of_csv = self._timestamp_handler.get_utc_ymd_from_date_string(csv.iloc[-1].date)
-            if last_ymd_of_csv == current_ymd:
-                csv = csv.head(-1)
-            if any(csv['date'] == current_ymd):
-                raise SystemExit('date of today was found in multiple rows!!')
-        return csv
+        current_date = self._timestamp_handler.get_current_date()
+        current_ymd = self._timestamp_handler.get_utc_ymd_from_date_string(current_date)
+        last_ymd_of_csv = self._timestamp_handler.get_utc_ymd_from_date_string(csv_row.date)
+        return last_ymd_of_csv == current_ymd
 
-    def __get_last_row_of_last_years_csv_if_exists(self, node_id: str, working_dir: str) -> pd.DataFrame:
+    @staticmethod
+    def __generate_state_file_path(node_id: str, working_dir: str) -> str:
         """
-        Retrieves the last row of the CSV file from the last year if it exists.
-        This is important at the turn of the year to compute daily differences if yesterday's date was New Year's Eve.
+        Generates the file path for the state file (last written rows of the stats CSV)
         """
-        current_year = self._timestamp_handler.get_current_year()
-        last_year = str(int(current_year) - 1)
-        last_year_csv_name = self._handler.generate_node_csv_name(node_id, last_year)
-        last_year_csv_path = os.path.join(working_dir, last_year_csv_name)
-        if os.path.isfile(last_year_csv_path):
-            last_years_df = self._handler.read_csv_as_df(last_year_csv_path)
-            return last_years_df.iloc[-1]
-        return None
+        name_file = ''.join([node_id, '_stats_state.json'])
+        return os.path.join(working_dir, name_file)
 
     def __was_last_check_yesterday(self, csv_row: pd.DataFrame) -> bool:
         """
@@ -208,32 +278,37 @@ class NodeErrorRetriever(BrokerNodeRetriever):
     """
     _handler = ErrorCSVHandler()
 
-    def download_broker_data_to_file(self, node_id: str):
+    def fetch_broker_data(self, node_id: str) -> list:
+        return self._broker_node_connection.get_broker_node_errors(node_id)
+
+    async def fetch_broker_data_async(self, node_id: str, connection: AsyncBrokerNodeConnection) -> list:
+        return await connection.get_broker_node_errors(node_id)
+
+    def write_broker_data_to_file(self, node_id: str, data: list):
         """
-        Downloads import errors from the connected broker node and writes them to a CSV file.
+        Writes the fetched import errors of the connected broker node to a CSV file.
         - Each row in the CSV file represents one occurred error.
         - Logged errors can be updated on the broker side, where the 'timestamp' is updated
           and 'repeats' is incremented.
         - Updates in the CSV file are done by deleting and re-appending the corresponding row.
+        - All errors of the broker are merged into the CSV file in a single pass, and the file is written once.
+          The file is not written at all, if no error is new or changed.
         - Only errors of the current year are tracked in the CSV file to limit its size.
         - Similar to NodeInfoFetcher, the CSV file is rotated each year.
         """
         csv_name = self._handler.generate_node_csv_name(node_id)
         working_dir = self._init_node_directory_if_nonexisting(node_id)
         csv_path = self._handler.init_csv_file(working_dir, csv_name)
-        errors = self._broker_node_connection.get_broker_node_errors(node_id)
-        df = self._handler.read_csv_as_df(csv_path)
-        for error in errors:
-            if self.__did_error_appear_this_year(error):
-                error_row = self.__convert_error_to_row(error)
-                if self.__is_error_already_logged(df, error_row):
-                    if self.__did_error_row_repeats_change(df, error_row):
-                        df = self.__delete_old_error_row(df, error_row)
-                        df = pd.concat([df, error_row])
-                else:
-                    df = pd.concat([df, error_row])
-        df = df.sort_values(by='timestamp', ascending=False)
-        self._handler.write_data_to_file(df, csv_path)
+        error_rows = self.__convert_errors_to_rows([error for error in data if self.__did_error_appear_this_year(error)])
+        with self._handler.transaction():
+            df = self._handler.read_csv_as_df(csv_path)
+            changed_rows = self.__select_new_or_changed_error_rows(df, error_rows)
+            if changed_rows.empty:
+                return
+            df = df[~df['content'].isin(changed_rows['content'])]
+            df = pd.concat([df, changed_rows], ignore_index=True)
+            df = df.sort_values(by='timestamp', ascending=False)
+            self._handler.write_data_to_file(df, csv_path)
 
     def __did_error_appear_this_year(self, error: BrokerNodeConnection.BrokerNodeError) -> bool:
         current_year = self._timestamp_handler.get_current_year()
@@ -241,34 +316,29 @@ class NodeErrorRetriever(BrokerNodeRetriever):
         return current_year == year_of_error
 
     @staticmethod
-    def __convert_error_to_row(error: BrokerNodeConnection.BrokerNodeError) -> pd.DataFrame:
+    def __convert_errors_to_rows(errors: list) -> pd.DataFrame:
         """
         The var 'repeats' from broker-server can be None, if the error occured just once.
         Var 'timestamp' is in local timezone.
         """
-        new_row = {
-            'timestamp': error.timestamp,
-            'repeats': error.repeats if error.repeats is not None else '1',
-            'content': error.content}
-        return pd.DataFrame(new_row, index=[0])
-
-    @staticmethod
-    def __is_error_already_logged(csv: pd.DataFrame, error_row: pd.DataFrame) -> bool:
-        set_csv = set(csv['content'])
-        set_error = set(error_row['content'])
-        return any(set_csv.intersection(set_error))
+        new_rows = {
+            'timestamp': [error.timestamp for error in errors],
+            'repeats': [error.repeats if error.repeats is not None else '1' for error in errors],
+            'content': [error.content for error in errors]}
+        return pd.DataFrame(new_rows)
 
     @staticmethod
-    def __did_error_row_repeats_change(csv: pd.DataFrame, error_row: pd.DataFrame) -> bool:
-        df_intersection = pd.merge(csv, error_row, on='content', how='inner')
-        repeats_csv = df_intersection['repeats_x'].values
-        repeats_row_error = df_intersection['repeats_y'].values
-        return repeats_csv != repeats_row_error
-
-    @staticmethod
-    def __delete_old_error_row(csv: pd.DataFrame, error_row: pd.DataFrame) -> pd.DataFrame:
-        idx = csv.index[csv['content'] == error_row['content'][0]]
-        return csv.drop(index=idx)
+    def __select_new_or_changed_error_rows(csv: pd.DataFrame, error_rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Logged errors are looked up by a hash index over their content. Returns the errors which
+        are not logged yet or whose 'repeats' changed. Their outdated rows are to be dropped.
+        """
+        if error_rows.empty:
+            return error_rows
+        error_rows = error_rows.drop_duplicates(subset='content', keep='last')
+        logged_repeats = csv.drop_duplicates(subset='content', keep='last').set_index('content')['repeats']
+        repeats = error_rows['content'].map(logged_repeats)
+        return error_rows[repeats.isna() | (repeats != error_rows['repeats'])]
 
 
 class NodeResourceRetriever(BrokerNodeRetriever):
@@ -276,30 +346,73 @@ class NodeResourceRetriever(BrokerNodeRetriever):
     Fetches broker node resources such as installed versions or packages and saves them to a text file.
     """
     _handler = TextWriter()
+    __resource_types: tuple = ('versions', 'rscript', 'python', 'import-scripts')
 
-    def download_broker_data_to_file(self, node_id: str):
+    def get_resource_types(self) -> tuple:
+        return self.__resource_types
+
+    def fetch_broker_data(self, node_id: str) -> dict:
+        """
+        The HTTP validators of each resource are kept in a separate file of the node. They are
+        only used if the text file of the resource exists.
+        Returns the response (None if unchanged) and the HTTP validators of each resource type.
+        """
+        validators = self.get_validators_of_node(node_id)
+        return {resource_type: self._broker_node_connection.get_broker_node_resource_if_modified(node_id, resource_type, validators[resource_type])
+                for resource_type in self.__resource_types}
+
+    async def fetch_broker_data_async(self, node_id: str, connection: AsyncBrokerNodeConnection) -> dict:
+        """
+        The validators file is read in a worker thread, so the event loop is not blocked
+        """
+        validators = await asyncio.to_thread(self.get_validators_of_node, node_id)
+        responses = await asyncio.gather(*(connection.get_broker_node_resource_if_modified(node_id, resource_type, validators[resource_type])
+                                           for resource_type in self.__resource_types))
+        return dict(zip(self.__resource_types, responses))
+
+    def write_broker_data_to_file(self, node_id: str, data: dict):
         dir_working = self._init_node_directory_if_nonexisting(node_id)
-        self.__fetch_broker_node_resource_to_text_file('versions', node_id, dir_working)
-        self.__fetch_broker_node_resource_to_text_file('rscript', node_id, dir_working)
-        self.__fetch_broker_node_resource_to_text_file('python', node_id, dir_working)
-        self.__fetch_broker_node_resource_to_text_file('import-scripts', node_id, dir_working)
+        validators_path = self.__generate_validators_file_path(node_id, dir_working)
+        self._handler.init_new_file_if_nonexisting(validators_path)
+        validators = self._handler.load_txt_file_as_dict(validators_path)
+        for resource_type, (response, resource_validators) in data.items():
+            self.__write_broker_node_resource_to_text_file(resource_type, node_id, dir_working, response)
+            validators[resource_type] = resource_validators
+        self._handler.save_dict_as_txt_file(validators, validators_path)
 
-    def __fetch_broker_node_resource_to_text_file(self, resource_type: str, node_id: str, working_dir: str):
+    def get_validators_of_node(self, node_id: str) -> dict:
+        """
+        Returns the HTTP validators of each resource type, which are sent with the next request
+        of the resource. A resource without text file is requested without validators.
         """
-        Fetches a specific broker node resource and saves it to a text file.
+        dir_working = self._init_node_directory_if_nonexisting(node_id)
+        validators_path = self.__generate_validators_file_path(node_id, dir_working)
+        self._handler.init_new_file_if_nonexisting(validators_path)
+        validators = self._handler.load_txt_file_as_dict(validators_path)
+        for resource_type in self.__resource_types:
+            resourcepath = self.__generate_resource_file_path(resource_type, node_id, dir_working)
+            validators[resource_type] = validators.get(resource_type, {}) if self._handler.does_file_exist(resourcepath) else {}
+        return validators
+
+    def __write_broker_node_resource_to_text_file(self, resource_type: str, node_id: str, working_dir: str, response: dict):
+        """
+        Saves a fetched broker node resource to a text file.
+        - Unchanged resources (according to their HTTP validators) are skipped entirely.
         - Changes in resource items are logged by comparing the existing information in the file
         (from the previous day) with the current information from the broker.
         - Older information is overwritten with newer information after logging.
         """
-        response = self._broker_node_connection.get_broker_node_resource(node_id, resource_type)
+        if response is None:
+            return
         response = self.__clean_dictionary(response)
         resourcepath = self.__generate_resource_file_path(resource_type, node_id, working_dir)
-        if os.path.exists(resourcepath):
-            resource = self._handler.load_txt_file_as_dict(resourcepath)
-            logpath = self.__generate_resource_log_path(resource_type, node_id, working_dir)
-            self.__log_new_and_updated_items(logpath, response, resource)
-            self.__log_deleted_items(logpath, response, resource)
-        self._handler.save_dict_as_txt_file(response, resourcepath)
+        with self._handler.transaction():
+            if self._handler.does_file_exist(resourcepath):
+                resource = self._handler.load_txt_file_as_dict(resourcepath)
+                logpath = self.__generate_resource_log_path(resource_type, node_id, working_dir)
+                self.__log_new_and_updated_items(logpath, response, resource)
+                self.__log_deleted_items(logpath, response, resource)
+            self._handler.save_dict_as_txt_file(response, resourcepath)
 
     def __log_new_and_updated_items(self, logpath: str, broker: dict, resource: dict):
         """
@@ -349,6 +462,14 @@ class NodeResourceRetriever(BrokerNodeRetriever):
         name_file = ''.join([node_id, '_', resource_type, '.txt'])
         return os.path.join(working_dir, name_file)
 
+    @staticmethod
+    def __generate_validators_file_path(node_id: str, working_dir: str) -> str:
+        """
+        Generates the file path for the HTTP validators of all resources of a node
+        """
+        name_file = ''.join([node_id, '_resource_validators.json'])
+        return os.path.join(working_dir, name_file)
+
     @staticmethod
     def __generate_resource_log_path(resource_type: str, node_id: str, working_dir: str) -> str:
         """
@@ -361,22 +482,97 @@ class NodeResourceRetriever(BrokerNodeRetriever):
 class NodeRetrieverManager:
     """
     Manages the fetching of broker node information.
+    Nodes are fetched in parallel by a bounded pool of workers (BROKER.MAX_WORKERS). Each node
+    is processed by a single worker, so files of one node are never written concurrently.
     """
 
     def __init__(self):
-        self.__list_node_ids = BrokerNodeConnection().get_broker_nodes()
+        self.__connection = BrokerNodeConnection()
+        self.__list_node_ids = self.__connection.get_broker_nodes()
+        self.__max_workers = max(1, int(os.getenv('BROKER.MAX_WORKERS', '1')))
         self.__info_fetcher = NodeInfoRetriever()
         self.__error_fetcher = NodeErrorRetriever()
         self.__resources_fetcher = NodeResourceRetriever()
 
     def fetch_broker_node_information(self):
-        for id_node in self.__list_node_ids:
+        """
+        The response cache of the broker connection is enabled for the duration of the run, so
+        endpoints that are needed by multiple retrievers are only requested once per node.
+        """
+        self.__connection.enable_response_cache()
+        try:
+            self.__fetch_all_nodes_information()
+        finally:
+            self.__log_and_disable_response_cache()
+
+    async def fetch_broker_node_information_async(self):
+        """
+        Requests the endpoints of all nodes concurrently (limited by BROKER.MAX_CONCURRENT_REQUESTS, see
+        AsyncBrokerNodeConnection). The files of each node are written from the gathered responses as soon
+        as they arrived, in a worker thread, so the event loop is not blocked by file operations.
+        """
+        connection = AsyncBrokerNodeConnection()
+        self.__connection.enable_response_cache()
+        try:
+            results = await asyncio.gather(*(self.__fetch_single_node_information_async(id_node, connection) for id_node in self.__list_node_ids))
+            self.__log_failed_nodes(results)
+        finally:
+            self.__log_and_disable_response_cache()
+
+    async def __fetch_single_node_information_async(self, id_node: str, connection: AsyncBrokerNodeConnection) -> bool:
+        """
+        The errors are requested after the stats of the node, as both are read from the same endpoint,
+        which is then answered by the response cache
+        """
+        try:
+            info, resources = await asyncio.gather(
+                self.__info_fetcher.fetch_broker_data_async(id_node, connection),
+                self.__resources_fetcher.fetch_broker_data_async(id_node, connection))
+            errors = await self.__error_fetcher.fetch_broker_data_async(id_node, connection)
+            await asyncio.to_thread(self.__write_single_node_information, id_node, info, errors, resources)
+            return True
+        except Exception:
+            logging.exception('Fetching information of node %s failed', id_node)
+            return False
+
+    def __write_single_node_information(self, id_node: str, info: tuple, errors: list, resources: dict):
+        self.__info_fetcher.write_broker_data_to_file(id_node, info)
+        self.__error_fetcher.write_broker_data_to_file(id_node, errors)
+        self.__resources_fetcher.write_broker_data_to_file(id_node, resources)
+
+    def __fetch_all_nodes_information(self):
+        with ThreadPoolExecutor(max_workers=self.__max_workers) as executor:
+            results = list(executor.map(self.__fetch_single_node_information, self.__list_node_ids))
+        self.__log_failed_nodes(results)
+
+    def __log_failed_nodes(self, results: list):
+        failed_nodes = [id_node for id_node, success in zip(self.__list_node_ids, results) if not success]
+        if failed_nodes:
+            logging.warning('Fetching failed for %d of %d nodes: %s', len(failed_nodes), len(self.__list_node_ids), failed_nodes)
+
+    def __log_and_disable_response_cache(self):
+        logging.info('Broker response cache: %d hits, %d misses',
+                     self.__connection.get_response_cache_hits(), self.__connection.get_response_cache_misses())
+        self.__connection.disable_response_cache()
+
+    def __fetch_single_node_information(self, id_node: str) -> bool:
+        """
+        A failing node is logged and skipped, so it does not abort the fetching of the remaining nodes.
+        """
+        try:
             self.__info_fetcher.download_broker_data_to_file(id_node)
             self.__error_fetcher.download_broker_data_to_file(id_node)
             self.__resources_fetcher.download_broker_data_to_file(id_node)
+            return True
+        except Exception:
+            logging.exception('Fetching information of node %s failed', id_node)
+            return False
 
 
 if __name__ == '__main__':
     if len(sys.argv) == 1:
-        raise SystemExit(f'Usage: python {__file__} <path_to_config.toml>')
-    Main.main(sys.argv[1], lambda: NodeRetrieverManager().fetch_broker_node_information())
+        raise SystemExit(f'Usage: python {__file__} <path_to_config.toml> [--async]')
+    if '--async' in sys.argv[2:]:
+        Main.main(sys.argv[1], lambda: asyncio.run(NodeRetrieverManager().fetch_broker_node_information_async()))
+    else:
+        Main.main(sys.argv[1], lambda: NodeRetrieverManager().fetch_broker_node_information())
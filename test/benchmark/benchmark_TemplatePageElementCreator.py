@@ -0,0 +1,59 @@
+"""
+Microbenchmark for the creation of a Confluence error table row. Compares the creation of each
+element by its own soup (as done before) with TemplatePageElementCreator, which creates all
+elements by a single soup. Run with: python benchmark_TemplatePageElementCreator.py [<num_rows>]
+"""
+
+import os
+import sys
+import timeit
+from pathlib import Path
+
+import bs4
+
+this_path = Path(os.path.realpath(__file__))
+path_src = os.path.join(this_path.parents[2], 'src')
+sys.path.insert(0, path_src)
+
+from csv_to_confluence import TemplatePageElementCreator
+
+PARSER = 'html.parser'
+
+
+def create_row_with_soup_per_element() -> bs4.Tag:
+    row = bs4.BeautifulSoup(features=PARSER).new_tag('tr')
+    for content, attributes in [('2023-01-01 00:00:00', {'style': 'text-align: center;'}), ('1', {'style': 'text-align: center;'}), ('error', {})]:
+        data = bs4.BeautifulSoup(features=PARSER).new_tag('td', attrs=attributes)
+        data.append(content)
+        row.append(data)
+    return row
+
+
+def create_row_with_element_creator(creator: TemplatePageElementCreator) -> bs4.Tag:
+    row = creator.create_html_element('tr')
+    row.extend([creator.create_td_html_element('2023-01-01 00:00:00', centered=True),
+                creator.create_td_html_element('1', centered=True),
+                creator.create_td_html_element('error')])
+    return row
+
+
+def create_link_by_parsing() -> bs4.BeautifulSoup:
+    return bs4.BeautifulSoup('<ac:link><ri:page ri:content-title="name" /></ac:link>', PARSER)
+
+
+def measure_in_microseconds(function, num_rows: int, repeat: int = 5) -> float:
+    timings = timeit.repeat(function, number=num_rows, repeat=repeat)
+    return min(timings) / num_rows * 1e6
+
+
+if __name__ == '__main__':
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    creator = TemplatePageElementCreator()
+    assert str(create_row_with_soup_per_element()) == str(create_row_with_element_creator(creator))
+    assert str(create_link_by_parsing()) == str(creator.create_ac_link_element('name'))
+    row_before = measure_in_microseconds(create_row_with_soup_per_element, num_rows)
+    row_after = measure_in_microseconds(lambda: create_row_with_element_creator(creator), num_rows)
+    link_before = measure_in_microseconds(create_link_by_parsing, num_rows)
+    link_after = measure_in_microseconds(lambda: creator.create_ac_link_element('name'), num_rows)
+    print(f'error table row: {row_before:.1f} us -> {row_after:.1f} us per row')
+    print(f'ac:link element: {link_before:.1f} us -> {link_after:.1f} us per link')
@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+
+import requests
+from common import AsyncBrokerNodeConnection, BrokerNodeConnection, ConfigReader
+
+from BrokerNodeDummy import BrokerNodeDummy, BrokerNodeImports, BrokerNodeVersions
+
+
+class TestAsyncBrokerNodeConnection(unittest.TestCase):
+    __DEFAULT_API_KEY: str = 'xxxApiKey123'
+    __DEFAULT_NODE_ID: str = '0'
+
+    @classmethod
+    def setUpClass(cls):
+        ConfigReader().load_config_as_env_vars('settings.toml')
+        cls.__DUMMY = BrokerNodeDummy(cls.__DEFAULT_API_KEY)
+        cls.__BROKER_NODE_CONNECTION = BrokerNodeConnection()
+        cls.__ASYNC_BROKER_NODE_CONNECTION = AsyncBrokerNodeConnection()
+
+    def test_get_broker_node_stats(self):
+        stats = BrokerNodeImports('2020-01-01T00:00:00+01:00', '2020-01-02T12:00:00+01:00', '', '400', '300', '200', '100')
+        self.__DUMMY.put_import_info_on_broker(stats)
+        stats2 = asyncio.run(self.__ASYNC_BROKER_NODE_CONNECTION.get_broker_node_stats(self.__DEFAULT_NODE_ID))
+        self.assertEqual('2020-01-01T00:00:00+01:00', stats2.dwh_start)
+        self.assertEqual('2020-01-02T12:00:00+01:00', stats2.last_write)
+        self.assertIsNone(stats2.last_reject)
+        self.assertEqual('400', stats2.imported)
+
+    def test_get_broker_nonexisting_node_stats(self):
+        with self.assertRaises(requests.exceptions.HTTPError):
+            _ = asyncio.run(self.__ASYNC_BROKER_NODE_CONNECTION.get_broker_node_stats('nonexisting_id'))
+
+    def test_get_all_endpoints_concurrently(self):
+        versions = BrokerNodeVersions('Ubuntu/11.0.13', 'Ubuntu 20.04.1 LTS')
+        self.__DUMMY.put_resource_on_broker(versions, 'versions')
+        node, stats, resource = asyncio.run(self.__gather_node_stats_and_versions(self.__DEFAULT_NODE_ID))
+        self.assertEqual(self.__DEFAULT_NODE_ID, node.id)
+        self.assertIsNotNone(stats.dwh_start)
+        self.assertEqual('Ubuntu/11.0.13', resource.get('java'))
+
+    def test_fill_response_cache(self):
+        self.__BROKER_NODE_CONNECTION.enable_response_cache()
+        try:
+            asyncio.run(self.__gather_node_stats_and_versions(self.__DEFAULT_NODE_ID))
+            _ = self.__BROKER_NODE_CONNECTION.get_broker_node_errors(self.__DEFAULT_NODE_ID)
+            self.assertEqual(3, self.__BROKER_NODE_CONNECTION.get_response_cache_misses())
+            self.assertEqual(1, self.__BROKER_NODE_CONNECTION.get_response_cache_hits())
+        finally:
+            self.__BROKER_NODE_CONNECTION.disable_response_cache()
+
+    async def __gather_node_stats_and_versions(self, node_id: str) -> list:
+        return await asyncio.gather(
+            self.__ASYNC_BROKER_NODE_CONNECTION.get_broker_node(node_id),
+            self.__ASYNC_BROKER_NODE_CONNECTION.get_broker_node_stats(node_id),
+            self.__ASYNC_BROKER_NODE_CONNECTION.get_broker_node_resource(node_id, 'versions'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -83,6 +83,31 @@ class TestBrokerNodeConnection(unittest.TestCase):
         with self.assertRaises(requests.exceptions.HTTPError):
             _ = self.__BROKER_NODE_CONNECTION.get_broker_node_errors('nonexisting_id')
 
+    def test_response_cache_for_stats_and_errors(self):
+        stats = self.__create_default_broker_import_stats()
+        self.__DUMMY.put_import_info_on_broker(stats)
+        self.__BROKER_NODE_CONNECTION.enable_response_cache()
+        try:
+            stats2 = self.__BROKER_NODE_CONNECTION.get_broker_node_stats(self.__DEFAULT_NODE_ID)
+            list_errors = self.__BROKER_NODE_CONNECTION.get_broker_node_errors(self.__DEFAULT_NODE_ID)
+            self.assertEqual('400', stats2.imported)
+            self.assertEqual(0, len(list_errors))
+            self.assertEqual(1, self.__BROKER_NODE_CONNECTION.get_response_cache_misses())
+            self.assertEqual(1, self.__BROKER_NODE_CONNECTION.get_response_cache_hits())
+        finally:
+            self.__BROKER_NODE_CONNECTION.disable_response_cache()
+
+    def test_response_cache_for_nonexisting_node(self):
+        self.__BROKER_NODE_CONNECTION.enable_response_cache()
+        try:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                _ = self.__BROKER_NODE_CONNECTION.get_broker_node_stats('nonexisting_id')
+            with self.assertRaises(requests.exceptions.HTTPError):
+                _ = self.__BROKER_NODE_CONNECTION.get_broker_node_errors('nonexisting_id')
+            self.assertEqual(1, self.__BROKER_NODE_CONNECTION.get_response_cache_misses())
+        finally:
+            self.__BROKER_NODE_CONNECTION.disable_response_cache()
+
     def test_get_broker_node_versions(self):
         versions = BrokerNodeVersions('Ubuntu/11.0.13', 'Ubuntu 20.04.1 LTS')
         self.__DUMMY.put_resource_on_broker(versions, 'versions')
@@ -1,3 +1,4 @@
+import json
 import os
 import unittest
 from datetime import datetime, timedelta
@@ -131,6 +132,24 @@ class TestNodeInfoRetriever(unittest.TestCase):
         self.__check_global_import_stats_in_csv_row(df.iloc[0], '2000', '400', '250', '350', '20.00')
         self.__check_daily_import_stats_in_csv_row(df.iloc[0], '-', '-', '-', '-', '-')
 
+    def test_fetch_new_stats_after_year_change_from_state_file(self):
+        self.__change_date_of_current_csv_and_state_to_past_days(1)
+        os.remove(self.__DEFAULT_CSV_PATH)
+        stats2 = self.__create_stats2()
+        df = self.__put_import_stats_on_broker_and_get_fetched_csv_as_df(stats2)
+        self.assertEqual(1, df.shape[0])
+        self.__check_daily_import_stats_in_csv_row(df.iloc[0], '2000', '400', '250', '350', '20.00')
+
+    def __change_date_of_current_csv_and_state_to_past_days(self, days: int):
+        self.__change_date_of_current_csv_to_past_days(days)
+        df = self.__CSV_HANDLER.read_csv_as_df(self.__DEFAULT_CSV_PATH)
+        path_state = os.path.join(self.__DIR_ROOT, self.__DEFAULT_NODE_ID, '0_stats_state.json')
+        with open(path_state, 'r') as file:
+            state = json.load(file)
+        state['last_row'] = df.iloc[-1].to_dict()
+        with open(path_state, 'w') as file:
+            json.dump(state, file)
+
     def __create_stats1(self):
         return BrokerNodeImports(self.__add_timezone_to_date_string('20200101'),
                                  '',
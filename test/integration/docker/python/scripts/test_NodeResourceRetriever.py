@@ -55,6 +55,21 @@ class TestNodeResourceRetriever(unittest.TestCase):
         content = self.__get_content_of_file_in_working_dir('0_import-scripts.txt')
         self.assertEqual('{"p21": "1.5"}', content)
 
+    def test_skip_unchanged_broker_node_versions(self):
+        versions = BrokerNodeVersions('1', '2')
+        self.__DUMMY.put_resource_on_broker(versions, 'versions')
+        self.__RETRIEVER.download_broker_data_to_file(self.__DEFAULT_NODE_ID)
+        self.assertTrue(self.__check_file_existance_in_working_dir('0_resource_validators.json'))
+        path_file = os.path.join(self.__DIR_ROOT, self.__DEFAULT_NODE_ID, '0_versions.txt')
+        os.utime(path_file, (0, 0))
+        self.__RETRIEVER.download_broker_data_to_file(self.__DEFAULT_NODE_ID)
+        self.assertEqual(0, os.path.getmtime(path_file))
+        self.__DUMMY.put_resource_on_broker(BrokerNodeVersions('3', '2'), 'versions')
+        self.__RETRIEVER.download_broker_data_to_file(self.__DEFAULT_NODE_ID)
+        self.assertNotEqual(0, os.path.getmtime(path_file))
+        content = self.__get_content_of_file_in_working_dir('0_versions.txt')
+        self.assertEqual('{"java": "3", "os": "2"}', content)
+
     def __get_content_of_file_in_working_dir(self, filename: str) -> str:
         path_file = os.path.join(self.__DIR_ROOT, self.__DEFAULT_NODE_ID, filename)
         with open(path_file, 'r') as file:
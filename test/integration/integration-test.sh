@@ -19,6 +19,7 @@ docker cp $ROOT_DIR/src/node_to_csv.py python:/opt/
 
 echo -e "${YEL}Run python unit tests ${WHI}"
 docker exec python pytest test_BrokerNodeConnection.py
+docker exec python pytest test_AsyncBrokerNodeConnection.py
 docker exec python pytest test_NodeInfoRetriever.py
 docker exec python pytest test_NodeErrorRetriever.py
 docker exec python pytest test_NodeResourceRetriever.py
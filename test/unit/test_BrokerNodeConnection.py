@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+this_path = Path(os.path.realpath(__file__))
+path_src = os.path.join(this_path.parents[2], 'src')
+sys.path.insert(0, path_src)
+
+from common import AsyncBrokerNodeConnection, BrokerNodeConnection, ConfigReader, SingletonMeta
+
+
+class LocalBrokerServer(ThreadingHTTPServer):
+    """
+    Minimal broker stand-in. Serves the resource 'versions' of node 1 with an ETag and
+    answers matching conditional requests with '304 Not Modified'. Node 2 has no ETag and
+    a content, which is not valid XML. Keeps the headers of all GET requests and counts the
+    opened connections.
+    """
+    daemon_threads = True
+    etag = '"v1"'
+    versions = b'<properties><entry key="dwh-j2ee">dwh-j2ee-1.5</entry></properties>'
+    invalid = b'not xml'
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), LocalBrokerHandler)
+        self.requests = []
+        self.connections = 0
+
+    def get_url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class LocalBrokerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        if self.path == '/broker/node/1/versions':
+            if self.headers.get('If-None-Match') == self.server.etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.__send_content(self.server.versions, {'ETag': self.server.etag})
+        elif self.path == '/broker/node/2/versions':
+            self.__send_content(self.server.invalid, {})
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    def __send_content(self, content: bytes, headers: dict):
+        self.send_response(200)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestBrokerNodeConnection(unittest.TestCase):
+
+    def setUp(self):
+        path_settings = os.path.join(this_path.parents[1], 'resources', 'settings.toml')
+        ConfigReader().load_config_as_env_vars(path_settings)
+        self.__server = LocalBrokerServer()
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        os.environ['BROKER.URL'] = self.__server.get_url()
+        SingletonMeta._instances.pop(BrokerNodeConnection, None)
+        self.__connection = BrokerNodeConnection()
+        self.__connection.enable_response_cache()
+
+    def tearDown(self):
+        self.__connection.disable_response_cache()
+        SingletonMeta._instances.pop(BrokerNodeConnection, None)
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def test_conditional_request_with_cache_enabled(self):
+        validators = {'etag': self.__server.etag, 'content_hash': 'outdated'}
+        for _ in range(2):
+            resource, new_validators = self.__connection.get_broker_node_resource_if_modified('1', 'versions', validators)
+            self.assertIsNone(resource)
+            self.assertEqual(validators, new_validators)
+        self.assertEqual(1, len(self.__server.requests))
+        self.assertEqual(self.__server.etag, self.__server.requests[0][1]['If-None-Match'])
+        self.assertEqual(1, self.__connection.get_response_cache_hits())
+
+    def test_cached_response_without_validators_is_not_reused(self):
+        resource, validators = self.__connection.get_broker_node_resource_if_modified('1', 'versions', {})
+        self.assertEqual({'dwh-j2ee': 'dwh-j2ee-1.5'}, resource)
+        self.assertEqual(self.__server.etag, validators['etag'])
+        resource, _ = self.__connection.get_broker_node_resource_if_modified('1', 'versions', validators)
+        self.assertIsNone(resource)
+        self.assertEqual(2, len(self.__server.requests))
+        self.assertNotIn('If-None-Match', self.__server.requests[0][1])
+        self.assertEqual(self.__server.etag, self.__server.requests[1][1]['If-None-Match'])
+
+    def test_unchanged_content_hash_is_not_parsed(self):
+        validators = {'content_hash': hashlib.sha256(self.__server.invalid).hexdigest()}
+        resource, new_validators = self.__connection.get_broker_node_resource_if_modified('2', 'versions', validators)
+        self.assertIsNone(resource)
+        self.assertEqual(validators['content_hash'], new_validators['content_hash'])
+
+    def test_requests_share_one_connection(self):
+        self.__connection.disable_response_cache()
+        for _ in range(3):
+            self.__connection.get_broker_node_resource('1', 'versions')
+        self.__connection.get_broker_node_resource('3', 'versions')
+        self.assertEqual(1, self.__server.connections)
+        headers = self.__server.requests[0][1]
+        self.assertEqual('Bearer CHANGEME', headers['Authorization'])
+        self.assertEqual('application/xml', headers['Accept'])
+        self.assertEqual('keep-alive', headers['Connection'])
+
+    def test_connection_is_closed_without_keep_alive(self):
+        os.environ['BROKER.KEEP_ALIVE'] = 'False'
+        SingletonMeta._instances.pop(BrokerNodeConnection, None)
+        connections_before = self.__server.connections
+        connection = BrokerNodeConnection()
+        for _ in range(2):
+            connection.get_broker_node_resource('1', 'versions')
+        self.assertEqual(3, self.__server.connections - connections_before)
+        self.assertEqual('close', self.__server.requests[0][1]['Connection'])
+
+    def test_async_requests_share_the_response_cache(self):
+        SingletonMeta._instances.pop(AsyncBrokerNodeConnection, None)
+        self.addCleanup(SingletonMeta._instances.pop, AsyncBrokerNodeConnection, None)
+        connection = AsyncBrokerNodeConnection()
+
+        async def request_twice():
+            return [await connection.get_broker_node_resource_if_modified('1', 'versions', {}) for _ in range(2)]
+
+        first, second = asyncio.run(request_twice())
+        self.assertEqual({'dwh-j2ee': 'dwh-j2ee-1.5'}, first[0])
+        self.assertEqual(first, second)
+        self.assertEqual(1, len(self.__server.requests))
+
+if __name__ == '__main__':
+    unittest.main()
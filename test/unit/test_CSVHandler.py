@@ -0,0 +1,111 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from shutil import rmtree
+
+this_path = Path(os.path.realpath(__file__))
+path_src = os.path.join(this_path.parents[2], 'src')
+sys.path.insert(0, path_src)
+
+from common import InfoCSVHandler, ConfigReader, TimestampHandler
+
+
+class TestCSVHandler(unittest.TestCase):
+    __WORKING_DIR: str = None
+
+    @classmethod
+    def setUpClass(cls):
+        path_settings = os.path.join(this_path.parents[1], 'resources', 'settings.toml')
+        ConfigReader().load_config_as_env_vars(path_settings)
+        cls.__WORKING_DIR = os.environ['DIR.WORKING'] if os.environ['DIR.WORKING'] else os.getcwd()
+        cls.__HANDLER = InfoCSVHandler()
+
+    def setUp(self):
+        if not os.path.exists(self.__WORKING_DIR):
+            os.makedirs(self.__WORKING_DIR)
+        self.__csv_path = self.__HANDLER.init_csv_file(self.__WORKING_DIR, 'test.csv')
+
+    def tearDown(self):
+        rmtree(self.__WORKING_DIR)
+
+    def test_read_last_rows_of_empty_csv(self):
+        df = self.__HANDLER.read_last_rows_as_df(self.__csv_path, 2)
+        self.assertTrue(df.empty)
+        self.assertEqual(self.__HANDLER.get_csv_columns(), list(df.columns))
+
+    def test_read_last_rows(self):
+        self.__append_rows(['1', '2', '3', '4'])
+        df = self.__HANDLER.read_last_rows_as_df(self.__csv_path, 2)
+        self.assertEqual(['3', '4'], df['date'].tolist())
+        df = self.__HANDLER.read_last_rows_as_df(self.__csv_path, 10)
+        self.assertEqual(['1', '2', '3', '4'], df['date'].tolist())
+
+    def test_append_rows(self):
+        self.__append_rows(['1', '2'])
+        df = self.__HANDLER.read_csv_as_df(self.__csv_path)
+        self.assertEqual(['1', '2'], df['date'].tolist())
+        self.assertEqual(self.__HANDLER.get_csv_columns(), list(df.columns))
+
+    def test_replace_last_row(self):
+        self.__append_rows(['1', '2'])
+        self.__HANDLER.append_row_to_file(self.__create_row('3'), self.__csv_path, replace_last_row=True)
+        df = self.__HANDLER.read_csv_as_df(self.__csv_path)
+        self.assertEqual(['1', '3'], df['date'].tolist())
+
+    def test_replace_last_row_of_empty_csv(self):
+        self.__HANDLER.append_row_to_file(self.__create_row('1'), self.__csv_path, replace_last_row=True)
+        df = self.__HANDLER.read_csv_as_df(self.__csv_path)
+        self.assertEqual(['1'], df['date'].tolist())
+
+    def test_read_last_rows_of_node_history(self):
+        this_year, last_year = self.__init_yearly_csv_files()
+        self.__append_rows_to_csv(['a', 'b'], last_year)
+        self.__append_rows_to_csv(['c'], this_year)
+        df = self.__HANDLER.read_last_rows_of_node_history_as_df(self.__WORKING_DIR, '1', 2)
+        self.assertEqual(['b', 'c'], df['date'].tolist())
+        df = self.__HANDLER.read_last_rows_of_node_history_as_df(self.__WORKING_DIR, '1', 5)
+        self.assertEqual(['a', 'b', 'c'], df['date'].tolist())
+
+    def test_read_node_history_in_date_window(self):
+        this_year, last_year = self.__init_yearly_csv_files()
+        year = TimestampHandler().get_current_year()
+        previous_year = str(int(year) - 1)
+        self.__append_rows_to_csv([f'{previous_year}-06-01', f'{previous_year}-12-31'], last_year)
+        self.__append_rows_to_csv([f'{year}-01-01'], this_year)
+        df = self.__HANDLER.read_node_history_as_df(self.__WORKING_DIR, '1')
+        self.assertEqual([f'{year}-01-01'], df['date'].tolist())
+        df = self.__HANDLER.read_node_history_as_df(self.__WORKING_DIR, '1', start_date=f'{previous_year}-12-01 00:00:00+00:00')
+        self.assertEqual([f'{previous_year}-12-31', f'{year}-01-01'], df['date'].tolist())
+
+    def test_read_modified_node_history(self):
+        this_year, _ = self.__init_yearly_csv_files()
+        self.__append_rows_to_csv(['a'], this_year)
+        df = self.__HANDLER.read_node_history_as_df(self.__WORKING_DIR, '1')
+        df.loc[0, 'date'] = 'modified'
+        self.__append_rows_to_csv(['b'], this_year)
+        df = self.__HANDLER.read_node_history_as_df(self.__WORKING_DIR, '1')
+        self.assertEqual(['a', 'b'], df['date'].tolist())
+
+    def __init_yearly_csv_files(self) -> tuple:
+        year = TimestampHandler().get_current_year()
+        this_year = self.__HANDLER.init_csv_file(self.__WORKING_DIR, self.__HANDLER.generate_node_csv_name('1', year))
+        last_year = self.__HANDLER.init_csv_file(self.__WORKING_DIR, self.__HANDLER.generate_node_csv_name('1', str(int(year) - 1)))
+        return this_year, last_year
+
+    def __append_rows_to_csv(self, dates: list, csv_path: str):
+        for date in dates:
+            self.__HANDLER.append_row_to_file(self.__create_row(date), csv_path)
+
+    def __append_rows(self, dates: list):
+        self.__append_rows_to_csv(dates, self.__csv_path)
+
+    def __create_row(self, date: str) -> dict:
+        row = {column: '-' for column in self.__HANDLER.get_csv_columns()}
+        row['date'] = date
+        row['imported'] = 10
+        return row
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,12 +2,16 @@ import os
 import sys
 import unittest
 from pathlib import Path
+from shutil import rmtree
+from unittest import mock
+
+import requests
 
 this_path = Path(os.path.realpath(__file__))
 path_src = os.path.join(this_path.parents[2], 'src')
 sys.path.insert(0, path_src)
 
-from common import ConfluenceConnection, ConfigReader
+from common import ConfluenceConnection, ConfigReader, SingletonMeta
 
 
 class TestConfluenceConnection(unittest.TestCase):
@@ -30,5 +34,113 @@ class TestConfluenceConnection(unittest.TestCase):
         self.assertFalse(self.__CONFLUENCE_CONNECTION.does_page_exists('Nonexisting'))
 
 
+class TestConfluenceConnectionWithMockedClient(unittest.TestCase):
+    """
+    The Atlassian client is replaced by a mock, so the caching of ConfluenceConnection
+    can be tested without a running Confluence
+    """
+    __WORKING_DIR: str = None
+
+    @classmethod
+    def setUpClass(cls):
+        path_settings = os.path.join(this_path.parents[1], 'resources', 'settings.toml')
+        ConfigReader().load_config_as_env_vars(path_settings)
+        cls.__WORKING_DIR = os.environ['DIR.WORKING'] if os.environ['DIR.WORKING'] else os.getcwd()
+
+    def setUp(self):
+        if not os.path.exists(self.__WORKING_DIR):
+            os.makedirs(self.__WORKING_DIR)
+        self.__instance = SingletonMeta._instances.pop(ConfluenceConnection, None)
+        patcher = mock.patch('common.Confluence')
+        self.__client = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.__connection = ConfluenceConnection()
+
+    def tearDown(self):
+        SingletonMeta._instances.pop(ConfluenceConnection, None)
+        if self.__instance is not None:
+            SingletonMeta._instances[ConfluenceConnection] = self.__instance
+        rmtree(self.__WORKING_DIR)
+
+    def test_stale_page_id_is_looked_up_again(self):
+        self.__client.get_page_id.side_effect = ['1', '2']
+        self.__client.get_page_by_id.side_effect = self.__get_page_by_id_with_stale_id('1')
+        self.assertEqual('1', self.__connection.get_page_id('Page'))
+        self.assertEqual('content', self.__connection.get_page_content('Page'))
+        self.assertEqual(['1', '2'], [call.args[0] for call in self.__client.get_page_by_id.call_args_list])
+        self.assertEqual('2', self.__connection.get_page_id('Page'))
+        self.assertEqual(2, self.__client.get_page_id.call_count)
+
+    def test_not_found_error_of_uncached_page_id_is_raised(self):
+        self.__client.get_page_id.return_value = '1'
+        self.__client.get_page_by_id.side_effect = self.__get_page_by_id_with_stale_id('1')
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.__connection.get_page_content('Page')
+        self.assertEqual(1, self.__client.get_page_by_id.call_count)
+
+    def test_cached_id_of_deleted_page_is_dropped(self):
+        self.__client.get_page_id.side_effect = ['1', None, None]
+        self.__client.get_page_by_id.side_effect = self.__get_page_by_id_with_stale_id('1')
+        self.assertTrue(self.__connection.does_page_exists('Page'))
+        with self.assertRaises(requests.exceptions.HTTPError) as context:
+            self.__connection.get_page_content('Page')
+        self.assertTrue(ConfluenceConnection.is_page_not_found_error(context.exception))
+        self.assertFalse(self.__connection.does_page_exists('Page'))
+
+    def test_unchanged_content_is_not_updated(self):
+        self.__client.get_page_id.return_value = '1'
+        self.assertTrue(self.__connection.update_confluence_page_if_changed('Page', '<p>a</p>'))
+        self.assertFalse(self.__connection.update_confluence_page_if_changed('Page', ' <p>a</p>\n'))
+        self.assertTrue(self.__connection.update_confluence_page_if_changed('Page', '<p>b</p>'))
+        self.assertEqual(2, self.__client.update_page.call_count)
+        self.assertEqual(1, self.__connection.get_skipped_updates())
+
+    def test_failed_update_drops_fingerprint(self):
+        self.__client.get_page_id.return_value = '1'
+        self.__connection.update_confluence_page_if_changed('Page', '<p>a</p>')
+        self.__client.update_page.side_effect = ConnectionError
+        with self.assertRaises(ConnectionError):
+            self.__connection.update_confluence_page_if_changed('Page', '<p>b</p>')
+        self.__client.update_page.side_effect = None
+        self.assertTrue(self.__connection.update_confluence_page_if_changed('Page', '<p>a</p>'))
+        self.assertEqual(3, self.__client.update_page.call_count)
+
+    def test_page_changed_on_confluence_is_updated(self):
+        self.__client.get_page_id.return_value = '1'
+        self.assertTrue(self.__upload_in_new_run('<p>a</p>', 'none'))
+        self.assertFalse(self.__upload_in_new_run('<p>a</p>', '<p ac:id="1">a</p>'))
+        self.assertFalse(self.__upload_in_new_run('<p>a</p>', '<p ac:id="1">a</p>'))
+        self.assertTrue(self.__upload_in_new_run('<p>a</p>', '<p>edited</p>'))
+        self.assertFalse(self.__upload_in_new_run('<p>a</p>', '<p ac:id="1">a</p>'))
+        self.assertEqual(2, self.__client.update_page.call_count)
+
+    def __upload_in_new_run(self, content: str, content_on_confluence: str) -> bool:
+        SingletonMeta._instances.pop(ConfluenceConnection, None)
+        connection = ConfluenceConnection()
+        self.__client.get_page_by_id.return_value = {'body': {'storage': {'value': content_on_confluence}}}
+        connection.get_page_content('Page')
+        return connection.update_confluence_page_if_changed('Page', content)
+
+    def test_child_pages_with_capped_page_size(self):
+        children = [{'id': i, 'title': f'Page {i}', 'body': {'storage': {'value': f'content {i}'}}} for i in range(5)]
+        self.__client.get_page_id.return_value = '100'
+        self.__client.get_page_child_by_type.side_effect = lambda parent_id, type, start, limit, expand: children[start:start + 2]
+        self.assertEqual(5, self.__connection.load_child_pages_into_cache('Parent', page_size=50))
+        self.assertEqual(4, self.__client.get_page_child_by_type.call_count)
+        self.assertEqual('content 4', self.__connection.get_page_content('Page 4'))
+        self.assertEqual('3', self.__connection.get_page_id('Page 3'))
+        self.assertEqual(1, self.__client.get_page_id.call_count)
+
+    @staticmethod
+    def __get_page_by_id_with_stale_id(stale_id: str):
+        def get_page_by_id(page_id: str, **kwargs) -> dict:
+            if page_id == stale_id:
+                response = requests.Response()
+                response.status_code = 404
+                raise requests.exceptions.HTTPError(response=response)
+            return {'body': {'storage': {'value': 'content'}}}
+        return get_page_by_id
+
+
 if __name__ == '__main__':
     unittest.main()
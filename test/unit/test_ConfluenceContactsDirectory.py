@@ -0,0 +1,65 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from shutil import rmtree
+
+this_path = Path(os.path.realpath(__file__))
+path_src = os.path.join(this_path.parents[2], 'src')
+sys.path.insert(0, path_src)
+
+from common import ConfigReader, ConfluenceContactsDirectory, TextWriter, TimestampHandler
+
+
+class TestConfluenceContactsDirectory(unittest.TestCase):
+    __WORKING_DIR: str = None
+    __COLUMNS: list = ['Node ID', 'Ansprechpartner für', 'Vorname', 'Kontakt']
+
+    @classmethod
+    def setUpClass(cls):
+        path_settings = os.path.join(this_path.parents[1], 'resources', 'settings.toml')
+        ConfigReader().load_config_as_env_vars(path_settings)
+        cls.__WORKING_DIR = os.environ['DIR.WORKING'] if os.environ['DIR.WORKING'] else os.getcwd()
+
+    def setUp(self):
+        if not os.path.exists(self.__WORKING_DIR):
+            os.makedirs(self.__WORKING_DIR)
+
+    def tearDown(self):
+        rmtree(self.__WORKING_DIR)
+
+    def test_parse_table_with_header(self):
+        page = self.__create_table_page('th')
+        contacts = ConfluenceContactsDirectory.parse_contacts_table(page)
+        self.__check_parsed_contacts(contacts)
+
+    def test_parse_table_with_header_as_first_row(self):
+        page = self.__create_table_page('td')
+        contacts = ConfluenceContactsDirectory.parse_contacts_table(page)
+        self.__check_parsed_contacts(contacts)
+
+    def test_contacts_of_node_from_cache(self):
+        contacts = ConfluenceContactsDirectory.parse_contacts_table(self.__create_table_page('th'))
+        cache = {'version': 1, 'fetched': TimestampHandler().get_current_date(), 'contacts': contacts}
+        TextWriter().save_dict_as_txt_file(cache, os.path.join(self.__WORKING_DIR, 'confluence_contacts.json'))
+        directory = ConfluenceContactsDirectory()
+        self.assertEqual(['a@x.de', 'b@x.de'], [contact['Kontakt'] for contact in directory.get_contacts_of_node('1', 'IT')])
+        self.assertEqual(['c@x.de'], [contact['Kontakt'] for contact in directory.get_contacts_of_node('2', 'Notaufnahme')])
+        self.assertEqual([], directory.get_contacts_of_node('2', 'IT'))
+        self.assertEqual([], directory.get_contacts_of_node('99', 'IT'))
+
+    def __check_parsed_contacts(self, contacts: list):
+        self.assertEqual(3, len(contacts))
+        self.assertEqual(self.__COLUMNS, list(contacts[0].keys()))
+        self.assertEqual(['1', '1', '2'], [contact['Node ID'] for contact in contacts])
+        self.assertEqual('', contacts[1]['Vorname'])
+
+    def __create_table_page(self, header_tag: str) -> str:
+        rows = [['1', 'IT', 'Anna', 'a@x.de'], ['1', 'IT', '', 'b@x.de'], ['2', 'Notaufnahme', 'Carl', 'c@x.de'], ['', '', '', '']]
+        header = ''.join([f'<{header_tag}>{column}</{header_tag}>' for column in self.__COLUMNS])
+        body = ''.join(['<tr>' + ''.join([f'<td>{value}</td>' for value in row]) + '</tr>' for row in rows])
+        return f'<table><tbody><tr>{header}</tr>{body}</tbody></table>'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+import contextlib
+import itertools
+import os
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from shutil import rmtree
+from unittest import mock
+
+import requests
+
+this_path = Path(os.path.realpath(__file__))
+path_src = os.path.join(this_path.parents[2], 'src')
+sys.path.insert(0, path_src)
+
+from common import ConfigReader, ErrorCSVHandler, InfoCSVHandler, SingletonABCMeta, SingletonMeta, TextWriter, TimestampHandler
+from csv_to_confluence import ConfluencePageHandler, ConfluencePageHandlerManager, NodeSummaryRecordStorage, TemplatePageLoader
+
+
+class FakeConfluence:
+    """
+    In-memory stand-in for the Atlassian client. Updates of pages in 'failing_titles' raise an error
+    """
+    failing_titles: set = set()
+
+    def __init__(self, url: str = None, token: str = None):
+        self.pages = {}
+        self.updated = []
+        self.__ids = itertools.count(1)
+
+    def get_page_id(self, space: str, title: str):
+        for page_id, page in self.pages.items():
+            if page['title'] == title:
+                return page_id
+        return None
+
+    def get_page_by_id(self, page_id: str, expand: str = None) -> dict:
+        if page_id not in self.pages:
+            response = requests.Response()
+            response.status_code = 404
+            raise requests.exceptions.HTTPError(response=response)
+        page = self.pages[page_id]
+        return {'id': page_id, 'title': page['title'], 'body': {'storage': {'value': page['body']}}, 'version': {'number': 1}}
+
+    def get_page_child_by_type(self, parent_id: str, type: str, start: int, limit: int, expand: str) -> list:
+        children = [self.get_page_by_id(page_id) for page_id, page in self.pages.items() if page['parent_id'] == parent_id]
+        return children[start:start + limit]
+
+    def create_page(self, space: str, title: str, body: str, parent_id: str = None) -> dict:
+        page_id = str(next(self.__ids))
+        self.pages[page_id] = {'title': title, 'body': body, 'parent_id': parent_id}
+        return {'id': page_id}
+
+    def update_page(self, page_id: str, title: str, body: str):
+        if title in self.failing_titles:
+            raise ConnectionError(f'update of {title} failed')
+        self.pages[page_id]['body'] = body
+        self.updated.append(title)
+
+    def attach_file(self, filepath: str, content_type: str = None, page_id: str = None):
+        pass
+
+
+class TestConfluencePageHandlerManager(unittest.TestCase):
+    """
+    Node pages are rendered for real and uploaded to a fake Confluence, where the page of node 2 fails
+    """
+    __WORKING_DIR: str = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.__load_settings()
+        cls.__WORKING_DIR = os.environ['DIR.WORKING'] if os.environ['DIR.WORKING'] else os.getcwd()
+
+    def setUp(self):
+        for node_id in ['1', '2']:
+            self.__write_info_row(node_id)
+        contacts = {'version': 1, 'fetched': TimestampHandler().get_current_date(), 'contacts': []}
+        TextWriter().save_dict_as_txt_file(contacts, os.path.join(self.__WORKING_DIR, 'confluence_contacts.json'))
+        self.__instances = (dict(SingletonMeta._instances), dict(SingletonABCMeta._instances))
+        SingletonMeta._instances.clear()
+        SingletonABCMeta._instances.clear()
+        FakeConfluence.failing_titles = {'[2] Clinic2'}
+        patcher = mock.patch('common.Confluence', FakeConfluence)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        SingletonMeta._instances.clear()
+        SingletonMeta._instances.update(self.__instances[0])
+        SingletonABCMeta._instances.clear()
+        SingletonABCMeta._instances.update(self.__instances[1])
+        self.__load_settings()
+        rmtree(self.__WORKING_DIR)
+
+    def test_failing_node_in_serial_upload(self):
+        self.__check_upload_with_failing_node(max_workers=1, render_processes=0)
+
+    def test_failing_node_in_pipelined_upload(self):
+        self.__check_upload_with_failing_node(max_workers=2, render_processes=0)
+
+    def test_failing_node_with_render_processes(self):
+        self.__check_upload_with_failing_node(max_workers=2, render_processes=1)
+
+    def test_failing_node_with_render_processes_and_single_thread(self):
+        self.__check_upload_with_failing_node(max_workers=1, render_processes=2)
+
+    def test_pages_are_rendered_concurrently_by_threads(self):
+        handler = ConfluencePageHandler()
+        template = TemplatePageLoader().get_template_page()
+        node_ids = ['1', '2'] * 4
+        expected = [handler.render_page_of_node(template, node_id) for node_id in node_ids]
+        with ThreadPoolExecutor(len(node_ids)) as pool:
+            rendered = list(pool.map(handler.render_page_of_node, [template] * len(node_ids), node_ids))
+        self.assertEqual(expected, rendered)
+        self.assertIn('Institute of One', rendered[0][0])
+
+    def test_page_is_parsed_once_for_all_content_writers(self):
+        handler = ConfluencePageHandler()
+        template = TemplatePageLoader().get_template_page()
+        writers = handler._ConfluencePageHandler__content_writers
+        expected = template
+        for writer in writers:
+            expected = writer.add_content_to_template_page(expected, '1')
+        with contextlib.ExitStack() as stack:
+            spies = [stack.enter_context(mock.patch.object(writer, 'add_content_to_template_soup', wraps=writer.add_content_to_template_soup))
+                     for writer in writers]
+            page, record = handler.render_page_of_node(template, '1')
+        soups = [spy.call_args.args[0] for spy in spies]
+        self.assertTrue(all(soup is soups[0] for soup in soups))
+        self.assertEqual(expected, page)
+        self.assertEqual('[1] Clinic1', record.common_name)
+
+    def test_node_pages_and_summary_in_single_run(self):
+        os.environ['CONFLUENCE.RENDER_PROCESSES'] = '0'
+        with self.assertLogs(level='WARNING'):
+            ConfluencePageHandlerManager().upload_confluence_pages()
+        client = self.__get_fake_client()
+        self.assertEqual(['[1] Clinic1', 'Support Log Broker-Monitor'], client.updated)
+        summary = client.pages[client.get_page_id(None, 'Support Log Broker-Monitor')]['body']
+        self.assertIn('[1] Clinic1', summary)
+        self.assertNotIn('[2] Clinic2', summary)
+
+    def test_summary_is_uploaded_if_node_pages_fail(self):
+        manager = ConfluencePageHandlerManager()
+        with mock.patch.object(manager, 'upload_node_information_as_confluence_pages', side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                manager.upload_confluence_pages()
+        self.assertEqual(['Support Log Broker-Monitor'], self.__get_fake_client().updated)
+
+    def test_deleted_page_is_created_again(self):
+        os.environ['CONFLUENCE.MAX_WORKERS'] = '1'
+        os.environ['CONFLUENCE.RENDER_PROCESSES'] = '0'
+        FakeConfluence.failing_titles = set()
+        ConfluencePageHandlerManager().upload_node_information_as_confluence_pages()
+        client = self.__get_fake_client()
+        deleted_id = client.get_page_id(None, '[1] Clinic1')
+        del client.pages[deleted_id]
+        SingletonMeta._instances.clear()
+        SingletonABCMeta._instances.clear()
+        with mock.patch('common.Confluence', return_value=client), self.assertLogs(level='WARNING') as logs:
+            ConfluencePageHandlerManager().upload_node_information_as_confluence_pages(full=True)
+        self.assertTrue(any('Page [1] Clinic1 was not found on Confluence' in line for line in logs.output))
+        self.assertFalse(any('Uploading failed' in line for line in logs.output))
+        page_id = client.get_page_id(None, '[1] Clinic1')
+        self.assertNotEqual(deleted_id, page_id)
+        self.assertIn('Institute of One', client.pages[page_id]['body'])
+
+    def __check_upload_with_failing_node(self, max_workers: int, render_processes: int):
+        os.environ['CONFLUENCE.MAX_WORKERS'] = str(max_workers)
+        os.environ['CONFLUENCE.RENDER_PROCESSES'] = str(render_processes)
+        manager = ConfluencePageHandlerManager()
+        with self.assertLogs(level='WARNING') as logs:
+            manager.upload_node_information_as_confluence_pages()
+        self.assertTrue(any("Uploading failed for 1 of 2 node pages: ['2']" in line for line in logs.output))
+        client = self.__get_fake_client()
+        self.assertEqual(['[1] Clinic1'], client.updated)
+        page = client.pages[client.get_page_id(None, '[1] Clinic1')]['body']
+        self.assertIn('Institute of One', page)
+        records = NodeSummaryRecordStorage()
+        self.assertIsNotNone(records.load_record_if_exists('1'))
+        self.assertIsNone(records.load_record_if_exists('2'))
+
+    def __write_info_row(self, node_id: str):
+        handler = InfoCSVHandler()
+        node_dir = os.path.join(self.__WORKING_DIR, node_id)
+        os.makedirs(node_dir, exist_ok=True)
+        csv_path = handler.init_csv_file(node_dir, handler.generate_node_csv_name(node_id))
+        now = TimestampHandler().get_current_date()
+        row = {column: '-' for column in handler.get_csv_columns()}
+        row.update({'date': now, 'last_contact': now, 'last_write': now, 'daily_imported': '0', 'daily_updated': '0',
+                    'daily_invalid': '0', 'daily_failed': '0', 'daily_error_rate': '0.0'})
+        handler.append_row_to_file(row, csv_path)
+        error_handler = ErrorCSVHandler()
+        error_handler.init_csv_file(node_dir, error_handler.generate_node_csv_name(node_id))
+
+    @staticmethod
+    def __get_fake_client() -> FakeConfluence:
+        from common import ConfluenceConnection
+        return ConfluenceConnection()._ConfluenceConnection__confluence
+
+    @staticmethod
+    def __load_settings():
+        path_settings = os.path.join(this_path.parents[1], 'resources', 'settings.toml')
+        ConfigReader().load_config_as_env_vars(path_settings)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from shutil import rmtree
+
+import pytz
+
+this_path = Path(os.path.realpath(__file__))
+path_src = os.path.join(this_path.parents[2], 'src')
+sys.path.insert(0, path_src)
+
+from common import ConfigReader, InfoCSVHandler, TextWriter
+from email_service import LocalNodeStatusSource, NodeStatusRecord
+
+
+class TestLocalNodeStatusSource(unittest.TestCase):
+    __WORKING_DIR: str = None
+
+    @classmethod
+    def setUpClass(cls):
+        path_settings = os.path.join(this_path.parents[1], 'resources', 'settings.toml')
+        ConfigReader().load_config_as_env_vars(path_settings)
+        cls.__WORKING_DIR = os.environ['DIR.WORKING'] if os.environ['DIR.WORKING'] else os.getcwd()
+        cls.__HANDLER = InfoCSVHandler()
+        cls.__SOURCE = LocalNodeStatusSource()
+
+    def setUp(self):
+        if not os.path.exists(self.__WORKING_DIR):
+            os.makedirs(self.__WORKING_DIR)
+
+    def tearDown(self):
+        rmtree(self.__WORKING_DIR)
+
+    def test_node_without_data(self):
+        self.assertIsNone(self.__SOURCE.get_status_record_of_node('1'))
+
+    def test_offline_node(self):
+        self.__write_info_row('1', last_contact=self.__create_timestamp(shift_days=-5), last_write='-')
+        TextWriter().save_dict_as_txt_file({'dwh-j2ee': 'dwh-j2ee-1.5'}, os.path.join(self.__WORKING_DIR, '1', '1_versions.txt'))
+        record = self.__SOURCE.get_status_record_of_node('1')
+        self.assertEqual('OFFLINE', record.status)
+        self.assertEqual('Institute of One', record.clinic_name)
+        self.assertEqual('-', record.last_write)
+        self.assertEqual('dwh-j2ee-1.5', record.dwh_version)
+
+    def test_online_node(self):
+        now = self.__create_timestamp()
+        self.__write_info_row('2', last_contact=now, last_write=now)
+        record = self.__SOURCE.get_status_record_of_node('2')
+        self.assertEqual(NodeStatusRecord, type(record))
+        self.assertEqual('ONLINE', record.status)
+        self.assertEqual('-', record.dwh_version)
+        self.assertEqual(19, len(record.last_contact))
+
+    def __write_info_row(self, node_id: str, last_contact: str, last_write: str):
+        node_dir = os.path.join(self.__WORKING_DIR, node_id)
+        os.makedirs(node_dir)
+        csv_path = self.__HANDLER.init_csv_file(node_dir, self.__HANDLER.generate_node_csv_name(node_id))
+        row = {column: '-' for column in self.__HANDLER.get_csv_columns()}
+        row.update({'date': self.__create_timestamp(), 'last_contact': last_contact, 'last_write': last_write})
+        self.__HANDLER.append_row_to_file(row, csv_path)
+
+    @staticmethod
+    def __create_timestamp(shift_days: int = 0) -> str:
+        return str(datetime.now(pytz.UTC) + timedelta(days=shift_days))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import json
+import os
+import sys
+import threading
+import unittest
+from email.mime.text import MIMEText
+from pathlib import Path
+from shutil import rmtree
+
+this_path = Path(os.path.realpath(__file__))
+path_src = os.path.join(this_path.parents[2], 'src')
+sys.path.insert(0, path_src)
+
+from common import ConfigReader, MailOutbox
+from test_MailSender import LocalSMTPServer
+
+
+class TestMailOutbox(unittest.TestCase):
+    __WORKING_DIR: str = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.__load_settings()
+        cls.__WORKING_DIR = os.environ['DIR.WORKING'] if os.environ['DIR.WORKING'] else os.getcwd()
+        cls.__OUTBOX = MailOutbox()
+
+    def setUp(self):
+        if not os.path.exists(self.__WORKING_DIR):
+            os.makedirs(self.__WORKING_DIR)
+        self.__server = None
+
+    def tearDown(self):
+        if self.__server:
+            self.__server.shutdown()
+            self.__server.server_close()
+        self.__load_settings()
+        rmtree(self.__WORKING_DIR)
+
+    def test_identical_mail_is_queued_once(self):
+        self.assertTrue(self.__OUTBOX.enqueue_mail(['a@local'], self.__create_mail('offline')))
+        self.assertFalse(self.__OUTBOX.enqueue_mail(['a@local'], self.__create_mail('offline')))
+        self.assertTrue(self.__OUTBOX.enqueue_mail(['b@local'], self.__create_mail('offline')))
+        self.assertEqual(2, len(self.__list_queued_mails()))
+
+    def test_delivery_in_background(self):
+        self.__start_local_server()
+        with self.__OUTBOX.delivering():
+            for recipient in ['a@local', 'b@local', 'c@local']:
+                self.__OUTBOX.enqueue_mail([recipient], self.__create_mail('offline'))
+        self.assertEqual(3, len(self.__server.mails))
+        self.assertEqual(1, self.__server.connections)
+        self.assertEqual([], self.__list_queued_mails())
+
+    def test_metadata_is_passed_after_delivery(self):
+        self.__start_local_server()
+        delivered = []
+        with self.__OUTBOX.delivering(delivered.append):
+            self.__OUTBOX.enqueue_mail(['a@local'], self.__create_mail('offline'), {'node_id': '1', 'status': 'OFFLINE'})
+        self.assertEqual([{'node_id': '1', 'status': 'OFFLINE'}], delivered)
+
+    def test_unreadable_entry_is_moved_to_failed(self):
+        self.__start_local_server()
+        self.__OUTBOX.enqueue_mail(['a@local'], self.__create_mail('offline'))
+        Path(self.__WORKING_DIR, 'outbox', 'broken.json').write_text('{"recipients": ["b@loc', encoding='utf-8')
+        Path(self.__WORKING_DIR, 'outbox', 'incomplete.json').write_text('{"recipients": []}', encoding='utf-8')
+        with self.__OUTBOX.delivering():
+            pass
+        self.assertEqual(1, len(self.__server.mails))
+        self.assertEqual([], self.__list_queued_mails())
+        self.assertEqual(['broken.json', 'incomplete.json'], sorted(os.listdir(os.path.join(self.__WORKING_DIR, 'outbox', 'failed'))))
+
+    def test_failed_mail_is_retried_later(self):
+        self.__set_unreachable_server()
+        self.__OUTBOX.enqueue_mail(['a@local'], self.__create_mail('offline'))
+        next_attempt = self.__OUTBOX.deliver_due_mails()
+        queued = self.__list_queued_mails()
+        self.assertEqual(1, len(queued))
+        entry = self.__load_entry(queued[0])
+        self.assertEqual(1, entry['attempts'])
+        self.assertEqual(entry['next_attempt'], next_attempt)
+        self.__start_local_server()
+        self.assertEqual(next_attempt, self.__OUTBOX.deliver_due_mails())
+        self.assertEqual(0, len(self.__server.mails))
+
+    def test_mail_is_moved_after_max_attempts(self):
+        self.__set_unreachable_server()
+        os.environ['SMTP.MAX_ATTEMPTS'] = '1'
+        self.__OUTBOX.enqueue_mail(['a@local'], self.__create_mail('offline'))
+        self.assertIsNone(self.__OUTBOX.deliver_due_mails())
+        self.assertEqual([], self.__list_queued_mails())
+        self.assertEqual(1, len(os.listdir(os.path.join(self.__WORKING_DIR, 'outbox', 'failed'))))
+
+    def __list_queued_mails(self) -> list:
+        outbox_dir = os.path.join(self.__WORKING_DIR, 'outbox')
+        return [filename for filename in os.listdir(outbox_dir) if filename.endswith('.json')]
+
+    def __load_entry(self, filename: str) -> dict:
+        with open(os.path.join(self.__WORKING_DIR, 'outbox', filename), encoding='utf-8') as file:
+            return json.load(file)
+
+    def __start_local_server(self):
+        self.__server = LocalSMTPServer()
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        os.environ['SMTP.SERVER'] = self.__server.get_address()
+        os.environ['SMTP.USE_SSL'] = 'False'
+
+    @staticmethod
+    def __set_unreachable_server():
+        os.environ['SMTP.SERVER'] = '127.0.0.1:1'
+        os.environ['SMTP.USE_SSL'] = 'False'
+
+    @staticmethod
+    def __create_mail(text: str) -> MIMEText:
+        mail = MIMEText(text, 'html', 'utf-8')
+        mail['Subject'] = 'Status of node'
+        return mail
+
+    @staticmethod
+    def __load_settings():
+        path_settings = os.path.join(this_path.parents[1], 'resources', 'settings.toml')
+        ConfigReader().load_config_as_env_vars(path_settings)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 import os
+import socketserver
 import sys
+import threading
 import unittest
 from email.mime.text import MIMEText
 from pathlib import Path
@@ -11,6 +13,58 @@ sys.path.insert(0, path_src)
 from common import MailSender, ConfigReader
 
 
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal SMTP stand-in without SSL and authentication. Counts the opened connections and
+    keeps the received mails. Drops the connection after 'drop_after' mails, if set.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), LocalSMTPHandler)
+        self.connections = 0
+        self.mails = []
+        self.drop_after = None
+
+    def get_address(self) -> str:
+        return ':'.join(['127.0.0.1', str(self.server_address[1])])
+
+
+class LocalSMTPHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        self.server.connections += 1
+        self.__reply('220 localhost')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == 'QUIT':
+                self.__reply('221 bye')
+                return
+            if command in ('EHLO', 'HELO'):
+                self.__reply('250 localhost')
+            elif command == 'RCPT':
+                recipients.append(line)
+                self.__reply('250 ok')
+            elif command == 'DATA':
+                self.__reply('354 go ahead')
+                while self.rfile.readline().decode().strip() != '.':
+                    pass
+                self.server.mails.append(recipients)
+                recipients = []
+                if self.server.drop_after and len(self.server.mails) % self.server.drop_after == 0:
+                    self.__reply('250 ok')
+                    return
+                self.__reply('250 ok')
+            else:
+                self.__reply('250 ok')
+
+    def __reply(self, message: str):
+        self.wfile.write(f'{message}\r\n'.encode())
+
+
 class TestMailSender(unittest.TestCase):
 
     @classmethod
@@ -19,6 +73,16 @@ class TestMailSender(unittest.TestCase):
         ConfigReader().load_config_as_env_vars(path_settings)
         cls.__MAIL_SENDER = MailSender()
 
+    def setUp(self):
+        self.__server = None
+
+    def tearDown(self):
+        if self.__server:
+            self.__server.shutdown()
+            self.__server.server_close()
+            path_settings = os.path.join(this_path.parents[1], 'resources', 'settings.toml')
+            ConfigReader().load_config_as_env_vars(path_settings)
+
     def test_mailing(self):
         """
         Sent mail to configured static recipients
@@ -26,6 +90,45 @@ class TestMailSender(unittest.TestCase):
         mail = MIMEText('test', 'html', 'utf-8')
         self.__MAIL_SENDER.send_mail([], mail)
 
+    def test_connection_per_mail_without_session(self):
+        self.__start_local_server()
+        self.__MAIL_SENDER.send_mail(['a@local'], MIMEText('test', 'html', 'utf-8'))
+        self.__MAIL_SENDER.send_mail(['b@local'], MIMEText('test', 'html', 'utf-8'))
+        self.assertEqual(2, len(self.__server.mails))
+        self.assertEqual(2, self.__server.connections)
+
+    def test_single_connection_in_session(self):
+        self.__start_local_server()
+        with self.__MAIL_SENDER.session():
+            for recipient in ['a@local', 'b@local', 'c@local']:
+                self.__MAIL_SENDER.send_mail([recipient], MIMEText('test', 'html', 'utf-8'))
+        self.assertEqual(3, len(self.__server.mails))
+        self.assertEqual(1, self.__server.connections)
+
+    def test_reconnect_in_session(self):
+        self.__start_local_server()
+        self.__server.drop_after = 1
+        with self.__MAIL_SENDER.session():
+            for recipient in ['a@local', 'b@local']:
+                self.__MAIL_SENDER.send_mail([recipient], MIMEText('test', 'html', 'utf-8'))
+        self.assertEqual(2, len(self.__server.mails))
+        self.assertEqual(2, self.__server.connections)
+
+    def test_send_batch(self):
+        self.__start_local_server()
+        mails = [(['a@local'], MIMEText('test', 'html', 'utf-8')), (['b@local', 'a@local'], MIMEText('test', 'html', 'utf-8'))]
+        failed = self.__MAIL_SENDER.send_mails(mails)
+        self.assertEqual([], failed)
+        self.assertEqual(2, len(self.__server.mails))
+        self.assertEqual(1, self.__server.connections)
+        self.assertTrue(mails[1][1]['To'].startswith('b@local, a@local'))
+
+    def __start_local_server(self):
+        self.__server = LocalSMTPServer()
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        os.environ['SMTP.SERVER'] = self.__server.get_address()
+        os.environ['SMTP.USE_SSL'] = 'False'
+
 
 if __name__ == '__main__':
     unittest.main()
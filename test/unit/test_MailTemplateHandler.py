@@ -13,12 +13,18 @@ path_src = os.path.join(this_path.parents[2], 'src')
 sys.path.insert(0, path_src)
 
 from csv_to_confluence import TemplatePageLoader
-from common import InfoCSVHandler, ConfigReader
-from email_service import NoImportsMailTemplateHandler, OfflineMailTemplateHandler, OutdatedVersionMailTemplateHandler
+from common import InfoCSVHandler, ConfigReader, ResourceLoader, SingletonABCMeta
+from email_service import NodeStatusRecord, NoImportsMailTemplateHandler, OfflineMailTemplateHandler, OutdatedVersionMailTemplateHandler
+
+
+class WorkingDirResourceLoader(ResourceLoader):
+
+    def get_template(self, resource_name: str):
+        return self._get_resource_as_template(resource_name, 'utf-8')
 
 
 class TestMailTemplateHandler(unittest.TestCase):
-    __TEMPLATE: str = None
+    __RECORD: NodeStatusRecord = None
     __DEFAULT_NODE_ID: str = '1'
     __WORKING_DIR: str = None
 
@@ -33,34 +39,33 @@ class TestMailTemplateHandler(unittest.TestCase):
         cls.__OUTDATED_VERSION_MAIL_TEMPLATE_HANDLER = OutdatedVersionMailTemplateHandler()
 
     def setUp(self):
-        self.__TEMPLATE = TemplatePageLoader().get_template_page()
-        soup = bs4.BeautifulSoup(self.__TEMPLATE, 'html.parser')
+        soup = bs4.BeautifulSoup(TemplatePageLoader().get_template_page(), 'html.parser')
         soup.find(class_='last_contact').string.replace_with('2022-01-01 12:00:45')
         soup.find(class_='last_write').string.replace_with('2025-11-11')
         soup.find(class_='clinic_name').string.replace_with('important clinic')
         soup.find(class_='dwh-j2ee').string.replace_with('1.2.3')
-        self.__TEMPLATE = str(soup)
+        self.__RECORD = NodeStatusRecord.from_confluence_page(str(soup))
 
     def tearDown(self):
         if Path(self.__WORKING_DIR).exists() and Path(self.__WORKING_DIR).is_dir():
             rmtree(self.__WORKING_DIR)
 
     def test_offline_mail_template(self):
-        mail = self.__OFFLINE_MAIL_TEMPLATE_HANDLER.get_mail_template_filled_with_information_from_template_page(self.__TEMPLATE)
+        mail = self.__OFFLINE_MAIL_TEMPLATE_HANDLER.get_mail_template_filled_with_information_from_status_record(self.__RECORD)
         self.__check_common_config(mail)
         self.assertEqual('Automatische Information: AKTIN DWH Offline', mail['Subject'])
         self.assertTrue('<b>01.01.2022</b>' in mail.as_string())
         self.assertFalse('<b>${last_contact}</b>' in mail.as_string())
 
     def test_no_imports_mail_template(self):
-        mail = self.__NO_IMPORTS_MAIL_TEMPLATE_HANDLER.get_mail_template_filled_with_information_from_template_page(self.__TEMPLATE)
+        mail = self.__NO_IMPORTS_MAIL_TEMPLATE_HANDLER.get_mail_template_filled_with_information_from_status_record(self.__RECORD)
         self.__check_common_config(mail)
         self.assertEqual('Automatische Information: AKTIN DWH Keine Imports', mail['Subject'])
         self.assertTrue('<b>11.11.2025</b>' in mail.as_string())
         self.assertFalse('<b>${last_write}</b>' in mail.as_string())
 
     def test_outdated_version_mail_template(self):
-        mail = self.__OUTDATED_VERSION_MAIL_TEMPLATE_HANDLER.get_mail_template_filled_with_information_from_template_page(self.__TEMPLATE)
+        mail = self.__OUTDATED_VERSION_MAIL_TEMPLATE_HANDLER.get_mail_template_filled_with_information_from_status_record(self.__RECORD)
         self.__check_common_config(mail)
         self.assertEqual('Automatische Information: AKTIN DWH Version veraltet', mail['Subject'])
         self.assertTrue('<b>1.2.3</b>' in mail.as_string())
@@ -79,15 +84,29 @@ class TestMailTemplateHandler(unittest.TestCase):
     def test_write_last_import_date_from_csv(self):
         self.__create_csv()
         self.__set_empty_last_write_in_template()
-        mail = self.__NO_IMPORTS_MAIL_TEMPLATE_HANDLER.get_mail_template_filled_with_information_from_template_page(self.__TEMPLATE)
+        mail = self.__NO_IMPORTS_MAIL_TEMPLATE_HANDLER.get_mail_template_filled_with_information_from_status_record(self.__RECORD)
         self.assertTrue('<b>11.11.2022</b>' in mail.as_string())
         self.assertFalse('<b>${last_write}</b>' in mail.as_string())
 
+    def test_template_is_reloaded_on_modification(self):
+        os.makedirs(self.__WORKING_DIR)
+        path_template = os.path.join(self.__WORKING_DIR, 'template_test.html')
+        Path(path_template).write_text('<b>${clinic_name}</b>', encoding='utf-8')
+        self.addCleanup(os.environ.__setitem__, 'DIR.RESOURCES', os.environ['DIR.RESOURCES'])
+        self.addCleanup(SingletonABCMeta._instances.pop, WorkingDirResourceLoader, None)
+        os.environ['DIR.RESOURCES'] = self.__WORKING_DIR
+        loader = WorkingDirResourceLoader()
+        template = loader.get_template('template_test.html')
+        self.assertIs(template, loader.get_template('template_test.html'))
+        Path(path_template).write_text('<i>${clinic_name}</i>', encoding='utf-8')
+        os.utime(path_template, ns=(0, os.stat(path_template).st_mtime_ns + 1))
+        reloaded = loader.get_template('template_test.html')
+        self.assertEqual('<i>clinic</i>', reloaded.safe_substitute(clinic_name='clinic'))
+
     def __set_empty_last_write_in_template(self):
-        self.__TEMPLATE = TemplatePageLoader().get_template_page()
-        soup = bs4.BeautifulSoup(self.__TEMPLATE, 'html.parser')
+        soup = bs4.BeautifulSoup(TemplatePageLoader().get_template_page(), 'html.parser')
         soup.find(class_='last_write').string.replace_with('-')
-        self.__TEMPLATE = str(soup)
+        self.__RECORD = NodeStatusRecord.from_confluence_page(str(soup))
 
     def __create_csv(self):
         name_csv = self.__HANDLER.generate_node_csv_name(self.__DEFAULT_NODE_ID)
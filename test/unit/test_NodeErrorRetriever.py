@@ -0,0 +1,92 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from shutil import rmtree
+from unittest import mock
+
+this_path = Path(os.path.realpath(__file__))
+path_src = os.path.join(this_path.parents[2], 'src')
+sys.path.insert(0, path_src)
+
+from common import BrokerNodeConnection, ConfigReader, ErrorCSVHandler, SingletonABCMeta, TimestampHandler
+from node_to_csv import NodeErrorRetriever
+
+
+class TestNodeErrorRetriever(unittest.TestCase):
+    __WORKING_DIR: str = None
+    __NODE_ID: str = '1'
+
+    @classmethod
+    def setUpClass(cls):
+        path_settings = os.path.join(this_path.parents[1], 'resources', 'settings.toml')
+        ConfigReader().load_config_as_env_vars(path_settings)
+        cls.__WORKING_DIR = os.environ['DIR.WORKING'] if os.environ['DIR.WORKING'] else os.getcwd()
+        cls.__HANDLER = ErrorCSVHandler()
+        SingletonABCMeta._instances.pop(NodeErrorRetriever, None)
+        with mock.patch('node_to_csv.BrokerNodeConnection'):
+            cls.__RETRIEVER = NodeErrorRetriever()
+        cls.__YEAR = TimestampHandler().get_current_year()
+
+    @classmethod
+    def tearDownClass(cls):
+        SingletonABCMeta._instances.pop(NodeErrorRetriever, None)
+
+    def setUp(self):
+        if not os.path.exists(self.__WORKING_DIR):
+            os.makedirs(self.__WORKING_DIR)
+        node_dir = os.path.join(self.__WORKING_DIR, self.__NODE_ID)
+        os.makedirs(node_dir, exist_ok=True)
+        self.__csv_path = self.__HANDLER.init_csv_file(node_dir, self.__HANDLER.generate_node_csv_name(self.__NODE_ID))
+        self.__write_errors([self.__create_error('01-10', None, 'error A'), self.__create_error('01-05', '3', 'error B')])
+
+    def tearDown(self):
+        rmtree(self.__WORKING_DIR)
+
+    def test_new_error_is_appended(self):
+        self.__write_errors([self.__create_error('02-01', None, 'error C')])
+        self.assertEqual([['02-01', '1', 'error C'], ['01-10', '1', 'error A'], ['01-05', '3', 'error B']], self.__read_rows())
+
+    def test_changed_repeats_update_the_row(self):
+        self.__write_errors([self.__create_error('02-01', '4', 'error B')])
+        self.assertEqual([['02-01', '4', 'error B'], ['01-10', '1', 'error A']], self.__read_rows())
+
+    def test_unchanged_error_is_not_rewritten(self):
+        with self.__track_writes() as write:
+            self.__write_errors([self.__create_error('01-10', None, 'error A'), self.__create_error('01-05', '3', 'error B')])
+        write.assert_not_called()
+        self.assertEqual([['01-10', '1', 'error A'], ['01-05', '3', 'error B']], self.__read_rows())
+
+    def test_errors_of_prior_year_are_dropped(self):
+        prior_year = str(int(self.__YEAR) - 1)
+        with self.__track_writes() as write:
+            self.__write_errors([BrokerNodeConnection.BrokerNodeError('7', f'{prior_year}-12-30T12:00:00Z', 'error D')])
+        write.assert_not_called()
+        self.assertEqual([['01-10', '1', 'error A'], ['01-05', '3', 'error B']], self.__read_rows())
+
+    def test_empty_response_leaves_csv_untouched(self):
+        with open(self.__csv_path, 'rb') as file:
+            content = file.read()
+        with self.__track_writes() as write:
+            self.__write_errors([])
+        write.assert_not_called()
+        with open(self.__csv_path, 'rb') as file:
+            self.assertEqual(content, file.read())
+
+    def __write_errors(self, errors: list):
+        self.__RETRIEVER.write_broker_data_to_file(self.__NODE_ID, errors)
+
+    def __track_writes(self):
+        return mock.patch.object(self.__HANDLER, 'write_data_to_file', wraps=self.__HANDLER.write_data_to_file)
+
+    def __create_error(self, month_day: str, repeats, content: str) -> BrokerNodeConnection.BrokerNodeError:
+        return BrokerNodeConnection.BrokerNodeError(repeats, f'{self.__YEAR}-{month_day}T12:00:00Z', content)
+
+    def __read_rows(self) -> list:
+        df = self.__HANDLER.read_csv_as_df(self.__csv_path)
+        df['timestamp'] = df['timestamp'].str.slice(5, 10)
+        return df.values.tolist()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ import sys
 import unittest
 from pathlib import Path
 from shutil import rmtree
+from unittest import mock
 
 this_path = Path(os.path.realpath(__file__))
 path_src = os.path.join(this_path.parents[2], 'src')
@@ -11,7 +12,8 @@ sys.path.insert(0, path_src)
 import bs4
 from common import ConfigReader
 from csv_to_confluence import TemplatePageElementCreator, TemplatePageLoader
-from email_service import NoImportsNotificationHandler, OfflineNotificationHandler, OutdatedVersionNotificationHandler
+from email_service import NodeEventNotifierManager, NodeStatusRecord, NoImportsNotificationHandler, OfflineNotificationHandler, \
+    OutdatedVersionNotificationHandler
 
 
 class TestNotificationHandler(unittest.TestCase):
@@ -40,48 +42,80 @@ class TestNotificationHandler(unittest.TestCase):
         rmtree(cls.__WORKING_DIR)
 
     def test_offline_status(self):
-        template = self.__set_status_of_template_page('OFFLINE')
-        self.assertTrue(self.__OFFLINE_NOTIFIER.did_my_status_occur(template))
-        self.assertFalse(self.__NO_IMPORTS_NOTIFER.did_my_status_occur(template))
+        record = self.__set_status_of_template_page('OFFLINE')
+        self.assertTrue(self.__OFFLINE_NOTIFIER.did_my_status_occur(record))
+        self.assertFalse(self.__NO_IMPORTS_NOTIFER.did_my_status_occur(record))
 
     def test_no_imports_status(self):
-        template = self.__set_status_of_template_page('NO IMPORTS')
-        self.assertFalse(self.__OFFLINE_NOTIFIER.did_my_status_occur(template))
-        self.assertTrue(self.__NO_IMPORTS_NOTIFER.did_my_status_occur(template))
+        record = self.__set_status_of_template_page('NO IMPORTS')
+        self.assertFalse(self.__OFFLINE_NOTIFIER.did_my_status_occur(record))
+        self.assertTrue(self.__NO_IMPORTS_NOTIFER.did_my_status_occur(record))
 
     def test_outdated_version_status(self):
-        template = self.__set_version_of_template_page('1.2.3')
-        self.assertTrue(self.__OUTDATED_VERSION_NOTIFIER.did_my_status_occur(template))
+        record = self.__set_version_of_template_page('1.2.3')
+        self.assertTrue(self.__OUTDATED_VERSION_NOTIFIER.did_my_status_occur(record))
 
     def test_no_version(self):
-        template = self.__set_version_of_template_page('-')
-        self.assertFalse(self.__OUTDATED_VERSION_NOTIFIER.did_my_status_occur(template))
+        record = self.__set_version_of_template_page('-')
+        self.assertFalse(self.__OUTDATED_VERSION_NOTIFIER.did_my_status_occur(record))
 
     def test_empty_status(self):
-        template = self.__set_status_of_template_page('')
-        self.assertFalse(self.__OFFLINE_NOTIFIER.did_my_status_occur(template))
-        self.assertFalse(self.__NO_IMPORTS_NOTIFER.did_my_status_occur(template))
-        self.assertFalse(self.__OUTDATED_VERSION_NOTIFIER.did_my_status_occur(template))
+        record = self.__set_status_of_template_page('')
+        self.assertFalse(self.__OFFLINE_NOTIFIER.did_my_status_occur(record))
+        self.assertFalse(self.__NO_IMPORTS_NOTIFER.did_my_status_occur(record))
+        self.assertFalse(self.__OUTDATED_VERSION_NOTIFIER.did_my_status_occur(record))
 
     def test_empty_version(self):
-        template = self.__set_version_of_template_page('')
-        self.assertTrue(self.__OFFLINE_NOTIFIER.did_my_status_occur(template))
-        self.assertFalse(self.__NO_IMPORTS_NOTIFER.did_my_status_occur(template))
-        self.assertFalse(self.__OUTDATED_VERSION_NOTIFIER.did_my_status_occur(template))
+        record = self.__set_version_of_template_page('')
+        self.assertTrue(self.__OFFLINE_NOTIFIER.did_my_status_occur(record))
+        self.assertFalse(self.__NO_IMPORTS_NOTIFER.did_my_status_occur(record))
+        self.assertFalse(self.__OUTDATED_VERSION_NOTIFIER.did_my_status_occur(record))
 
     def test_default_status(self):
-        template = self.__set_status_of_template_page('ONLINE')
-        self.assertFalse(self.__OFFLINE_NOTIFIER.did_my_status_occur(template))
-        self.assertFalse(self.__NO_IMPORTS_NOTIFER.did_my_status_occur(template))
-        self.assertFalse(self.__OUTDATED_VERSION_NOTIFIER.did_my_status_occur(template))
+        record = self.__set_status_of_template_page('ONLINE')
+        self.assertFalse(self.__OFFLINE_NOTIFIER.did_my_status_occur(record))
+        self.assertFalse(self.__NO_IMPORTS_NOTIFER.did_my_status_occur(record))
+        self.assertFalse(self.__OUTDATED_VERSION_NOTIFIER.did_my_status_occur(record))
 
     def test_default_version(self):
-        template = self.__set_version_of_template_page('dwh-j2ee-1.5.1rc1')
-        self.assertTrue(self.__OFFLINE_NOTIFIER.did_my_status_occur(template))
-        self.assertFalse(self.__NO_IMPORTS_NOTIFER.did_my_status_occur(template))
-        self.assertFalse(self.__OUTDATED_VERSION_NOTIFIER.did_my_status_occur(template))
-
-    def __set_status_of_template_page(self, title_status: str) -> str:
+        record = self.__set_version_of_template_page('dwh-j2ee-1.5.1rc1')
+        self.assertTrue(self.__OFFLINE_NOTIFIER.did_my_status_occur(record))
+        self.assertFalse(self.__NO_IMPORTS_NOTIFER.did_my_status_occur(record))
+        self.assertFalse(self.__OUTDATED_VERSION_NOTIFIER.did_my_status_occur(record))
+
+    def test_no_mail_is_queued_without_recipients(self):
+        record = self.__set_status_of_template_page('OFFLINE')
+        with self.__mock_recipients([]):
+            self.assertFalse(self.__OFFLINE_NOTIFIER.sent_my_mail_to_node('10', record))
+
+    def test_identical_mail_is_queued_once(self):
+        record = self.__set_status_of_template_page('OFFLINE')
+        with self.__mock_recipients(['queued@local']):
+            self.assertTrue(self.__OFFLINE_NOTIFIER.sent_my_mail_to_node('10', record))
+            self.assertFalse(self.__OFFLINE_NOTIFIER.sent_my_mail_to_node('10', record))
+
+    def test_only_queued_mail_is_tracked(self):
+        record = self.__set_status_of_template_page('OFFLINE')
+        self.addCleanup(self.__OFFLINE_NOTIFIER.clean_my_status_for_node, '10')
+        manager = NodeEventNotifierManager()
+        os.makedirs(os.path.join(self.__WORKING_DIR, '10'), exist_ok=True)
+        log_path = os.path.join(self.__WORKING_DIR, '10', '10_sent_mails.log')
+        with self.__mock_recipients([]):
+            manager._NodeEventNotifierManager__notify_node_recipients('10', record)
+        self.assertTrue(self.__OFFLINE_NOTIFIER.is_waiting_threshold_reached_for_node('10'))
+        self.assertFalse(os.path.exists(log_path))
+        with self.__mock_recipients(['tracked@local']):
+            manager._NodeEventNotifierManager__notify_node_recipients('10', record)
+        self.assertFalse(self.__OFFLINE_NOTIFIER.is_waiting_threshold_reached_for_node('10'))
+        with open(log_path, encoding='utf-8') as log:
+            self.assertIn('Queued mail for status OFFLINE to node id 10', log.read())
+
+    def __mock_recipients(self, recipients: list):
+        extractor = mock.Mock()
+        extractor.extract_all_recipients_for_node_id.return_value = recipients
+        return mock.patch.object(self.__OFFLINE_NOTIFIER, '_confluence_recipients_extractor', extractor)
+
+    def __set_status_of_template_page(self, title_status: str) -> NodeStatusRecord:
         template = self.__LOADER.get_template_page()
         soup = bs4.BeautifulSoup(template, 'html.parser')
         param_title = self.__ELEMENT_CREATOR.create_ac_parameter_element('title', title_status)
@@ -90,13 +124,13 @@ class TestNotificationHandler(unittest.TestCase):
         status = self.__ELEMENT_CREATOR.create_html_element('td', {'style': 'text-align:center;', 'class': 'status'})
         status.append(frame)
         soup.find(class_='status').replace_with(status)
-        return str(soup)
+        return NodeStatusRecord.from_confluence_page(str(soup))
 
-    def __set_version_of_template_page(self, version: str) -> str:
+    def __set_version_of_template_page(self, version: str) -> NodeStatusRecord:
         template = self.__LOADER.get_template_page()
         soup = bs4.BeautifulSoup(template, 'html.parser')
         soup.find(class_='dwh-j2ee').string.replace_with(version)
-        return str(soup)
+        return NodeStatusRecord.from_confluence_page(str(soup))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,134 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from shutil import rmtree
+
+this_path = Path(os.path.realpath(__file__))
+path_src = os.path.join(this_path.parents[2], 'src')
+sys.path.insert(0, path_src)
+
+from common import ConfigReader, ErrorCSVHandler, InfoCSVHandler, StorageBackend, SQLiteStorageBackend, TextWriter
+
+
+class TestSQLiteStorageBackend(unittest.TestCase):
+    __WORKING_DIR: str = None
+    __DB_DIR: str = None
+
+    @classmethod
+    def setUpClass(cls):
+        path_settings = os.path.join(this_path.parents[1], 'resources', 'settings.toml')
+        ConfigReader().load_config_as_env_vars(path_settings)
+        cls.__WORKING_DIR = os.environ['DIR.WORKING'] if os.environ['DIR.WORKING'] else os.getcwd()
+        cls.__DB_DIR = tempfile.mkdtemp()
+        os.environ['STORAGE.BACKEND'] = 'sqlite'
+        os.environ['STORAGE.SQLITE_PATH'] = os.path.join(cls.__DB_DIR, 'test.db')
+        cls.__INFO_HANDLER = InfoCSVHandler()
+        cls.__ERROR_HANDLER = ErrorCSVHandler()
+        cls.__WRITER = TextWriter()
+
+    @classmethod
+    def tearDownClass(cls):
+        os.environ['STORAGE.BACKEND'] = 'csv'
+        rmtree(cls.__DB_DIR)
+
+    def setUp(self):
+        if not os.path.exists(self.__WORKING_DIR):
+            os.makedirs(self.__WORKING_DIR)
+
+    def tearDown(self):
+        rmtree(self.__WORKING_DIR)
+
+    def test_configured_backend(self):
+        self.assertIsInstance(StorageBackend.get_configured_backend(), SQLiteStorageBackend)
+
+    def test_init_csv_without_file(self):
+        csv_path = self.__INFO_HANDLER.init_csv_file(self.__WORKING_DIR, '1_stats_2023.csv')
+        self.assertTrue(self.__INFO_HANDLER.does_file_exist(csv_path))
+        self.assertFalse(os.path.isfile(csv_path))
+        df = self.__INFO_HANDLER.read_csv_as_df(csv_path)
+        self.assertTrue(df.empty)
+        self.assertEqual(self.__INFO_HANDLER.get_csv_columns(), list(df.columns))
+
+    def test_read_nonexisting_csv(self):
+        with self.assertRaises(FileNotFoundError):
+            self.__INFO_HANDLER.read_csv_as_df(os.path.join(self.__WORKING_DIR, '1_stats_2000.csv'))
+
+    def test_append_and_replace_rows(self):
+        csv_path = self.__INFO_HANDLER.init_csv_file(self.__WORKING_DIR, '2_stats_2023.csv')
+        for date in ['1', '2', '3']:
+            self.__INFO_HANDLER.append_row_to_file(self.__create_info_row(date), csv_path)
+        self.__INFO_HANDLER.append_row_to_file(self.__create_info_row('4'), csv_path, replace_last_row=True)
+        df = self.__INFO_HANDLER.read_csv_as_df(csv_path)
+        self.assertEqual(['1', '2', '4'], df['date'].tolist())
+        self.assertEqual(['10', '10', '10'], df['imported'].tolist())
+        df = self.__INFO_HANDLER.read_last_rows_as_df(csv_path, 2)
+        self.assertEqual(['2', '4'], df['date'].tolist())
+
+    def test_write_table_overwrites_rows(self):
+        csv_path = self.__ERROR_HANDLER.init_csv_file(self.__WORKING_DIR, '3_errors_2023.csv')
+        df = self.__ERROR_HANDLER.read_csv_as_df(csv_path)
+        df.loc[0] = ['2023-01-01 00:00:00', '1', 'error']
+        df.loc[1] = ['2023-01-02 00:00:00', '', 'error2']
+        self.__ERROR_HANDLER.write_data_to_file(df, csv_path)
+        self.__ERROR_HANDLER.write_data_to_file(df.tail(1), csv_path)
+        df = self.__ERROR_HANDLER.read_csv_as_df(csv_path)
+        self.assertEqual(['error2'], df['content'].tolist())
+        self.assertTrue(df['repeats'].isna().all())
+
+    def test_documents_and_logs(self):
+        txt_path = os.path.join(self.__WORKING_DIR, '4_versions.txt')
+        log_path = os.path.join(self.__WORKING_DIR, '4_versions.log')
+        self.assertFalse(self.__WRITER.does_file_exist(txt_path))
+        self.__WRITER.init_new_file_if_nonexisting(txt_path)
+        self.assertEqual({}, self.__WRITER.load_txt_file_as_dict(txt_path))
+        self.__WRITER.save_dict_as_txt_file({'os': 'debian'}, txt_path)
+        self.assertEqual({'os': 'debian'}, self.__WRITER.load_txt_file_as_dict(txt_path))
+        self.__WRITER.write_data_to_file('line1\n', log_path)
+        self.__WRITER.write_data_to_file('line2\n', log_path)
+        self.assertTrue(self.__WRITER.does_file_exist(log_path))
+
+    def test_rollback_of_failed_transaction(self):
+        csv_path = self.__INFO_HANDLER.init_csv_file(self.__WORKING_DIR, '5_stats_2023.csv')
+        with self.assertRaises(ValueError):
+            with self.__INFO_HANDLER.transaction():
+                self.__INFO_HANDLER.append_row_to_file(self.__create_info_row('1'), csv_path)
+                raise ValueError
+        self.assertTrue(self.__INFO_HANDLER.read_csv_as_df(csv_path).empty)
+
+    def test_export_to_files(self):
+        csv_path = self.__INFO_HANDLER.init_csv_file(self.__WORKING_DIR, '6_stats_2023.csv')
+        self.__INFO_HANDLER.append_row_to_file(self.__create_info_row('1'), csv_path)
+        log_path = os.path.join(self.__WORKING_DIR, '6_versions.log')
+        self.__WRITER.write_data_to_file('line1\n', log_path)
+        self.__WRITER.write_data_to_file('line2\n', log_path)
+        StorageBackend.get_configured_backend().export_to_files()
+        with open(csv_path, encoding='utf-8') as file:
+            lines = file.read().splitlines()
+        self.assertEqual(';'.join(self.__INFO_HANDLER.get_csv_columns()), lines[0])
+        self.assertEqual(2, len(lines))
+        with open(log_path, encoding='utf-8') as file:
+            self.assertEqual('line1\nline2\n', file.read())
+
+    def test_list_entries_and_content_hash(self):
+        backend = StorageBackend.get_configured_backend()
+        csv_path = self.__INFO_HANDLER.init_csv_file(os.path.join(self.__WORKING_DIR, '7'), '7_stats_2023.csv')
+        txt_path = os.path.join(self.__WORKING_DIR, '7', '7_versions.txt')
+        self.__WRITER.save_dict_as_txt_file({'os': 'debian'}, txt_path)
+        self.__WRITER.save_dict_as_txt_file({}, os.path.join(self.__WORKING_DIR, '70', '70_versions.txt'))
+        self.assertEqual([csv_path, txt_path], backend.list_entries(os.path.join(self.__WORKING_DIR, '7')))
+        hash_before = backend.get_content_hash(csv_path)
+        self.assertEqual(hash_before, backend.get_content_hash(csv_path))
+        self.__INFO_HANDLER.append_row_to_file(self.__create_info_row('1'), csv_path)
+        self.assertNotEqual(hash_before, backend.get_content_hash(csv_path))
+
+    def __create_info_row(self, date: str) -> dict:
+        row = {column: '-' for column in self.__INFO_HANDLER.get_csv_columns()}
+        row['date'] = date
+        row['imported'] = 10
+        return row
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -33,6 +33,14 @@ class TestSentMailsLogger(unittest.TestCase):
         self.__check_status_1()
         self.__check_status_2()
 
+    def test_queued_and_sent_mail(self):
+        self.__init_node_dir_if_nonexisting('6')
+        self.__LOGGER.log_queued_mail_for_node('6', 'STATUS1')
+        self.__LOGGER.log_sent_mail_for_node('6', 'STATUS1')
+        with open(os.path.join(self.__WORKING_DIR, '6', '6_sent_mails.log'), 'r', encoding='utf-8') as file:
+            result = [x.split(' : ')[1] for x in file.read().split('\n')[:-1]]
+        self.assertEqual(['Queued mail for status STATUS1 to node id 6', 'Sent mail for status STATUS1 to node id 6'], result)
+
     def __check_file_initialization(self):
         self.__init_node_dir_if_nonexisting('1')
         path_json = os.path.join(os.environ['DIR.WORKING'], '1', '1_sent_mails.log')
@@ -1,13 +1,21 @@
 import os
 import sys
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 this_path = Path(os.path.realpath(__file__))
 path_src = os.path.join(this_path.parents[2], 'src')
 sys.path.insert(0, path_src)
 
-from common import BrokerNodeConnection, ConfluenceConnection, ConfluenceNodeMapper, ConfigReader
+from common import BrokerNodeConnection, ConfluenceConnection, ConfluenceNodeMapper, ConfigReader, SingletonMeta
+
+
+class SlowSingleton(metaclass=SingletonMeta):
+
+    def __init__(self):
+        time.sleep(0.05)
 
 
 class TestSingletonMeta(unittest.TestCase):
@@ -32,6 +40,11 @@ class TestSingletonMeta(unittest.TestCase):
         mapper2 = ConfluenceNodeMapper()
         self.assertEqual(id(mapper1), id(mapper2))
 
+    def test_concurrent_instantiation(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            instances = list(executor.map(lambda _: SlowSingleton(), range(8)))
+        self.assertEqual(1, len(set(id(instance) for instance in instances)))
+
 
 if __name__ == '__main__':
     unittest.main()
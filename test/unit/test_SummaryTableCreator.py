@@ -0,0 +1,56 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+
+this_path = Path(os.path.realpath(__file__))
+path_src = os.path.join(this_path.parents[2], 'src')
+sys.path.insert(0, path_src)
+
+import bs4
+from common import ConfigReader
+from csv_to_confluence import NodeSummaryRecord, SummaryTableCreator, TemplatePageClinicInfoWriter, TemplatePageLoader
+
+
+class TestSummaryTableCreator(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        path_settings = os.path.join(this_path.parents[1], 'resources', 'settings.toml')
+        ConfigReader().load_config_as_env_vars(path_settings)
+        cls.__SUMMARY = SummaryTableCreator()
+
+    def test_record_from_page_template(self):
+        page = TemplatePageClinicInfoWriter().add_content_to_template_page(TemplatePageLoader().get_template_page(), '1')
+        record = NodeSummaryRecord.from_page_template(bs4.BeautifulSoup(page, 'html.parser'), '1', '[1] Clinic1')
+        self.assertEqual('DEF', record.interface_import)
+        self.assertEqual('1970-01-01', record.last_check)
+        self.assertEqual('0.0', record.daily_error_rate)
+
+    def test_summary_row_from_record(self):
+        row = self.__SUMMARY.create_summary_table_row_from_record(self.__create_record('1', '-'))
+        cells = row.find_all('td', recursive=False)
+        self.assertEqual(8, len(cells))
+        self.assertEqual('[1] Clinic1', cells[0].find('ri:page')['ri:content-title'])
+        self.assertEqual('DEF', cells[1].string)
+        self.assertEqual('ONLINE', cells[3].find('ac:parameter', attrs={'ac:name': 'title'}).string)
+        self.assertEqual('Green', cells[3].find('ac:parameter', attrs={'ac:name': 'color'}).string)
+        self.assertEqual('1.0', cells[4].string)
+        self.assertEqual('1.0', cells[5].string)
+
+    def test_summary_row_sum_of_values(self):
+        row = self.__SUMMARY.create_summary_table_row_from_record(self.__create_record('10', '2.5'))
+        cells = row.find_all('td', recursive=False)
+        self.assertEqual('12.5', cells[4].string)
+
+    @staticmethod
+    def __create_record(imported: str, updated: str) -> NodeSummaryRecord:
+        return NodeSummaryRecord(
+            node_id='1', common_name='[1] Clinic1', status_title='ONLINE', status_color='Green',
+            interface_import='DEF', last_check='2023-01-01 00:00:00', daily_imported=imported,
+            daily_updated=updated, daily_invalid='1', daily_failed='-',
+            daily_error_rate='0.0', error_rate='0.0')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -43,7 +43,7 @@ class TestTemplatePageElementCreator(unittest.TestCase):
     def test_create_ac_link_element(self):
         element = self.__ELEMENT_CREATOR.create_ac_link_element('name_page')
         expected = '<ac:link><ri:page ri:content-title="name_page"></ri:page></ac:link>'
-        self.assertEqual(bs4.BeautifulSoup, type(element))
+        self.assertEqual(bs4.Tag, type(element))
         self.assertEqual(expected, str(element))
 
     def test_create_table_header_element(self):
@@ -82,6 +82,23 @@ class TestTemplatePageElementCreator(unittest.TestCase):
         element2 = self.__ELEMENT_CREATOR.convert_element_to_soup(element)
         self.assertEqual(bs4.BeautifulSoup, type(element2))
 
+    def test_convert_tag_to_soup(self):
+        element = self.__ELEMENT_CREATOR.create_html_element('tbody', {'class': 'classname'})
+        element.append(self.__ELEMENT_CREATOR.create_td_html_element('name'))
+        element2 = self.__ELEMENT_CREATOR.convert_element_to_soup(element)
+        self.assertEqual(bs4.BeautifulSoup, type(element2))
+        self.assertEqual(str(element), str(element2))
+        element2.find('td').string.replace_with('changed')
+        self.assertEqual('<tbody class="classname"><td>name</td></tbody>', str(element))
+
+    def test_convert_static_fragment_to_soup(self):
+        fragment = '<p class="classname">content</p>'
+        element = self.__ELEMENT_CREATOR.convert_static_fragment_to_soup(fragment)
+        self.assertEqual(bs4.BeautifulSoup, type(element))
+        element.find(class_='classname').string.replace_with('changed')
+        element2 = self.__ELEMENT_CREATOR.convert_static_fragment_to_soup(fragment)
+        self.assertEqual(fragment, str(element2))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -13,7 +13,7 @@ this_path = Path(os.path.realpath(__file__))
 path_src = os.path.join(this_path.parents[2], 'src')
 sys.path.insert(0, path_src)
 
-from common import InfoCSVHandler, ConfigReader
+from common import InfoCSVHandler, ConfigReader, NodeStatusEvaluator
 from csv_to_confluence import TemplatePageStatusChecker, TemplatePageLoader, TemplatePageCSVInfoWriter
 
 
@@ -448,6 +448,7 @@ class TestTemplatePageStatusChecker(unittest.TestCase):
         param_color = status.findAll('ac:parameter', {'ac:name': 'color'})
         actual_color = param_color[0].string
         self.assertEqual(expected_color, actual_color)
+        self.assertEqual((expected_title, expected_color), NodeStatusEvaluator().evaluate_status_of_node(node_id))
 
 
 if __name__ == '__main__':